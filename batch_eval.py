@@ -0,0 +1,304 @@
+# 후보 업소 일괄 평가
+# 업소마다 문서(ingest.py로 적재한 컬렉션의 문서, 없으면 CSV로 같은 방식으로 만든 문서)와 사전 채점 결과로
+# 챗봇과 같은 프롬프트를 만들고, 동시 요청 수를 제한해 OpenAI에 보낸 뒤 결과를 JSONL 파일에 한 줄씩 기록한다.
+# 429(요청 한도 초과)는 Retry-After만큼 모든 요청을 잠시 멈추고, 일시적 오류는 지수 백오프로 재시도한다.
+# 중단 후 같은 출력 파일로 다시 실행하면 이미 성공한 업소는 건너뛴다.
+#
+# 사용 예:
+#   python batch_eval.py --out 평가결과.jsonl --concurrency 8
+#   python batch_eval.py --업종 한식 --사랑상품권 가능 --limit 50
+#   python batch_eval.py --stub --limit 200 --concurrency 16   # 로컬 스텁 서버로 처리량 측정 (API 키 불필요)
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import time
+
+import httpx  # openai 라이브러리가 사용하는 HTTP 클라이언트
+import pandas as pd  # 데이터 분석 라이브러리
+from openai import APIConnectionError, APIStatusError, APITimeoutError, AsyncOpenAI, RateLimitError
+
+from context_packer import pack_context
+from data_store import load_shop_table
+from filter_index import ShopFilterIndex
+from ingest import DEFAULT_COLLECTION, DEFAULT_CSV, DEFAULT_DB_PATH, build_documents, shop_doc_ids
+from llm_client import POOL_LIMITS, REQUEST_TIMEOUT, clean_api_key
+from prompts import SYSTEM_PROMPT, build_user_prompt
+from scoring import describe_score, score_shops
+
+DEFAULT_OUT = "batch_eval_results.jsonl"
+CHROMA_CATALOG = "chroma.sqlite3"  # Chroma 영구 저장소의 카탈로그 (없으면 PersistentClient가 새로 만듦)
+
+# 결과 파싱을 위해 질문 끝에 붙이는 요약 형식
+SUMMARY_INSTRUCTION = "답변 마지막 줄은 '총점: N점 / 판정: 지정 가능' 또는 '총점: N점 / 판정: 지정 불가' 형식으로 써주세요."
+
+_TOTAL_PATTERN = re.compile(r'총점\D{0,5}?(\d+)\s*점')
+_VERDICT_PATTERN = re.compile(r'지정\s*(가능|불가)')
+
+
+# --------------------------------->
+# 평가 대상 / 요청 만들기
+# --------------------------------->
+def select_rows(df, categories=None, voucher=None, dongs=None, limit=None):
+    # 사이드바와 같은 필터 인덱스로 대상 업소 행 번호 선택
+    rows = ShopFilterIndex(df).query(업종=categories, 사랑상품권=[voucher] if voucher else None, 동=dongs)
+    return rows[:limit] if limit else rows
+
+
+def load_documents(df, source, db_path=None, collection_name=DEFAULT_COLLECTION):
+    # {문서 id: (본문, 메타데이터)}, 컬렉션에 적재된 문서(리뷰 포함)가 있으면 그것을 우선 사용
+    documents = {doc_id: (document, metadata) for doc_id, document, metadata in build_documents(df, source)}
+    # 카탈로그가 없으면 컬렉션도 없으므로 클라이언트를 열지 않음 (열면 빈 카탈로그 파일이 생김)
+    if db_path and os.path.isfile(os.path.join(db_path, CHROMA_CATALOG)):
+        try:
+            import chromadb  # 확장성 있는 벡터 데이터베이스 라이브러리
+            collection = chromadb.PersistentClient(path=db_path).get_collection(name=collection_name)
+            ids = list(documents)
+            for start in range(0, len(ids), 1000):
+                page = collection.get(ids=ids[start:start + 1000], include=["documents", "metadatas"])
+                documents.update(zip(page["ids"], zip(page["documents"], page["metadatas"])))
+        except Exception as e:
+            print(f"컬렉션을 사용할 수 없어 CSV로 만든 문서를 사용합니다: {e}")
+    return documents
+
+
+def build_messages(shop, score, doc_id, document, metadata, token_budget):
+    query = f"{shop['사업장명']} 업소를 착한가격업소 지정 기준으로 평가해주세요. {SUMMARY_INSTRUCTION}"
+    result = {"id": doc_id, "content": document, "title": shop['사업장명'], "metadata": metadata,
+              "score_summary": describe_score(shop, score)}
+    context = pack_context(query, [result], token_budget=token_budget).text
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": build_user_prompt(context, query)},
+    ]
+
+
+def _json_value(value):
+    return None if pd.isna(value) else value
+
+
+def parse_evaluation(text):
+    # 답변에서 (총점, 판정) 추출: 마지막으로 나온 값을 사용
+    totals = _TOTAL_PATTERN.findall(text or '')
+    verdicts = _VERDICT_PATTERN.findall(text or '')
+    return (int(totals[-1]) if totals else None,
+            f"지정 {verdicts[-1]}" if verdicts else None)
+
+
+# --------------------------------->
+# 체크포인트 (JSONL)
+# --------------------------------->
+def load_done(path):
+    # 이미 성공한 문서 id (깨진 마지막 줄은 무시)
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get("status") == "ok":
+                done.add(record["id"])
+    return done
+
+
+# --------------------------------->
+# 요청 / 재시도
+# --------------------------------->
+class RateGate:
+    # 429를 받으면 Retry-After 동안 모든 작업의 새 요청을 멈춤
+    def __init__(self):
+        self.resume_at = 0.0
+
+    def hold(self, seconds):
+        self.resume_at = max(self.resume_at, time.monotonic() + seconds)
+
+    async def wait(self):
+        delay = self.resume_at - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+def _retry_after(error):
+    try:
+        return float(error.response.headers.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+async def create_with_retry(client, gate, stats, model, messages, params, max_attempts=6, base_delay=0.5):
+    for attempt in range(1, max_attempts + 1):
+        await gate.wait()
+        try:
+            response = await client.chat.completions.create(model=model, messages=messages, **params)
+            return response, attempt
+        except RateLimitError as e:
+            stats["rate_limited"] += 1
+            delay = _retry_after(e) or base_delay * 2 ** (attempt - 1)
+            gate.hold(delay)
+            last_error = e
+        except (APIConnectionError, APITimeoutError) as e:
+            delay = base_delay * 2 ** (attempt - 1)
+            last_error = e
+        except APIStatusError as e:
+            if e.status_code < 500:
+                raise
+            delay = base_delay * 2 ** (attempt - 1)
+            last_error = e
+        if attempt == max_attempts:
+            # 재시도를 다 쓰면 마지막 오류를 그대로 전달 (except 밖이라 그냥 raise하면 원인이 사라짐)
+            raise last_error
+        stats["retries"] += 1
+        # 여러 작업이 동시에 다시 몰리지 않도록 약간의 무작위 지연
+        await asyncio.sleep(min(delay, 30.0) * random.uniform(1.0, 1.5))
+
+
+async def evaluate_all(jobs, out_path, client, model, params, concurrency=8, max_attempts=6):
+    # jobs: (문서 id, 기본 기록 dict, messages) 목록 → 결과를 out_path에 한 줄씩 추가
+    queue = asyncio.Queue()
+    for job in jobs:
+        queue.put_nowait(job)
+    gate = RateGate()
+    stats = {"ok": 0, "error": 0, "retries": 0, "rate_limited": 0, "latencies": []}
+    started = time.perf_counter()
+    total = len(jobs)
+    report_every = max(1, total // 10)
+
+    with open(out_path, 'a', encoding='utf-8') as out:
+        async def worker():
+            while True:
+                try:
+                    doc_id, record, messages = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                request_started = time.perf_counter()
+                try:
+                    response, attempts = await create_with_retry(
+                        client, gate, stats, model, messages, params, max_attempts=max_attempts
+                    )
+                    answer = response.choices[0].message.content
+                    llm_total, verdict = parse_evaluation(answer)
+                    record.update(status="ok", 총점=llm_total, 판정=verdict, 답변=answer, attempts=attempts,
+                                  usage=response.usage.model_dump() if response.usage else None)
+                    stats["ok"] += 1
+                except Exception as e:
+                    record.update(status="error", error=f"{type(e).__name__}: {e}")
+                    stats["error"] += 1
+                latency = time.perf_counter() - request_started
+                stats["latencies"].append(latency)
+                record.update(model=model, latency=round(latency, 3))
+                # 한 건씩 바로 기록 (중단되어도 여기까지는 남음)
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+                done = stats["ok"] + stats["error"]
+                if done % report_every == 0 or done == total:
+                    elapsed = time.perf_counter() - started
+                    print(f"  {done}/{total}건 ({done / elapsed:.1f}건/초, 재시도 {stats['retries']}회)")
+
+        await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+
+    elapsed = time.perf_counter() - started
+    latencies = sorted(stats.pop("latencies"))
+    stats.update(
+        elapsed=elapsed,
+        throughput=len(latencies) / elapsed if elapsed else 0.0,
+        p50=latencies[len(latencies) // 2] if latencies else None,
+        p95=latencies[int(len(latencies) * 0.95)] if latencies else None,
+    )
+    return stats
+
+
+def run_batch(csv_path=DEFAULT_CSV, out_path=DEFAULT_OUT, api_key=None, base_url=None, model="gpt-4o-mini",
+              concurrency=8, categories=None, voucher=None, dongs=None, limit=None, db_path=DEFAULT_DB_PATH,
+              collection_name=DEFAULT_COLLECTION, token_budget=3000, temperature=0.0, max_tokens=1000,
+              max_attempts=6):
+    df, data_version = load_shop_table(csv_path)
+    scores = score_shops(df)
+    source = os.path.splitext(os.path.basename(csv_path))[0]
+    documents = load_documents(df, source, db_path, collection_name)
+    doc_ids = shop_doc_ids(df)
+
+    # 같은 업소가 여러 행이면 한 번만 평가, 이미 성공한 업소는 건너뜀
+    done = load_done(out_path)
+    jobs, seen = [], set()
+    for row in select_rows(df, categories, voucher, dongs, limit):
+        doc_id = doc_ids[row]
+        if doc_id in seen or doc_id in done:
+            continue
+        seen.add(doc_id)
+        shop, score = df.iloc[row], scores.iloc[row]
+        document, metadata = documents[doc_id]
+        record = {
+            "id": doc_id, "data_version": data_version, "사업장명": shop['사업장명'], "업종": _json_value(shop['업종']),
+            "동": _json_value(shop['동']), "도로명주소": _json_value(shop['도로명주소']),
+            "사전점수": int(score['점수']), "최대점수": int(score['최대점수']), "사전판정": score['판정'],
+            "결격사유": score['결격사유'] or None,
+        }
+        jobs.append((doc_id, record, build_messages(shop, score, doc_id, document, metadata, token_budget)))
+    print(f"평가 대상 {len(jobs)}개 (이미 완료 {len(done)}개 제외), 동시 요청 {concurrency}개")
+    if not jobs:
+        return {"ok": 0, "error": 0, "retries": 0, "rate_limited": 0}
+
+    async def run():
+        http_client = httpx.AsyncClient(limits=POOL_LIMITS, timeout=REQUEST_TIMEOUT)
+        # 재시도는 이 모듈에서 직접 처리 (429 시 전체 일시 정지)
+        client = AsyncOpenAI(api_key=clean_api_key(api_key), base_url=base_url, http_client=http_client,
+                             max_retries=0)
+        try:
+            return await evaluate_all(jobs, out_path, client, model,
+                                      {"temperature": temperature, "max_tokens": max_tokens},
+                                      concurrency=concurrency, max_attempts=max_attempts)
+        finally:
+            await client.close()
+
+    stats = asyncio.run(run())
+    print(f"완료: 성공 {stats['ok']}건, 실패 {stats['error']}건, 재시도 {stats['retries']}회 "
+          f"(429 {stats['rate_limited']}회), {stats['elapsed']:.1f}초, {stats['throughput']:.1f}건/초, "
+          f"지연 p50 {stats['p50']:.2f}초 / p95 {stats['p95']:.2f}초")
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="후보 업소 일괄 평가 (JSONL 기록, 중단 후 이어서 실행 가능)")
+    parser.add_argument("--csv", default=DEFAULT_CSV, help="업소 CSV 경로")
+    parser.add_argument("--out", default=DEFAULT_OUT, help="결과 JSONL 경로 (이미 있으면 이어서 실행)")
+    parser.add_argument("--concurrency", type=int, default=8, help="동시 요청 수")
+    parser.add_argument("--limit", type=int, help="평가할 최대 업소 수")
+    parser.add_argument("--업종", dest="categories", action="append", help="업종 필터 (여러 번 지정 가능)")
+    parser.add_argument("--동", dest="dongs", action="append", help="동 필터 (여러 번 지정 가능)")
+    parser.add_argument("--사랑상품권", dest="voucher", choices=["가능", "불가능"], help="서울사랑상품권 가맹 필터")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="ChromaDB 저장 경로 (없으면 CSV로 문서 생성)")
+    parser.add_argument("--collection", default=DEFAULT_COLLECTION, help="컬렉션 이름")
+    parser.add_argument("--model", default="gpt-4o-mini")
+    parser.add_argument("--temperature", type=float, default=0.0)
+    parser.add_argument("--token-budget", type=int, default=3000, help="업소 문서 문맥의 최대 토큰 수")
+    parser.add_argument("--max-attempts", type=int, default=6, help="요청당 최대 시도 횟수")
+    parser.add_argument("--base-url", default=os.environ.get("OPENAI_BASE_URL"), help="OpenAI 호환 API 주소")
+    parser.add_argument("--stub", action="store_true", help="로컬 스텁 서버를 띄워서 실행 (처리량 측정용)")
+    parser.add_argument("--stub-ttft", type=float, default=0.3, help="스텁 서버 응답 지연(초)")
+    parser.add_argument("--stub-rate-limit-every", type=int, default=0, help="스텁 서버가 N번째 요청마다 429 응답")
+    args = parser.parse_args(argv)
+
+    api_key, base_url = os.environ.get("OPENAI_API_KEY", ""), args.base_url
+    if args.stub:
+        from openai_stub import start_stub_server
+        _, _, base_url = start_stub_server(ttft=args.stub_ttft, rate_limit_every=args.stub_rate_limit_every)
+        api_key = "stub"
+        print(f"스텁 서버: {base_url}")
+    if not api_key:
+        parser.error("OPENAI_API_KEY 환경 변수를 설정하거나 --stub으로 실행하세요.")
+
+    run_batch(
+        args.csv, args.out, api_key=api_key, base_url=base_url, model=args.model, concurrency=args.concurrency,
+        categories=args.categories, voucher=args.voucher, dongs=args.dongs, limit=args.limit, db_path=args.db,
+        collection_name=args.collection, token_budget=args.token_budget, temperature=args.temperature,
+        max_attempts=args.max_attempts,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,480 @@
+# 헤드리스 성능 측정
+# 합성 업소 데이터(700 ~ 100k+ 행)로 단계별 소요 시간을 재고, Streamlit AppTest로 gjg2.py를 브라우저 없이 실행해
+# 재실행 시간과 질문 → 답변까지의 시간을 잰다. 외부 의존성은 모두 로컬로 대체한다:
+#   - 벡터 DB: 프로세스 내 메모리 Chroma (GJG_CHROMA_PATH=":memory:"), 해시 임베딩 (GJG_EMBEDDING=hashing)
+#   - OpenAI: openai_stub.py 스텁 서버 (API 키 불필요)
+#
+# 측정 항목 (크기별)
+#   데이터 로드(CSV → 스냅샷 / 스냅샷), 필터·공간 인덱스 생성과 조회 지연, 자동 채점,
+#   지도 생성 시간과 HTML 크기, 문서 생성·임베딩·적재, BM25/벡터 검색 지연,
+#   앱 첫 실행 / 재실행 / 필터 변경 재실행 / 같은 필터 재실행 / 질문 답변 / 같은 질문(캐시) /
+#   긴 대화(메시지 LONG_CHAT_MESSAGES개)가 저장된 세션의 재실행
+#   벡터 백엔드 비교: Chroma(HNSW) / 행렬 저장소(float16, int8)의 질문당 검색 지연, 여러 질문 한 번에 검색,
+#                    메모리(RSS 증가분), 정확 검색(float32) 대비 recall@20
+#   --cold-start: 새 프로세스에서 앱을 띄워 첫 화면 표시(TTFR)와 첫 질문 답변까지의 시간을
+#                 사전 준비(GJG_WARMUP) 켬/끔으로 비교 (디스크 Chroma, 첫 화면 후 --think-time초 뒤 질문)
+#
+# 사용 예:
+#   python benchmark.py                                # 700, 10000, 100000행
+#   python benchmark.py --sizes 700,5000 --json bench.json
+#   python benchmark.py --sizes 200000 --skip-app      # 앱 실행 없이 단계별 측정만
+#   python benchmark.py --sizes 700 --cold-start       # 첫 화면 / 첫 답변 시간 (사전 준비 켬/끔)
+#   python benchmark.py --sizes 700 --vector-backend matrix   # 앱 측정을 행렬 저장소로
+import argparse
+import contextlib
+import io
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np  # 수치 연산 라이브러리
+
+from data_store import load_shop_table
+from filter_index import ShopFilterIndex
+from hybrid_search import HashingEmbeddingFunction, load_bm25_index
+from ingest import build_documents, ingest_version
+from map_layer import add_district_stats_layer, add_shop_markers, build_popup_table, render_map_payload
+from scoring import score_shops
+from spatial_index import LANDMARKS, SpatialIndex
+from stats_cube import StatsCube, answer_stats_question
+from synthetic_data import DEFAULT_BASE_CSV, write_synthetic_csv
+from vector_store import MatrixClient, export_collection
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "gjg2.py")
+DEFAULT_SIZES = (700, 10000, 100000)
+
+LONG_CHAT_MESSAGES = 500
+
+QUERIES = [
+    "혼밥하기 좋은 식당 추천해줘",
+    "친절 이라는 단어가 많이 언급된 업소는 어디야?",
+    "건대입구역 근처 저렴한 한식집",
+]
+STATS_QUERY = "동별 한식 평균 가격"  # 통계 큐브로 바로 답하는 질문
+
+
+def measure(fn, repeat=1):
+    # (마지막 결과, 중앙값 초)
+    times = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - started)
+    return result, statistics.median(times)
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def current_rss_mb():
+    # 현재 RSS (리눅스만, 그 외에는 None)
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        return None
+
+
+def _rss_delta(before):
+    after = current_rss_mb()
+    return after - before if before is not None and after is not None else None
+
+
+# --------------------------------->
+# 단계별 측정
+# --------------------------------->
+def render_map(df):
+    # gjg2.build_shop_map과 같은 구성 (클러스터 레이어 + 범위 맞춤 + 컴포넌트에 넘길 문자열까지 직렬화)
+    import folium  # 지도 시각화 라이브러리
+
+    m = folium.Map(location=[37.5502596, 127.073139], zoom_start=15)
+    add_shop_markers(m, df)
+    folium.LayerControl().add_to(m)
+    return render_map_payload(m, key="shop_map")
+
+
+def render_overview_map(cube):
+    # "동별 평균 가격 보기": 업소 마커 대신 동마다 원 하나
+    import folium  # 지도 시각화 라이브러리
+
+    m = folium.Map(location=[37.5502596, 127.073139], zoom_start=15)
+    add_district_stats_layer(m, cube.breakdown("동"))
+    folium.LayerControl().add_to(m)
+    return render_map_payload(m, key="shop_map")
+
+
+def bench_data(csv_path, repeat=5):
+    result = {}
+    (df, _), result["load_cold_s"] = measure(lambda: load_shop_table(csv_path))
+    _, result["load_warm_s"] = measure(lambda: load_shop_table(csv_path), repeat)
+    result["rows"] = len(df)
+
+    index, result["filter_index_build_s"] = measure(lambda: ShopFilterIndex(df))
+    category = df['업종'].value_counts().index[0]
+    _, result["filter_search_ms"] = measure(lambda: index.query(search="식당"), repeat)
+    _, result["filter_facets_ms"] = measure(
+        lambda: index.query(업종=[category], 사랑상품권=['가능']), repeat)
+    _, result["filter_combined_ms"] = measure(
+        lambda: index.query(search="식당", 업종=[category], 사랑상품권=['가능']), repeat)
+
+    spatial, result["spatial_index_build_s"] = measure(lambda: SpatialIndex.from_frame(df))
+    landmark = LANDMARKS[next(iter(LANDMARKS))]
+    _, result["spatial_radius_ms"] = measure(lambda: spatial.radius(*landmark, 500), repeat)
+
+    _, result["score_s"] = measure(lambda: score_shops(df))
+    _, result["popup_table_s"] = measure(lambda: build_popup_table(df))
+
+    # 지도는 가장 흔한 업종 필터 결과와 전체 업소 두 경우
+    category_df = df.take(index.query(업종=[category]))
+    payload, result["map_category_s"] = measure(lambda: render_map(category_df))
+    result["map_category_markers"] = len(category_df)
+    result["map_category_bytes"] = payload["bytes"]
+    payload, result["map_all_s"] = measure(lambda: render_map(df))
+    result["map_all_bytes"] = payload["bytes"]
+
+    # 통계 큐브: 데이터 버전당 한 번 만들고, 동별 지도와 통계 질문은 조회만
+    cube, result["stats_cube_build_s"] = measure(lambda: StatsCube.from_frame(df))
+    result["stats_cube_cells"] = len(cube.cells)
+    _, result["stats_answer_ms"] = measure(lambda: answer_stats_question(STATS_QUERY, cube), repeat)
+    payload, result["map_overview_s"] = measure(lambda: render_overview_map(cube))
+    result["map_overview_bytes"] = payload["bytes"]
+    for key in ("filter_search_ms", "filter_facets_ms", "filter_combined_ms", "spatial_radius_ms", "stats_answer_ms"):
+        result[key] *= 1000
+    return df, result
+
+
+def bench_retrieval(client, df, collection_name, repeat=5):
+    result = {}
+    rss_before = current_rss_mb()
+    docs, result["documents_s"] = measure(lambda: build_documents(df, "benchmark"))
+    result["documents"] = len(docs)
+    embed = HashingEmbeddingFunction()
+    embeddings, result["embed_s"] = measure(lambda: embed([d[1] for d in docs]))
+
+    def load():
+        with contextlib.suppress(Exception):
+            client.delete_collection(collection_name)
+        collection = client.create_collection(name=collection_name)
+        batch_size = min(5000, client.get_max_batch_size())
+        for start in range(0, len(docs), batch_size):
+            batch = docs[start:start + batch_size]
+            collection.add(ids=[d[0] for d in batch], documents=[d[1] for d in batch],
+                           metadatas=[d[2] for d in batch], embeddings=embeddings[start:start + batch_size])
+        # ingest.py와 같은 적재 버전 기록 (앱의 검색 캐시 키)
+        version = ingest_version({d[0]: (d[2]["content_hash"], d[2]["meta_hash"]) for d in docs})
+        collection.modify(metadata={"ingest_version": version})
+        return collection
+
+    collection, result["chroma_add_s"] = measure(load)
+    result["chroma_rss_mb"] = _rss_delta(rss_before)
+
+    bm25, result["bm25_build_s"] = measure(lambda: load_bm25_index(collection))
+    _, result["bm25_query_ms"] = measure(lambda: [bm25.results(q, n_results=20) for q in QUERIES], repeat)
+
+    query_vectors = [v.tolist() for v in embed(QUERIES)]
+    _, result["vector_query_ms"] = measure(
+        lambda: [collection.query(query_embeddings=[v], n_results=20) for v in query_vectors], repeat)
+    _, result["vector_where_ms"] = measure(
+        lambda: [collection.query(query_embeddings=[v], n_results=20, where={"사랑상품권": "가능"})
+                 for v in query_vectors], repeat)
+    allowed = [d[0] for d in docs[::10]]
+    _, result["vector_ids_ms"] = measure(
+        lambda: [collection.query(query_embeddings=[v], n_results=20, ids=allowed) for v in query_vectors],
+        repeat)
+    for key in ("bm25_query_ms", "vector_query_ms", "vector_where_ms", "vector_ids_ms"):
+        result[key] *= 1000 / len(QUERIES)
+    return result
+
+
+def recall_at(results, truth):
+    # 질문별 (찾은 id ∩ 정답 id) / 정답 수의 평균
+    return statistics.mean(len(set(found) & set(expected)) / len(expected)
+                           for found, expected in zip(results, truth) if expected)
+
+
+def bench_vector_backends(collection, work_dir, n_results=20, n_queries=32, repeat=5):
+    # Chroma 컬렉션과 같은 문서/임베딩을 행렬 저장소(float16, int8)로 내보내 검색 지연/메모리/재현율 비교
+    # 질문: 고정 질문 + 무작위 업소 이름, 정답: 저장된 float32 임베딩으로 계산한 정확한 최근접 n_results개
+    embed = HashingEmbeddingFunction()
+    stored = collection.get(include=["metadatas", "embeddings"])
+    rng = np.random.default_rng(0)
+    picks = rng.choice(len(stored["ids"]), size=min(n_queries - len(QUERIES), len(stored["ids"])), replace=False)
+    queries = np.stack(embed(QUERIES + [stored["metadatas"][i]["title"] for i in picks]))
+    vectors = np.asarray(stored["embeddings"], dtype=np.float32)
+    exact = ((vectors ** 2).sum(1)[:, None] - 2 * vectors @ queries.T).argsort(axis=0)[:n_results].T
+    truth = [[stored["ids"][i] for i in row] for row in exact]
+    query_lists = [q.tolist() for q in queries]
+
+    result = {}
+    hits, seconds = measure(lambda: [collection.query(query_embeddings=[q], n_results=n_results)["ids"][0]
+                                     for q in query_lists], repeat)
+    result["chroma_query_ms"] = seconds * 1000 / len(query_lists)
+    result["chroma_recall"] = recall_at(hits, truth)
+
+    for dtype, label in (("float16", "matrix_f16"), ("int8", "matrix_i8")):
+        path = os.path.join(work_dir, f"matrix_{dtype}")
+        info, result[f"{label}_export_s"] = measure(lambda: export_collection(collection, path, dtype))
+        rss_before = current_rss_mb()
+        matrix, result[f"{label}_open_s"] = measure(lambda: MatrixClient(path).get_collection(collection.name))
+        matrix.query(query_embeddings=query_lists[:1], n_results=n_results)
+        result[f"{label}_rss_mb"] = _rss_delta(rss_before)
+        result[f"{label}_disk_mb"] = sum(
+            os.path.getsize(os.path.join(path, f)) for f in os.listdir(path) if info["generation"] in f) / 2**20
+        hits, seconds = measure(lambda: [matrix.query(query_embeddings=[q], n_results=n_results)["ids"][0]
+                                         for q in query_lists], repeat)
+        result[f"{label}_query_ms"] = seconds * 1000 / len(query_lists)
+        result[f"{label}_recall"] = recall_at(hits, truth)
+        # 여러 질문을 한 번의 행렬 곱으로
+        _, seconds = measure(lambda: matrix.query(query_embeddings=query_lists, n_results=n_results), repeat)
+        result[f"{label}_batch_query_ms"] = seconds * 1000 / len(query_lists)
+        _, seconds = measure(lambda: [matrix.query(query_embeddings=[q], n_results=n_results,
+                                                   where={"사랑상품권": "가능"}) for q in query_lists], repeat)
+        result[f"{label}_where_ms"] = seconds * 1000 / len(query_lists)
+    return result
+
+
+# --------------------------------->
+# 앱 실행 (AppTest)
+# --------------------------------->
+def _widget(widgets, label):
+    return next(w for w in widgets if w.label == label)
+
+
+def _run(at):
+    _, seconds = measure(at.run)
+    if at.exception:
+        raise RuntimeError(f"앱 실행 오류: {at.exception[0].message}")
+    return seconds
+
+
+def bench_app(csv_path, collection_name, base_url, llm_cache_path, timeout=600, matrix_path=None):
+    # matrix_path: 주면 벡터 검색을 행렬 저장소로 (GJG_VECTOR_BACKEND=matrix)
+    import streamlit as st  # type: ignore
+    from chat_store import ChatStore
+
+    from streamlit.logger import set_log_level  # type: ignore
+    from streamlit.testing.v1 import AppTest  # type: ignore
+
+    set_log_level("error")  # 앱 실행마다 나오는 사용 중단 경고 생략
+    chat_db_path = os.path.join(os.path.dirname(llm_cache_path), "chat_history.sqlite3")
+
+    os.environ.update({
+        "GJG_SHOP_CSV": csv_path,
+        "GJG_CHROMA_PATH": ":memory:",
+        "GJG_COLLECTION": collection_name,
+        "GJG_EMBEDDING": "hashing",
+        "GJG_LLM_CACHE": llm_cache_path,
+        "GJG_CHAT_DB": chat_db_path,
+        "GJG_VECTOR_BACKEND": "matrix" if matrix_path else "chroma",
+        "GJG_MATRIX_PATH": matrix_path or "",
+    })
+    st.cache_resource.clear()
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    at.secrets["OPENAI_API_KEY"] = "stub"
+    at.secrets["OPENAI_BASE_URL"] = base_url
+
+    result = {"app_cold_s": _run(at), "app_rerun_s": _run(at)}
+    _widget(at.selectbox, "서울사랑상품권 가맹").set_value("가능")
+    result["app_filter_change_s"] = _run(at)
+    result["app_filter_repeat_s"] = _run(at)
+
+    at.chat_input[0].set_value(QUERIES[0])
+    result["app_answer_s"] = _run(at)
+    answer = at.chat_message[-1].markdown[-1].value if at.chat_message else ""
+    if not answer:
+        raise RuntimeError("답변이 표시되지 않았습니다.")
+    # 같은 질문을 새 대화에서 (이전 대화 맥락이 없어야 저장된 답변이 그대로 쓰임)
+    at.query_params["chat"] = "bench_cached"
+    at.chat_input[0].set_value(QUERIES[0])
+    result["app_answer_cached_s"] = _run(at)
+    # 통계 질문은 검색/LLM 없이 큐브에서 바로 답함
+    at.query_params["chat"] = "bench_stats"
+    at.chat_input[0].set_value(STATS_QUERY)
+    result["app_stats_answer_s"] = _run(at)
+
+    # 긴 대화: 화면에는 최근 한 페이지만 그리므로 재실행 시간이 대화 길이와 무관해야 함
+    store = ChatStore(chat_db_path)
+    store.clear("bench_long")
+    for i in range(LONG_CHAT_MESSAGES):
+        store.append("bench_long", "user" if i % 2 == 0 else "assistant", answer if i % 2 else QUERIES[i % 6 // 2])
+    at.query_params["chat"] = "bench_long"
+    _run(at)
+    result["app_rerun_long_chat_s"] = _run(at)
+    return result
+
+
+# --------------------------------->
+# 콜드 스타트 (새 프로세스에서 첫 화면 / 첫 답변)
+# --------------------------------->
+def persist_collection(source, path, collection_name):
+    # 메모리 컬렉션을 디스크 Chroma로 복사 (임베딩 재계산 없이), 앱이 새 프로세스에서 디스크에서 읽도록
+    import chromadb  # 확장성 있는 벡터 데이터베이스 라이브러리
+
+    client = chromadb.PersistentClient(path=path)
+    with contextlib.suppress(Exception):
+        client.delete_collection(collection_name)
+    target = client.create_collection(name=collection_name, metadata=source.metadata)
+    batch_size = min(5000, client.get_max_batch_size())
+    total = source.count()
+    for offset in range(0, total, batch_size):
+        batch = source.get(include=["documents", "metadatas", "embeddings"], limit=batch_size, offset=offset)
+        target.add(ids=batch["ids"], documents=batch["documents"], metadatas=batch["metadatas"],
+                   embeddings=batch["embeddings"])
+    return path
+
+
+def probe_cold_start(csv_path, chroma_path, collection_name, base_url, llm_cache_path, think_time, timeout=600):
+    # (--probe로 실행되는 새 프로세스 안에서) 첫 실행 → think_time초 대기 → 첫 질문
+    from streamlit.logger import set_log_level  # type: ignore
+    from streamlit.testing.v1 import AppTest  # type: ignore
+
+    set_log_level("error")
+    trace_log = os.path.join(os.path.dirname(llm_cache_path), f"trace_{os.getpid()}.jsonl")
+    os.environ.update({
+        "GJG_SHOP_CSV": csv_path,
+        "GJG_CHROMA_PATH": chroma_path,
+        "GJG_COLLECTION": collection_name,
+        "GJG_EMBEDDING": "hashing",
+        "GJG_LLM_CACHE": llm_cache_path,
+        "GJG_TRACE_LOG": trace_log,
+        "GJG_CHAT_DB": os.path.join(os.path.dirname(llm_cache_path), f"chat_{os.getpid()}.sqlite3"),
+    })
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    at.secrets["OPENAI_API_KEY"] = "stub"
+    at.secrets["OPENAI_BASE_URL"] = base_url
+
+    result = {"first_run_s": _run(at)}
+    with open(trace_log, encoding="utf-8") as f:
+        spans = {span["name"]: span["duration"] for span in json.loads(f.readline())["spans"]}
+    result["ttfr_s"] = spans.get("first_render")
+    time.sleep(think_time)
+    at.chat_input[0].set_value(QUERIES[0])
+    result["first_answer_s"] = _run(at)
+    if not (at.chat_message and at.chat_message[-1].markdown[-1].value):
+        raise RuntimeError("답변이 표시되지 않았습니다.")
+    os.remove(trace_log)
+    return result
+
+
+def bench_cold_start(csv_path, collection, base_url, work_dir, think_time=2.0):
+    # 사전 준비 켬/끔 각각 새 프로세스에서 측정 (모듈 임포트/모델 로드가 프로세스마다 새로 일어나도록)
+    chroma_path = persist_collection(collection, os.path.join(work_dir, f"chroma_{collection.name}"), collection.name)
+    result = {}
+    for label, warmup in (("warm", "1"), ("nowarm", "0")):
+        llm_cache_path = os.path.join(work_dir, f"llm_cache_{collection.name}_{label}.sqlite3")
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(llm_cache_path)
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--probe", csv_path, chroma_path, collection.name,
+             base_url, llm_cache_path, str(think_time)],
+            env={**os.environ, "GJG_WARMUP": warmup}, capture_output=True, text=True, check=True,
+        ).stdout
+        probe = json.loads(output.strip().splitlines()[-1])
+        result.update({f"cold_{key}_{label}": value for key, value in probe.items()})
+    return result
+
+
+# --------------------------------->
+# 실행 / 출력
+# --------------------------------->
+def run_benchmark(sizes=DEFAULT_SIZES, base_csv=DEFAULT_BASE_CSV, skip_app=False, stub_ttft=0.3, work_dir=None,
+                  cold_start=False, think_time=2.0, vector_backend="chroma"):
+    import chromadb  # 확장성 있는 벡터 데이터베이스 라이브러리
+
+    work_dir = work_dir or tempfile.mkdtemp(prefix="gjg_bench_")
+    os.makedirs(work_dir, exist_ok=True)
+    client = chromadb.EphemeralClient()
+    base_url = None
+    if not skip_app:
+        from openai_stub import start_stub_server
+        _, _, base_url = start_stub_server(ttft=stub_ttft)
+
+    results = []
+    for n in sizes:
+        csv_path = os.path.join(work_dir, f"shops_{n}.csv")
+        _, generate_s = measure(lambda: write_synthetic_csv(n, csv_path, base_csv))
+        print(f"[{n}행] 합성 데이터 생성 {generate_s:.1f}초", flush=True)
+        df, result = bench_data(csv_path)
+        result["generate_s"] = generate_s
+        collection_name = f"bench_{n}"
+        with contextlib.redirect_stdout(io.StringIO()):
+            result.update(bench_retrieval(client, df, collection_name))
+            result.update(bench_vector_backends(client.get_collection(collection_name), work_dir))
+        print(f"[{n}행] 데이터/검색 단계 측정 완료", flush=True)
+        if not skip_app:
+            llm_cache_path = os.path.join(work_dir, f"llm_cache_{n}.sqlite3")
+            matrix_path = os.path.join(work_dir, "matrix_float16") if vector_backend == "matrix" else None
+            result.update(bench_app(csv_path, collection_name, base_url, llm_cache_path, matrix_path=matrix_path))
+            print(f"[{n}행] 앱 실행 측정 완료", flush=True)
+            if cold_start:
+                collection = client.get_collection(collection_name)
+                result.update(bench_cold_start(csv_path, collection, base_url, work_dir, think_time))
+                print(f"[{n}행] 콜드 스타트 측정 완료", flush=True)
+        result["peak_rss_mb"] = peak_rss_mb()
+        results.append(result)
+    return results
+
+
+def format_table(results):
+    keys = []
+    for result in results:
+        keys.extend(k for k in result if k not in keys and k != "rows")
+    header = ["항목"] + [f"{r['rows']}행" for r in results]
+    rows = [[key] + [_format(r.get(key)) for r in results] for key in keys]
+    widths = [max(len(str(row[i])) for row in [header] + rows) for i in range(len(header))]
+    lines = ["  ".join(str(c).ljust(w) if i == 0 else str(c).rjust(w) for i, (c, w) in enumerate(zip(row, widths)))
+             for row in [header] + rows]
+    return "\n".join(lines)
+
+
+def _format(value):
+    if value is None:
+        return "-"
+    if isinstance(value, float):
+        return f"{value:.3f}" if value < 100 else f"{value:.0f}"
+    return str(value)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="합성 데이터로 단계별/앱 재실행 성능 측정 (로컬 Chroma, 스텁 OpenAI)")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="업소 행 수 목록 (쉼표 구분)")
+    parser.add_argument("--base", default=DEFAULT_BASE_CSV, help="합성 데이터의 원본 업소 CSV")
+    parser.add_argument("--skip-app", action="store_true", help="AppTest 앱 실행 측정 생략")
+    parser.add_argument("--stub-ttft", type=float, default=0.3, help="스텁 OpenAI 첫 응답 지연(초)")
+    parser.add_argument("--work-dir", help="합성 CSV/캐시를 둘 디렉터리 (기본: 임시 디렉터리)")
+    parser.add_argument("--json", help="결과를 JSON으로 저장할 경로")
+    parser.add_argument("--cold-start", action="store_true", help="새 프로세스에서 첫 화면/첫 답변 시간 측정 (사전 준비 켬/끔)")
+    parser.add_argument("--think-time", type=float, default=2.0, help="콜드 스타트 측정에서 첫 화면 후 질문까지 대기(초)")
+    parser.add_argument("--vector-backend", choices=["chroma", "matrix"], default="chroma",
+                        help="앱 실행 측정에 쓸 벡터 백엔드 (matrix: float16 행렬 저장소)")
+    parser.add_argument("--probe", nargs=6, help=argparse.SUPPRESS)  # bench_cold_start가 띄우는 측정 프로세스
+    args = parser.parse_args(argv)
+
+    if args.probe:
+        *probe_args, think_time = args.probe
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = probe_cold_start(*probe_args, float(think_time))
+        print(json.dumps(result))
+        return
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    if args.cold_start and args.skip_app:
+        parser.error("--cold-start는 --skip-app과 함께 쓸 수 없습니다.")
+    results = run_benchmark(sizes, args.base, args.skip_app, args.stub_ttft, args.work_dir,
+                            args.cold_start, args.think_time, args.vector_backend)
+    print()
+    print(format_table(results))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
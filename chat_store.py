@@ -0,0 +1,167 @@
+# 대화 기록 저장소 (SQLite)
+# 세션(대화)마다 메시지를 디스크에 저장해 새로고침 후에도 이어서 볼 수 있게 하고, 화면에는 최근 한 페이지만 그린다.
+# 오래된 대화는 질문/답변 첫 줄만 남긴 요약으로 접어 두고, 후속 질문에는 전체 대화 대신
+# 요약 + 최근 몇 턴만 LLM에 보낸다. 요약에 접힌 메시지는 세션당 최대 개수를 넘으면 지우고(압축),
+# 오래 쓰지 않은 세션은 통째로 지운 뒤 빈 페이지를 파일에서 돌려준다.
+import re
+import sqlite3
+import time
+from contextlib import closing, contextmanager
+
+from context_packer import count_tokens, truncate_to_tokens
+
+DEFAULT_CHAT_PATH = "chat_history.sqlite3"
+
+
+class ChatStore:
+    def __init__(self, path=DEFAULT_CHAT_PATH, max_messages=200, max_age_days=30):
+        self.path = path
+        self.max_messages = max_messages  # 세션당 보관할 메시지 수 (요약에 접힌 것부터 지움)
+        self.max_age = max_age_days * 86400
+        with self._connect() as conn:
+            # 지운 페이지를 compact()에서 파일로 돌려주기 위해 테이블을 만들기 전에 설정
+            conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS messages ("
+                " session TEXT NOT NULL, seq INTEGER NOT NULL, role TEXT NOT NULL, content TEXT NOT NULL,"
+                " created REAL NOT NULL, PRIMARY KEY (session, seq))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS summaries ("
+                " session TEXT PRIMARY KEY, upto INTEGER NOT NULL, summary TEXT NOT NULL, updated REAL NOT NULL)"
+            )
+
+    @contextmanager
+    def _connect(self):
+        # 세션(스레드)마다 짧게 열고, 끝나면 커밋(오류 시 롤백)한 뒤 닫음
+        with closing(sqlite3.connect(self.path, timeout=10)) as conn, conn:
+            yield conn
+
+    def append(self, session, role, content):
+        # 메시지를 추가하고 {"seq", "role", "content"} 반환
+        with self._connect() as conn:
+            # 같은 대화를 연 다른 탭이 seq 계산과 추가 사이에 끼어들지 않도록 쓰기 잠금부터 잡음
+            conn.execute("BEGIN IMMEDIATE")
+            seq = conn.execute(
+                "SELECT COALESCE(MAX(seq), 0) + 1 FROM messages WHERE session = ?", (session,)
+            ).fetchone()[0]
+            conn.execute(
+                "INSERT INTO messages (session, seq, role, content, created) VALUES (?, ?, ?, ?, ?)",
+                (session, seq, role, content, time.time()),
+            )
+        return {"seq": seq, "role": role, "content": content}
+
+    def recent(self, session, limit, before=None):
+        # 최근 메시지 limit개 (before가 있으면 그 seq보다 앞의 것), 오래된 것부터 순서대로
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT seq, role, content FROM messages WHERE session = ? AND seq < ? ORDER BY seq DESC LIMIT ?",
+                (session, before if before is not None else 2**62, limit),
+            ).fetchall()
+        return [{"seq": seq, "role": role, "content": content} for seq, role, content in reversed(rows)]
+
+    def between(self, session, after, upto):
+        # after < seq <= upto 인 메시지
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT seq, role, content FROM messages WHERE session = ? AND seq > ? AND seq <= ? ORDER BY seq",
+                (session, after, upto),
+            ).fetchall()
+        return [{"seq": seq, "role": role, "content": content} for seq, role, content in rows]
+
+    def count(self, session):
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM messages WHERE session = ?", (session,)).fetchone()[0]
+
+    def summary(self, session):
+        # (요약에 접힌 마지막 seq, 요약 문장), 없으면 (0, "")
+        with self._connect() as conn:
+            row = conn.execute("SELECT upto, summary FROM summaries WHERE session = ?", (session,)).fetchone()
+        return (row[0], row[1]) if row else (0, "")
+
+    def set_summary(self, session, upto, summary):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO summaries (session, upto, summary, updated) VALUES (?, ?, ?, ?)",
+                (session, upto, summary, time.time()),
+            )
+
+    def clear(self, session):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM messages WHERE session = ?", (session,))
+            conn.execute("DELETE FROM summaries WHERE session = ?", (session,))
+
+    def compact(self, session=None):
+        # 세션당 max_messages개를 넘는 메시지 중 요약에 접힌 것을 지우고, 오래 쓰지 않은 세션을 지운 뒤 빈 페이지 반환
+        with self._connect() as conn:
+            sessions = [session] if session else [
+                row[0] for row in conn.execute("SELECT DISTINCT session FROM messages")
+            ]
+            removed = 0
+            for name in sessions:
+                row = conn.execute(
+                    "SELECT seq FROM messages WHERE session = ? ORDER BY seq DESC LIMIT 1 OFFSET ?",
+                    (name, self.max_messages),
+                ).fetchone()
+                if row is None:
+                    continue
+                upto = conn.execute("SELECT upto FROM summaries WHERE session = ?", (name,)).fetchone()
+                cutoff = min(row[0], upto[0] if upto else 0)
+                removed += conn.execute(
+                    "DELETE FROM messages WHERE session = ? AND seq <= ?", (name, cutoff)
+                ).rowcount
+            if session is None:
+                expired = time.time() - self.max_age
+                stale = "SELECT session FROM messages GROUP BY session HAVING MAX(created) < ?"
+                conn.execute(f"DELETE FROM summaries WHERE session IN ({stale})", (expired,))
+                removed += conn.execute(f"DELETE FROM messages WHERE session IN ({stale})", (expired,)).rowcount
+                conn.execute("DELETE FROM summaries WHERE session NOT IN (SELECT DISTINCT session FROM messages)")
+        if removed:
+            with self._connect() as conn:
+                conn.execute("PRAGMA incremental_vacuum")
+        return removed
+
+    def stats(self):
+        with self._connect() as conn:
+            sessions, messages = conn.execute("SELECT COUNT(DISTINCT session), COUNT(*) FROM messages").fetchone()
+        return {"sessions": sessions, "messages": messages}
+
+
+# --------------------------------->
+# 대화 요약 (LLM 호출 없이 질문과 답변 첫 줄만 남김)
+# --------------------------------->
+def _first_line(text):
+    # 마크다운 기호를 걷어낸 첫 번째 내용 줄
+    for line in text.splitlines():
+        line = re.sub(r'[#*_`>|]+', '', line).strip(" -:")
+        if line:
+            return line
+    return ""
+
+
+def summarize_turns(summary, messages, token_budget=600, line_tokens=80):
+    # 기존 요약 뒤에 메시지(질문/답변)를 한 줄씩 덧붙이고, 예산을 넘으면 오래된 줄부터 버림
+    lines = summary.splitlines() if summary else []
+    for message in messages:
+        label = "질문" if message["role"] == "user" else "답변"
+        text = _first_line(message["content"])
+        if text:
+            lines.append(f"- {label}: {truncate_to_tokens(text, line_tokens)}")
+    while lines and count_tokens("\n".join(lines)) > token_budget:
+        lines.pop(0)
+    return "\n".join(lines)
+
+
+def conversation_context(store, session, recent_turns=2, before=None, token_budget=600, message_tokens=300):
+    # 후속 질문용 대화 맥락: (요약, 최근 메시지 목록)
+    # before: 이번 질문의 seq (그 앞의 메시지만 사용), 최근 recent_turns턴은 그대로(메시지당 message_tokens까지),
+    # 그보다 오래된 메시지는 아직 요약에 접히지 않은 것만 요약에 덧붙임 (질문마다 새로 접히는 건 한두 턴뿐)
+    recent = store.recent(session, recent_turns * 2, before=before)
+    upto, summary = store.summary(session)
+    fold_upto = recent[0]["seq"] - 1 if recent else 0
+    if fold_upto > upto:
+        summary = summarize_turns(summary, store.between(session, upto, fold_upto), token_budget)
+        store.set_summary(session, fold_upto, summary)
+    recent = [dict(m, content=truncate_to_tokens(m["content"], message_tokens)) for m in recent]
+    return summary, recent
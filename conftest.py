@@ -0,0 +1 @@
+# pytest 설정: tests/에서 루트 모듈(filter_index, chat_store 등)을 바로 임포트할 수 있게 루트 폴더를 경로에 둠
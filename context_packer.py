@@ -0,0 +1,172 @@
+# RAG 프롬프트 문맥 구성
+# 검색된 문서를 그대로 이어 붙이지 않고, 거의 같은 문서는 하나만 남기고(중복 제거),
+# 관련도와 다양성을 함께 고려해 순서를 다시 정한 뒤(MMR), 정해진 토큰 예산 안에 들어가는 만큼만 담는다.
+import math
+import re
+from collections import Counter
+
+try:
+    import tiktoken  # 선택 의존성: 있으면 정확한 토큰 수 계산
+except ImportError:
+    tiktoken = None
+
+CONTEXT_HEADER = "다음은 광진구 착한가격 업소 관련 데이터입니다:\n\n"
+
+_encoding = None
+
+
+def _get_encoding():
+    global _encoding
+    if _encoding is None and tiktoken is not None:
+        try:
+            _encoding = tiktoken.get_encoding("o200k_base")
+        except Exception:
+            _encoding = False  # 인코딩 파일을 받을 수 없는 환경이면 추정치 사용
+    return _encoding or None
+
+
+def count_tokens(text):
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    # 추정: 영문/숫자는 4글자당 1토큰, 한글 등은 1글자당 1토큰 (실제보다 약간 많게 잡음)
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return math.ceil(ascii_chars / 4 + (len(text) - ascii_chars))
+
+
+def truncate_to_tokens(text, max_tokens):
+    if max_tokens <= 0:
+        return ''
+    encoding = _get_encoding()
+    if encoding is not None:
+        tokens = encoding.encode(text)
+        return text if len(tokens) <= max_tokens else encoding.decode(tokens[:max_tokens])
+    if count_tokens(text) <= max_tokens:
+        return text
+    lo, hi = 0, len(text)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if count_tokens(text[:mid]) <= max_tokens:
+            lo = mid
+        else:
+            hi = mid - 1
+    return text[:lo]
+
+
+# --------------------------------->
+# 문서 유사도 (글자 2-gram)
+# --------------------------------->
+def _shingles(text):
+    text = re.sub(r'\s+', ' ', text.lower())
+    return Counter(text[i:i + 2] for i in range(len(text) - 1))
+
+
+def _cosine(a, b):
+    if not a or not b:
+        return 0.0
+    if len(a) > len(b):
+        a, b = b, a
+    dot = sum(v * b.get(k, 0) for k, v in a.items())
+    norm = math.sqrt(sum(v * v for v in a.values())) * math.sqrt(sum(v * v for v in b.values()))
+    return dot / norm if norm else 0.0
+
+
+def _jaccard(a, b):
+    a, b = set(a), set(b)
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+
+def format_document(number, result, content):
+    # 프롬프트에 들어가는 업소 한 건의 형식
+    block = f"업소 {number}:\n업소명: {result['title']}\n"
+    metadata = result.get('metadata') or {}
+    # 메타데이터에 작성일이 있으면 추가
+    if 'published_date' in metadata:
+        block += f"등록일: {metadata['published_date']}\n"
+    # URL이나 출처가 있으면 추가
+    if 'url' in metadata:
+        block += f"출처: {metadata['url']}\n"
+    if 'source' in metadata:
+        block += f"제공처: {metadata['source']}\n"
+    # 평가표 자동 채점 결과가 있으면 추가
+    if result.get('score_summary'):
+        block += f"사전 채점: {result['score_summary']}\n"
+    return block + f"설명: {content}\n\n"
+
+
+class PackedContext:
+    def __init__(self, text, tokens, included, deduplicated, dropped, truncated):
+        self.text = text
+        self.tokens = tokens              # 문맥 토큰 수
+        self.included = included          # 담긴 문서 (원래 검색 순위 번호)
+        self.deduplicated = deduplicated  # 중복으로 빠진 문서 수
+        self.dropped = dropped            # 예산 초과로 빠진 문서 수
+        self.truncated = truncated        # 일부만 담긴 문서 수
+
+    def stats(self):
+        return {"context_tokens": self.tokens, "documents": len(self.included),
+                "deduplicated": self.deduplicated, "dropped": self.dropped, "truncated": self.truncated}
+
+
+def pack_context(query, search_results, token_budget=3000, mmr_lambda=0.7, dedup_threshold=0.9,
+                 min_excerpt_tokens=80):
+    # search_results: 검색 순위 순서의 문서 목록 ({"content", "title", "metadata"[, "score" 또는 "distance"]})
+    results = [r for r in search_results if r.get('content')]
+    shingles = [_shingles(r['content']) for r in results]
+
+    # 1) 거의 같은 문서 제거 (순위가 높은 쪽을 남김)
+    kept = []
+    for i in range(len(results)):
+        if all(_jaccard(shingles[i], shingles[j]) < dedup_threshold for j in kept):
+            kept.append(i)
+    deduplicated = len(results) - len(kept)
+
+    # 2) 관련도: 융합 점수(score) 또는 거리 값이 있으면 사용, 없으면 검색 순위 기준
+    if kept and all('score' in results[i] for i in kept):
+        scores = [results[i]['score'] for i in kept]
+        lo, hi = min(scores), max(scores)
+        relevance = {i: (results[i]['score'] - lo) / (hi - lo) if hi > lo else 1.0 for i in kept}
+    elif kept and all('distance' in results[i] for i in kept):
+        distances = [results[i]['distance'] for i in kept]
+        lo, hi = min(distances), max(distances)
+        relevance = {i: 1.0 - (results[i]['distance'] - lo) / (hi - lo) if hi > lo else 1.0 for i in kept}
+    else:
+        relevance = {i: 1.0 - rank / max(len(kept), 1) for rank, i in enumerate(kept)}
+    # 질문에 업소명이 직접 나오면 반드시 먼저 포함
+    for i in kept:
+        if results[i].get('title') and results[i]['title'] in query:
+            relevance[i] += 10.0
+
+    # 3) MMR 재정렬: 관련도는 높고 이미 고른 문서와는 덜 비슷한 순서
+    # redundancy[i]: 지금까지 고른 문서와의 최대 유사도 (고를 때마다 새로 고른 문서와의 값만 갱신)
+    order, remaining = [], list(kept)
+    redundancy = dict.fromkeys(kept, 0.0)
+    while remaining:
+        best = max(remaining, key=lambda i: mmr_lambda * relevance[i] - (1 - mmr_lambda) * redundancy[i])
+        order.append(best)
+        remaining.remove(best)
+        for i in remaining:
+            redundancy[i] = max(redundancy[i], _cosine(shingles[i], shingles[best]))
+
+    # 4) 토큰 예산 안에서 담기 (남은 예산이 작으면 문서를 잘라서 담음)
+    text = CONTEXT_HEADER
+    used = count_tokens(text)
+    included, truncated = [], 0
+    for i in order:
+        result = results[i]
+        block = format_document(len(included) + 1, result, result['content'])
+        cost = count_tokens(block)
+        if used + cost > token_budget:
+            overhead = count_tokens(format_document(len(included) + 1, result, ''))
+            room = token_budget - used - overhead - count_tokens("...")
+            if room < min_excerpt_tokens:
+                continue
+            block = format_document(len(included) + 1, result, truncate_to_tokens(result['content'], room) + "...")
+            cost = count_tokens(block)
+            if used + cost > token_budget:
+                continue
+            truncated += 1
+        text += block
+        used += cost
+        included.append(i)
+    return PackedContext(text, used, included, deduplicated, len(order) - len(included), truncated)
@@ -0,0 +1,174 @@
+# 업소 데이터 스냅샷 로더
+# CSV를 매번 다시 읽지 않도록, 타입이 정리된 테이블을 CSV 옆에 바이너리(parquet)로 저장해두고
+# 원본 CSV가 바뀌었을 때만(수정시각/크기 → 해시 순으로 확인) 다시 만든다.
+import hashlib
+import json
+import os
+import re
+
+import numpy as np  # 수치 연산 라이브러리
+import pandas as pd  # 데이터 분석 라이브러리
+
+from tm_coords import DEFAULT_PROJECTION, tm_to_wgs84
+
+# 스냅샷 포맷이 바뀌면 올려서 기존 스냅샷을 무효화
+SNAPSHOT_FORMAT = 2
+
+# 범주형으로 저장할 컬럼 (값 종류가 적고 필터/그룹 기준으로 쓰이는 컬럼)
+CATEGORY_COLUMNS = ['업종', '업종구분', '동', '사랑상품권', '위생등급', '착한업소', '행정처분', '영업상태명']
+
+# 앱에서 사용하는 컬럼 순서 (원본에 없는 컬럼은 결측으로 채움)
+SHOP_COLUMNS = [
+    '사업장명', '도로명주소', '지번주소', '동', '전화번호', '업종', '업종구분', '영업상태명', '인허가일자',
+    '착한업소', '사랑상품권', '위생등급', '행정처분', 'latitude', 'longitude', '가격',
+]
+
+# 인허가 데이터의 TM 좌표 컬럼
+TM_COLUMNS = ('좌표정보(X)', '좌표정보(Y)')
+
+_DONG_PATTERN = re.compile(r'광진구\s+(\S+?동)')
+
+
+# --------------------------------->
+# 원본 파일 상태 확인
+# --------------------------------->
+def source_stamp(csv_path):
+    # 매 실행마다 부담 없이 호출할 수 있는 (수정시각, 크기) 값
+    stat = os.stat(csv_path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def snapshot_paths(csv_path):
+    base, _ = os.path.splitext(csv_path)
+    return base + '.snapshot.parquet', base + '.snapshot.json'
+
+
+# --------------------------------->
+# 컬럼 정리 및 타입 변환
+# --------------------------------->
+def numeric_column(df, name):
+    if name not in df.columns:
+        return np.full(len(df), np.nan)
+    return pd.to_numeric(df[name], errors='coerce').to_numpy(dtype='float64', na_value=np.nan, copy=True)
+
+
+def fill_coordinates(df, projection=DEFAULT_PROJECTION, overwrite=False):
+    # 위경도가 없는 행(overwrite=True면 TM 좌표가 있는 모든 행)을 TM 좌표 변환값으로 채움, 채운 행 수 반환
+    if not all(col in df.columns for col in TM_COLUMNS):
+        return 0
+    x, y = numeric_column(df, TM_COLUMNS[0]), numeric_column(df, TM_COLUMNS[1])
+    lat, lon = numeric_column(df, 'latitude'), numeric_column(df, 'longitude')
+    target = ~(np.isnan(x) | np.isnan(y))
+    if not overwrite:
+        target &= np.isnan(lat) | np.isnan(lon)
+    if target.any():
+        lat[target], lon[target] = tm_to_wgs84(x[target], y[target], projection)
+        df['latitude'], df['longitude'] = lat, lon
+    return int(target.sum())
+
+
+def normalize_shop_frame(raw):
+    df = raw.copy()
+    df.columns = [str(c).lstrip('﻿') for c in df.columns]
+
+    # 최종데이터333처럼 '업종' 컬럼이 두 번 나오는 경우 (pandas가 '업종.1'로 읽음):
+    # 앞의 것이 세부 업종(한식, 분식 ...), 뒤의 것이 영업 구분(일반음식점, 휴게음식점 ...)
+    if '업종.1' in df.columns:
+        df = df.rename(columns={'업종.1': '업종구분'})
+    # 전처리/222 데이터처럼 세부 업종이 '업태구분명'에 있는 경우
+    elif '업태구분명' in df.columns:
+        df = df.rename(columns={'업종': '업종구분', '업태구분명': '업종'})
+        df['업종'] = df['업종'].fillna(df['업종구분'])
+
+    # 동 컬럼이 없으면 지번주소에서 추출
+    if '동' not in df.columns:
+        df['동'] = df['지번주소'].str.extract(_DONG_PATTERN, expand=False)
+
+    for col in SHOP_COLUMNS:
+        if col not in df.columns:
+            df[col] = pd.NA
+    df = df[SHOP_COLUMNS + [c for c in df.columns if c not in SHOP_COLUMNS]]
+
+    # 위경도가 비어 있으면 TM 좌표로 채운 뒤, 그래도 없는 행은 제거 (위치가 없으면 지도/공간 검색 대상이 아님)
+    fill_coordinates(df)
+    df['latitude'] = pd.to_numeric(df['latitude'], errors='coerce').astype('float32')
+    df['longitude'] = pd.to_numeric(df['longitude'], errors='coerce').astype('float32')
+    df = df.dropna(subset=['latitude', 'longitude'])
+
+    df['가격'] = pd.to_numeric(df['가격'], errors='coerce').round().astype('Int32')
+    for col in CATEGORY_COLUMNS:
+        df[col] = df[col].astype('category')
+
+    # 행 번호(0..n-1)를 업소 id로 사용하므로 인덱스를 다시 매김
+    return df.reset_index(drop=True)
+
+
+# --------------------------------->
+# 스냅샷 생성 / 로드
+# --------------------------------->
+def _read_meta(meta_path):
+    try:
+        with open(meta_path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_atomic(path, write):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _write_meta(meta_path, meta):
+    def write(tmp_path):
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+    _write_atomic(meta_path, write)
+
+
+def load_shop_table(csv_path):
+    # (타입 정리된 DataFrame, 데이터 버전) 반환
+    # 데이터 버전은 원본 CSV 내용 해시 앞자리로, 하위 캐시들의 키로 사용한다.
+    snapshot_path, meta_path = snapshot_paths(csv_path)
+    mtime_ns, size = source_stamp(csv_path)
+    meta = _read_meta(meta_path)
+
+    if meta and meta.get('format') == SNAPSHOT_FORMAT and os.path.exists(snapshot_path):
+        fresh = meta.get('mtime_ns') == mtime_ns and meta.get('size') == size
+        if not fresh:
+            # 수정시각만 바뀐 경우(복사, 체크아웃 등)는 내용 해시로 한 번 더 확인
+            fresh = meta.get('sha256') == file_sha256(csv_path)
+            if fresh:
+                _write_meta(meta_path, dict(meta, mtime_ns=mtime_ns, size=size))
+        if fresh:
+            try:
+                return pd.read_parquet(snapshot_path), meta['version']
+            except Exception:
+                pass  # 스냅샷이 깨졌으면 아래에서 다시 생성
+
+    sha256 = file_sha256(csv_path)
+    df = normalize_shop_frame(pd.read_csv(csv_path, low_memory=False))
+    version = sha256[:12]
+    try:
+        _write_atomic(snapshot_path, lambda tmp_path: df.to_parquet(tmp_path, index=False))
+        _write_meta(meta_path, {
+            'format': SNAPSHOT_FORMAT,
+            'source': os.path.basename(csv_path),
+            'mtime_ns': mtime_ns,
+            'size': size,
+            'sha256': sha256,
+            'version': version,
+            'rows': len(df),
+        })
+    except OSError:
+        pass  # 읽기 전용 배포 환경에서는 메모리 캐시만 사용
+    return df, version
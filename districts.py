@@ -0,0 +1,283 @@
+# 자치구별 데이터 샤드
+# 자치구마다 업소 CSV(스냅샷), 위치 범위, Chroma 컬렉션을 카탈로그(districts.json)에 등록해 두고
+# 앱은 선택된 자치구의 샤드(테이블 + 필터/공간 인덱스 + 채점 결과 + 통계 큐브 + 문서 id)만 처음 쓸 때 불러온다.
+# 불러온 샤드는 메모리 예산 안에서 LRU로 유지하고, 예산을 넘으면 가장 오래 안 쓴 샤드부터 내린다.
+#
+# 사용 예:
+#   python districts.py register 성동구 --csv 성동구_추천업소.csv --collection sd_report
+#   python districts.py list
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np  # 수치 연산 라이브러리
+import pandas as pd  # 데이터 분석 라이브러리
+
+from data_store import load_shop_table, source_stamp
+from filter_index import ShopFilterIndex
+from hybrid_search import load_bm25_index
+from ingest import shop_doc_ids
+from map_layer import build_popup_table
+from retrieval_cache import collection_version
+from scoring import score_shops
+from spatial_index import SpatialIndex, radius_bbox
+from stats_cube import StatsCube
+
+DEFAULT_CATALOG = "districts.json"
+DEFAULT_DISTRICT = "광진구"
+DEFAULT_CENTER = (37.5502596, 127.073139)
+
+
+# --------------------------------->
+# 카탈로그
+# --------------------------------->
+class District:
+    def __init__(self, name, csv, collection, center=None, bounds=None):
+        self.name = name
+        self.csv = csv
+        self.collection = collection
+        self.center = tuple(center) if center else None  # (위도, 경도), 지도 중심
+        self.bounds = tuple(bounds) if bounds else None  # (남, 서, 북, 동), 없으면 테이블에서 계산
+
+    @classmethod
+    def from_dict(cls, entry):
+        return cls(entry["name"], entry["csv"], entry["collection"], entry.get("center"), entry.get("bounds"))
+
+    def to_dict(self):
+        entry = {"name": self.name, "csv": self.csv, "collection": self.collection}
+        if self.center:
+            entry["center"] = list(self.center)
+        if self.bounds:
+            entry["bounds"] = list(self.bounds)
+        return entry
+
+
+def catalog_stamp(path):
+    return source_stamp(path) if os.path.exists(path) else None
+
+
+def load_catalog(path=DEFAULT_CATALOG, default_csv=None, default_collection=None):
+    # {자치구: District} (등록 순서 유지), 카탈로그 파일이 없으면 기본 자치구 하나
+    if not os.path.exists(path):
+        return OrderedDict([(DEFAULT_DISTRICT, District(DEFAULT_DISTRICT, default_csv, default_collection,
+                                                        DEFAULT_CENTER))])
+    with open(path, encoding='utf-8') as f:
+        entries = json.load(f)["districts"]
+    base = os.path.dirname(os.path.abspath(path))
+    catalog = OrderedDict()
+    for entry in entries:
+        district = District.from_dict(entry)
+        # 카탈로그 기준 상대 경로
+        if not os.path.isabs(district.csv):
+            district.csv = os.path.join(base, district.csv)
+        catalog[district.name] = district
+    return catalog
+
+
+def save_catalog(path, catalog):
+    base = os.path.dirname(os.path.abspath(path))
+    entries = []
+    for district in catalog.values():
+        entry = district.to_dict()
+        if os.path.isabs(entry["csv"]) and os.path.dirname(entry["csv"]) == base:
+            entry["csv"] = os.path.basename(entry["csv"])
+        entries.append(entry)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({"districts": entries}, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def table_bounds(df):
+    # 업소 위치의 (남, 서, 북, 동)
+    lat = df['latitude'].to_numpy(dtype=np.float64)
+    lon = df['longitude'].to_numpy(dtype=np.float64)
+    if len(lat) == 0:
+        return None
+    return float(lat.min()), float(lon.min()), float(lat.max()), float(lon.max())
+
+
+# --------------------------------->
+# 샤드 (자치구 하나의 메모리 데이터)
+# --------------------------------->
+def estimate_bytes(value, depth=3):
+    # 대략적인 메모리 사용량: 배열/테이블은 정확히, 그 외 객체는 속성을 몇 단계까지 따라가며 합산
+    if isinstance(value, np.ndarray):
+        if value.dtype == object:
+            return value.nbytes + sum(sys.getsizeof(v) for v in value.tolist())
+        return value.nbytes
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, (pd.Series, pd.Index)):
+        return int(value.memory_usage(deep=True))
+    size = sys.getsizeof(value)
+    if depth <= 0 or isinstance(value, (str, bytes, int, float)):
+        return size
+    if isinstance(value, dict):
+        return size + sum(estimate_bytes(k, 0) + estimate_bytes(v, depth - 1) for k, v in value.items())
+    if isinstance(value, (list, tuple, set)):
+        return size + sum(estimate_bytes(v, depth - 1) for v in value)
+    if hasattr(value, '__dict__'):
+        return size + sum(estimate_bytes(v, depth - 1) for v in vars(value).values())
+    return size
+
+
+class Shard:
+    def __init__(self, district):
+        started = time.perf_counter()
+        self.district = district
+        self.df, self.data_version = load_shop_table(district.csv)
+        self.filter_index = ShopFilterIndex(self.df)
+        self.spatial_index = SpatialIndex.from_frame(self.df)
+        self.scores = score_shops(self.df)
+        self.stats = StatsCube.from_frame(self.df)  # 동/업종/상품권/착한업소 조합별 통계
+        # 업소 행 → 문서 id, 문서 id → 행 (같은 업소가 여러 행이면 ingest.py처럼 마지막 행 기준)
+        self.doc_ids = shop_doc_ids(self.df)
+        self.doc_rows = {doc_id: row for row, doc_id in enumerate(self.doc_ids)}
+        self.bounds = district.bounds or table_bounds(self.df)
+        self.center = district.center or (
+            ((self.bounds[0] + self.bounds[2]) / 2, (self.bounds[1] + self.bounds[3]) / 2)
+            if self.bounds else DEFAULT_CENTER
+        )
+        self._popup_table = None
+        self._bm25 = None  # (컬렉션 버전, BM25 색인)
+        self._lock = threading.Lock()
+        self.load_seconds = time.perf_counter() - started
+        self.memory_bytes = self._estimate()
+
+    @property
+    def name(self):
+        return self.district.name
+
+    def _estimate(self):
+        return sum(estimate_bytes(v) for v in (self.df, self.filter_index, self.spatial_index, self.scores,
+                                                self.stats, self.doc_ids, self.doc_rows, self._popup_table,
+                                                self._bm25))
+
+    def popup_table(self):
+        # 업소별 상세 정보 HTML (지도에서 처음 클릭할 때 생성)
+        with self._lock:
+            if self._popup_table is None:
+                self._popup_table = build_popup_table(self.df)
+                self.memory_bytes = self._estimate()
+            return self._popup_table
+
+    def bm25(self, collection):
+        # 컬렉션 문서 BM25 색인 (컬렉션이 다시 적재되어 버전이 바뀌면 새로 생성)
+        version = collection_version(collection)
+        with self._lock:
+            if self._bm25 is None or self._bm25[0] != version:
+                self._bm25 = (version, load_bm25_index(collection))
+                self.memory_bytes = self._estimate()
+            return self._bm25[1]
+
+    def contains(self, lat, lon, radius_m=0):
+        # (lat, lon) 반경 radius_m 원이 자치구 업소 범위와 겹치는지
+        if not self.bounds:
+            return False
+        south, west, north, east = radius_bbox(lat, lon, radius_m) if radius_m else (lat, lon, lat, lon)
+        return not (north < self.bounds[0] or south > self.bounds[2] or east < self.bounds[1] or west > self.bounds[3])
+
+
+class ShardCache:
+    # 불러온 샤드를 메모리 예산(바이트) 안에서 LRU로 유지 (모든 세션에서 공유)
+    def __init__(self, budget_bytes, loader=Shard):
+        self.budget_bytes = budget_bytes
+        self.loader = loader
+        self._entries = OrderedDict()  # 자치구 → (원본 stamp, 샤드)
+        self._lock = threading.Lock()
+        self._loading = {}  # 자치구 → 불러오는 중 잠금 (같은 자치구를 동시에 두 번 읽지 않도록)
+        self.loads = 0
+        self.hits = 0
+        self.evictions = 0
+
+    def get(self, district):
+        stamp = source_stamp(district.csv)
+        with self._lock:
+            entry = self._entries.get(district.name)
+            if entry is not None and entry[0] == stamp:
+                self._entries.move_to_end(district.name)
+                self.hits += 1
+                # 색인/상세 정보가 나중에 추가되어 커진 만큼도 예산에 반영
+                self._evict(keep=district.name)
+                return entry[1]
+            loading = self._loading.setdefault(district.name, threading.Lock())
+
+        # 읽기는 전체 잠금 밖에서 (다른 자치구 조회를 막지 않도록)
+        with loading:
+            with self._lock:
+                entry = self._entries.get(district.name)
+                if entry is not None and entry[0] == stamp:
+                    self._entries.move_to_end(district.name)
+                    return entry[1]
+            shard = self.loader(district)
+            with self._lock:
+                self._entries[district.name] = (stamp, shard)
+                self._entries.move_to_end(district.name)
+                self.loads += 1
+                self._evict(keep=district.name)
+            return shard
+
+    def _evict(self, keep):
+        # 예산을 넘으면 오래 안 쓴 샤드부터 내림 (방금 요청한 샤드는 예산보다 커도 유지)
+        while self._used() > self.budget_bytes and len(self._entries) > 1:
+            name = next(iter(self._entries))
+            if name == keep:
+                self._entries.move_to_end(name)
+                continue
+            del self._entries[name]
+            self.evictions += 1
+
+    def _used(self):
+        return sum(shard.memory_bytes for _, shard in self._entries.values())
+
+    def stats(self):
+        with self._lock:
+            return {
+                'loaded': list(self._entries),
+                'used_bytes': self._used(),
+                'budget_bytes': self.budget_bytes,
+                'loads': self.loads,
+                'hits': self.hits,
+                'evictions': self.evictions,
+            }
+
+
+# --------------------------------->
+# 카탈로그 관리 CLI
+# --------------------------------->
+def register(path, name, csv_path, collection):
+    catalog = load_catalog(path) if os.path.exists(path) else OrderedDict()
+    df, _ = load_shop_table(csv_path)
+    bounds = table_bounds(df)
+    center = (float(df['latitude'].median()), float(df['longitude'].median())) if len(df) else None
+    catalog[name] = District(name, os.path.abspath(csv_path), collection, center, bounds)
+    save_catalog(path, catalog)
+    return catalog[name]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="자치구 샤드 카탈로그 관리")
+    parser.add_argument("--catalog", default=DEFAULT_CATALOG, help="카탈로그 경로")
+    commands = parser.add_subparsers(dest="command", required=True)
+    add = commands.add_parser("register", help="자치구 등록 (업소 위치 범위와 지도 중심을 계산해 저장)")
+    add.add_argument("name", help="자치구 이름")
+    add.add_argument("--csv", required=True, help="업소 CSV 경로")
+    add.add_argument("--collection", required=True, help="Chroma 컬렉션 이름 (ingest.py --collection)")
+    commands.add_parser("list", help="등록된 자치구 목록")
+    args = parser.parse_args(argv)
+
+    if args.command == "register":
+        district = register(args.catalog, args.name, args.csv, args.collection)
+        print(f"{district.name} 등록: {district.csv} → 컬렉션 {district.collection}, 범위 {district.bounds}")
+    else:
+        for district in load_catalog(args.catalog).values():
+            print(f"{district.name}\t{district.csv}\t{district.collection}\t{district.bounds}")
+
+
+if __name__ == "__main__":
+    main()
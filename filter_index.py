@@ -0,0 +1,183 @@
+# 사이드바 필터용 인덱스
+# 사업장명/도로명주소는 글자 2-gram(한글 음절 바이그램) 역색인, 업종/동/사랑상품권은 값별 posting list로 미리 만들어 두고
+# 필터 조합을 정렬된 행 번호 배열의 교집합으로 계산한다. (DataFrame 복사 없음)
+import numpy as np  # 수치 연산 라이브러리
+
+EMPTY_IDS = np.empty(0, dtype=np.int32)
+
+
+def normalize_text(text):
+    # 대소문자 무시 + 연속 공백 정리 (검색어와 색인 대상에 똑같이 적용)
+    return ' '.join(str(text).lower().split())
+
+
+# 문자 n-gram(1글자/2글자)을 정수 코드로 표현: 1글자는 코드포인트, 2글자는 (앞 << 21) | 뒤
+# (유니코드 코드포인트는 21비트 이내라 두 종류가 겹치지 않음)
+_CHAR_BITS = 21
+_ROW_BITS = 21  # 한 번에 색인하는 청크 행 수 한계 (2^21)
+_CHUNK_ROWS = 1 << 16
+
+
+def _query_codes(text):
+    if len(text) == 1:
+        return {ord(text)}
+    return {(ord(text[i]) << _CHAR_BITS) | ord(text[i + 1]) for i in range(len(text) - 1)}
+
+
+def _chunk_pairs(texts, start):
+    # 텍스트 묶음 → 중복 없는 (gram 코드, 행 번호) 쌍을 하나의 uint64로 묶은 배열
+    width = max(1, max(len(t) for t in texts))
+    chars = np.array(texts, dtype=f'U{width}').view(np.uint32).reshape(len(texts), width).astype(np.uint64)
+    local_rows = np.broadcast_to(np.arange(len(texts), dtype=np.uint64)[:, None], chars.shape)
+    uni_mask = chars != 0
+    bi_mask = uni_mask[:, 1:]
+    bigrams = (chars[:, :-1] << np.uint64(_CHAR_BITS)) | chars[:, 1:]
+    codes = np.concatenate((chars[uni_mask], bigrams[bi_mask]))
+    rows = np.concatenate((local_rows[uni_mask], local_rows[:, 1:][bi_mask]))
+    packed = np.sort((codes << np.uint64(_ROW_BITS)) | rows)
+    packed = packed[np.concatenate(([True], packed[1:] != packed[:-1]))]
+    codes = packed >> np.uint64(_ROW_BITS)
+    rows = (packed & np.uint64((1 << _ROW_BITS) - 1)).astype(np.int64) + start
+    return codes, rows
+
+
+def intersect_ids(a, b):
+    # 정렬된 중복 없는 행 번호 배열 두 개의 교집합
+    if len(a) > len(b):
+        a, b = b, a
+    if len(a) == 0:
+        return EMPTY_IDS
+    if len(a) * 8 < len(b):
+        # 한쪽이 훨씬 작으면 이진 탐색으로 확인
+        pos = np.searchsorted(b, a)
+        pos[pos == len(b)] = 0
+        return a[b[pos] == a]
+    return np.intersect1d(a, b, assume_unique=True)
+
+
+def _group_ids(keys):
+    # 키 배열 → {키: 정렬된 행 번호 배열}
+    if len(keys) == 0:
+        return {}
+    order = np.argsort(keys, kind='stable').astype(np.int32)
+    sorted_keys = keys[order]
+    bounds = np.flatnonzero(sorted_keys[1:] != sorted_keys[:-1]) + 1
+    starts = np.concatenate(([0], bounds))
+    ends = np.concatenate((bounds, [len(keys)]))
+    return {sorted_keys[s]: order[s:e] for s, e in zip(starts, ends)}
+
+
+# --------------------------------->
+# 텍스트 역색인 (부분 문자열 / 접두어 검색)
+# --------------------------------->
+class TextIndex:
+    def __init__(self, values):
+        self.texts = np.array([normalize_text(v) if isinstance(v, str) else '' for v in values], dtype=object)
+        self.size = len(self.texts)
+
+        # 역색인을 CSR 형태로 저장: gram 코드(정렬) → rows[offsets[k]:offsets[k + 1]]
+        code_parts, row_parts = [], []
+        for start in range(0, self.size, _CHUNK_ROWS):
+            codes, rows = _chunk_pairs(self.texts[start:start + _CHUNK_ROWS].tolist(), start)
+            code_parts.append(codes)
+            row_parts.append(rows)
+        codes = np.concatenate(code_parts) if code_parts else np.empty(0, dtype=np.uint64)
+        rows = np.concatenate(row_parts) if row_parts else np.empty(0, dtype=np.int64)
+        # 청크는 행 순서대로이므로 안정 정렬하면 gram별 행 번호도 정렬 상태 유지
+        order = np.argsort(codes, kind='stable')
+        codes = codes[order]
+        self._rows = rows[order].astype(np.int32)
+        starts = np.flatnonzero(np.concatenate(([True], codes[1:] != codes[:-1]))) if len(codes) else EMPTY_IDS
+        self._codes = codes[starts]
+        self._offsets = np.append(starts, len(codes)).astype(np.int64)
+
+        # 접두어 검색용: 정규화된 문자열 정렬 순서
+        self._sorted_order = np.argsort(self.texts.astype(str), kind='stable').astype(np.int32)
+        self._sorted_texts = self.texts[self._sorted_order].astype(str)
+
+    def postings(self, code):
+        k = np.searchsorted(self._codes, code)
+        if k == len(self._codes) or self._codes[k] != code:
+            return EMPTY_IDS
+        return self._rows[self._offsets[k]:self._offsets[k + 1]]
+
+    def contains(self, query):
+        # 검색어를 부분 문자열로 포함하는 행 번호 (정렬됨)
+        query = normalize_text(query)
+        if not query:
+            return np.arange(self.size, dtype=np.int32)
+        lists = sorted((self.postings(code) for code in _query_codes(query)), key=len)
+        candidates = lists[0]
+        for ids in lists[1:]:
+            if len(candidates) == 0:
+                break
+            candidates = intersect_ids(candidates, ids)
+        if len(query) <= 2 or len(candidates) == 0:
+            return candidates
+        # 바이그램이 모두 있어도 연속으로 이어지지 않을 수 있으므로 후보만 직접 확인
+        texts = self.texts
+        return np.array([i for i in candidates if query in texts[i]], dtype=np.int32)
+
+    def prefix(self, query, limit=None):
+        # 검색어로 시작하는 행 번호 (입력 중 자동완성용, 이름 순)
+        query = normalize_text(query)
+        lo = np.searchsorted(self._sorted_texts, query, side='left')
+        hi = np.searchsorted(self._sorted_texts, query + '\U0010ffff', side='left')
+        if limit is not None:
+            hi = min(hi, lo + limit)
+        return self._sorted_order[lo:hi]
+
+
+# --------------------------------->
+# 업소 필터 인덱스
+# --------------------------------->
+class ShopFilterIndex:
+    def __init__(self, df, text_columns=('사업장명', '도로명주소'), facet_columns=('업종', '동', '사랑상품권')):
+        self.size = len(df)
+        self.all_ids = np.arange(self.size, dtype=np.int32)
+        self.text = {col: TextIndex(df[col].tolist()) for col in text_columns}
+        self.facets = {}
+        for col in facet_columns:
+            values = df[col].astype(object).where(df[col].notna(), None).to_numpy()
+            keys = np.array(['' if v is None else str(v) for v in values], dtype=object)
+            groups = _group_ids(keys)
+            groups.pop('', None)
+            self.facets[col] = groups
+
+    def facet_ids(self, column, values):
+        # 여러 값 중 하나라도 해당하는 행 (값별 posting은 서로 겹치지 않음)
+        groups = self.facets[column]
+        lists = [groups[v] for v in values if v in groups]
+        if not lists:
+            return EMPTY_IDS
+        if len(lists) == 1:
+            return lists[0]
+        return np.sort(np.concatenate(lists))
+
+    def search(self, query, columns=('사업장명',)):
+        # 여러 텍스트 컬럼 중 어디든 포함되면 매칭
+        result = None
+        for col in columns:
+            ids = self.text[col].contains(query)
+            result = ids if result is None else np.union1d(result, ids)
+        return EMPTY_IDS if result is None else result.astype(np.int32, copy=False)
+
+    def prefix(self, query, column='사업장명', limit=20):
+        return self.text[column].prefix(query, limit=limit)
+
+    def query(self, search=None, search_columns=('사업장명',), **facets):
+        # 활성 필터를 모두 만족하는 행 번호 (정렬됨)
+        # facets 예: 업종=['한식', '분식'], 사랑상품권=['가능'] (값이 비어있으면 필터 미적용)
+        lists = []
+        for column, values in facets.items():
+            if values:
+                lists.append(self.facet_ids(column, values))
+        if search:
+            lists.append(self.search(search, search_columns))
+        if not lists:
+            return self.all_ids
+        lists.sort(key=len)
+        result = lists[0]
+        for ids in lists[1:]:
+            result = intersect_ids(result, ids)
+        return result
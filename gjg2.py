@@ -1,19 +1,36 @@
 __import__('pysqlite3')
 import sys
 sys.modules['sqlite3'] = sys.modules.pop('pysqlite3')
+import time
+SCRIPT_STARTED = time.perf_counter()  # 실행 시작 시각 (임포트 / 첫 화면 표시까지 걸린 시간 측정용)
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 
 # 대화형 챗봇 애플리케이션에 필요한 라이브러리 임포트
+# (chromadb, openai, folium처럼 임포트가 오래 걸리는 라이브러리는 해당 기능을 처음 쓸 때 임포트)
 import streamlit as st  # type: ignore # 웹 페이지를 쉽게 만들 수 있는 라이브러리
 import json             # JSON 데이터 처리 라이브러리
-import chromadb         # 확장성 있는 벡터 데이터베이스 라이브러리
-from chromadb.utils import embedding_functions # 텍스트를 숫자 벡터로 변환하는 함수
-from openai import OpenAI  # OpenAI API 사용 라이브러리
+from llm_cache import DEFAULT_CACHE_PATH, CachedChatStream, ResponseCache, SingleFlight, prompt_key, question_alias  # LLM 답변 캐시
+from context_packer import count_tokens, pack_context  # 토큰 예산 기반 문맥 구성
+from prompts import SYSTEM_PROMPT, build_history_messages, build_user_prompt  # 평가 프롬프트
+from chat_store import DEFAULT_CHAT_PATH, ChatStore, conversation_context  # 대화 기록 저장 / 요약
 import re             # 정규표현식 라이브러리
 from PIL import Image    # 이미지 처리 라이브러리
-import folium          # 지도 시각화 라이브러리
 import pandas as pd      # 데이터 분석 라이브러리
-from streamlit_folium import st_folium # Streamlit에서 Folium 지도를 사용하기 위한 라이브러리
-from folium import IFrame  # Folium에서 HTML 내용을 표시하기 위한 라이브러리
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx  # 작업 스레드에서 st 호출용
+from districts import ShardCache, catalog_stamp, load_catalog  # 자치구별 데이터 샤드
+from map_layer import add_district_stats_layer, add_shop_markers, find_clicked_shop, render_map_payload, show_map  # 지도 마커 레이어 / 표시
+from stats_cube import answer_stats_question, frame_breakdown  # 동/업종별 통계 (큐브는 자치구 샤드에서 생성)
+from map_cache import MapCache, map_cache_key  # 필터 조합별 지도 캐시
+from spatial_index import LANDMARKS, parse_location_query, snap_bbox  # 업소 위치 공간 인덱스
+from retrieval_cache import RetrievalCache, collection_version  # 벡터 검색 캐시
+from hybrid_search import HashingEmbeddingFunction, build_where, reciprocal_rank_fusion, rows_digest  # BM25 + 벡터 하이브리드 검색
+from scoring import describe_score  # 착한가격업소 평가표 자동 채점
+from tracing import RunTrace, TraceSink  # 단계별 소요 시간 기록
+from warmup import Warmup  # 첫 질문 전 백그라운드 사전 준비
+import numpy as np      # 수치 연산 라이브러리
 
 
 # --------------------------------->
@@ -24,20 +41,98 @@ st.set_page_config(
     layout="wide"
 )
 
+# --------------------------------->
+# 실행 환경 설정 (벤치마크/테스트에서는 환경 변수로 변경)
+# --------------------------------->
+SHOP_CSV = os.environ.get("GJG_SHOP_CSV", "광진구_추천업소_최종데이터333.csv")
+CHROMA_PATH = os.environ.get("GJG_CHROMA_PATH", "chroma_db3")  # ":memory:"이면 프로세스 내 메모리 DB
+VECTOR_BACKEND = os.environ.get("GJG_VECTOR_BACKEND", "chroma")  # "matrix"이면 행렬 벡터 저장소 (vector_store.py)
+MATRIX_PATH = os.environ.get("GJG_MATRIX_PATH", "vector_matrix")  # 행렬 벡터 저장소 경로
+COLLECTION_NAME = os.environ.get("GJG_COLLECTION", "gjg_report")
+EMBEDDING = os.environ.get("GJG_EMBEDDING", "default")  # "hashing"이면 모델 다운로드 없는 해시 임베딩
+LLM_CACHE_PATH = os.environ.get("GJG_LLM_CACHE", DEFAULT_CACHE_PATH)
+CHAT_DB_PATH = os.environ.get("GJG_CHAT_DB", DEFAULT_CHAT_PATH)  # 대화 기록 파일 (새로고침 후에도 이어서 보기)
+CHAT_PAGE = 10  # 화면에 한 번에 그리는 메시지 수 (더 오래된 메시지는 "이전 대화 더 보기"로 불러옴)
+HISTORY_TURNS = 2  # 후속 질문에 그대로 보내는 최근 턴 수 (그 이전은 요약으로 보냄)
+TRACE_LOG = os.environ.get("GJG_TRACE_LOG")    # 설정하면 실행마다 단계별 소요 시간을 JSONL로 추가
+TRACE_PROM = os.environ.get("GJG_TRACE_PROM")  # 설정하면 단계별 누적 통계를 Prometheus 텍스트 형식으로 기록
+DISTRICT_CATALOG = os.environ.get("GJG_DISTRICTS", "districts.json")  # 자치구 카탈로그 (없으면 위 CSV/컬렉션 한 곳)
+SHARD_MEMORY_MB = int(os.environ.get("GJG_SHARD_MEMORY_MB", "1024"))  # 불러온 자치구 데이터의 메모리 예산
+CHROMA_MEMORY_MB = int(os.environ.get("GJG_CHROMA_MEMORY_MB", "0"))  # 0이 아니면 Chroma 벡터 색인 메모리 예산(LRU)
+WARMUP = os.environ.get("GJG_WARMUP", "1") != "0"  # 첫 화면 표시 후 벡터 DB/임베딩 모델/색인을 미리 로드
+
+def get_secret(name):
+    # secrets.toml이 없거나 값이 없으면 None (API 키가 없으면 검색 결과만 보여주는 간단한 응답으로 동작)
+    try:
+        return st.secrets.get(name)
+    except FileNotFoundError:
+        return None
+
+# 이번 실행의 단계별 소요 시간 (끝에서 모든 세션이 공유하는 TraceSink로 내보냄)
+@st.cache_resource(show_spinner=False)
+def get_trace_sink(jsonl_path=TRACE_LOG, prom_path=TRACE_PROM):
+    return TraceSink(jsonl_path, prom_path)
+
+trace = RunTrace(st.session_state.setdefault("trace_session", uuid.uuid4().hex[:8]), started=SCRIPT_STARTED)
+trace.mark("imports")
+
+# --------------------------------->
+# 메인 화면 UI
+# --------------------------------->
+# 데이터 로드 전에 제목부터 표시 (첫 화면이 빨리 보이도록)
+st.title("광진구 착한가격업소 발굴 인공지능 플랫폼")
+st.write("착한가격 업소 데이터에 대해 질문해보세요.")
+trace.mark("first_render")
+
 # --------------------------------->
 # 데이터 로드 및 전처리
 # --------------------------------->
-df = pd.read_csv("광진구_추천업소_최종데이터333.csv")
-# 위도, 경도 결측치 제거
-df = df.dropna(subset=['latitude', 'longitude'])
+# 자치구 카탈로그 (파일이 바뀌면 다시 읽음)
+@st.cache_resource(show_spinner=False)
+def get_district_catalog(path, stamp):
+    return load_catalog(path, SHOP_CSV, COLLECTION_NAME)
+
+# 자치구별 테이블 스냅샷과 인덱스는 선택될 때 처음 불러와 프로세스 전체(모든 세션)에서 공유하고,
+# 메모리 예산을 넘으면 오래 안 쓴 자치구부터 내림 (CSV가 바뀌면 다시 로드)
+# 샤드의 DataFrame은 세션 간 공유되므로 수정하지 말 것
+@st.cache_resource(show_spinner=False)
+def get_shard_cache(budget_mb=SHARD_MEMORY_MB):
+    return ShardCache(budget_mb << 20)
+
+district_catalog = get_district_catalog(DISTRICT_CATALOG, catalog_stamp(DISTRICT_CATALOG))
+shard_cache = get_shard_cache()
+# 자치구가 여러 곳 등록된 경우만 선택 상자 표시
+if len(district_catalog) > 1:
+    selected_district = st.sidebar.selectbox("자치구", list(district_catalog))
+else:
+    selected_district = next(iter(district_catalog))
+
+with trace.span("data_load", district=selected_district) as span:
+    shard = shard_cache.get(district_catalog[selected_district])
+    span.set(rows=len(shard.df))
+df, data_version = shard.df, shard.data_version
 
 # --------------------------------->
 # ChromaDB 관련 함수 정의
 # --------------------------------->
-# ChromaDB 클라이언트 초기화 (캐싱 적용)
-@st.cache_resource
+# ChromaDB 클라이언트 초기화 (캐싱 적용, 사전 준비 스레드에서도 부르므로 스피너 없이)
+@st.cache_resource(show_spinner=False)
 def init_chroma_client():
-    return chromadb.PersistentClient(path="chroma_db3")
+    if VECTOR_BACKEND == "matrix":
+        # 메모리 매핑 float16 행렬 + 정확 검색 (Chroma와 같은 컬렉션 메서드를 구현, vector_store.py export로 생성)
+        from vector_store import MatrixClient
+        return MatrixClient(MATRIX_PATH)
+
+    import chromadb  # 확장성 있는 벡터 데이터베이스 라이브러리 (챗봇 검색을 처음 쓸 때 임포트)
+    from chromadb.config import Settings  # ChromaDB 설정 (벡터 색인 메모리 예산)
+
+    if CHROMA_PATH == ":memory:":
+        return chromadb.EphemeralClient()
+    if CHROMA_MEMORY_MB:
+        # 자치구 컬렉션이 많을 때 최근에 쓴 컬렉션의 벡터 색인만 메모리에 유지
+        return chromadb.PersistentClient(path=CHROMA_PATH, settings=Settings(
+            chroma_segment_cache_policy="LRU", chroma_memory_limit_bytes=CHROMA_MEMORY_MB << 20))
+    return chromadb.PersistentClient(path=CHROMA_PATH)
 
 # ChromaDB 클라이언트 가져오기 (캐싱 적용)
 @st.cache_resource
@@ -56,12 +151,6 @@ def get_available_collections():
         st.sidebar.error(f"컬렉션 목록 로드 오류: {e}")
         return []
 
-# --------------------------------->
-# 메인 화면 UI
-# --------------------------------->
-st.title("광진구 착한가격업소 발굴 인공지능 플랫폼")
-st.write("착한가격 업소 데이터에 대해 질문해보세요.")
-
 
 # --------------------------------->
 # 사이드바 설정 UI
@@ -74,55 +163,99 @@ with st.sidebar:
     except FileNotFoundError:
         st.warning("사이드바 이미지를 찾을 수 없습니다.")   
 
-    # 컬렉션션 섹션
-    collection_name = "gjg_report"
-    # 사용 가능한 컬렉션을 불러오되, 'gjg_report'만 남기기
-    all_cols = get_available_collections()
-    allowed = [c for c in all_cols if c == "gjg_report"]
+    # 컬렉션션 섹션 (컬렉션은 질문할 때 열어서 첫 화면 표시에 벡터 DB 로드 시간이 들지 않도록 함)
+    collection_name = shard.district.collection
 
     # 설정 섹션
     st.sidebar.markdown("---")    
     # api_key = st.text_input("OpenAI API 키를 입력하세요", type="password")
-    api_key = st.secrets["OPENAI_API_KEY"]
+    api_key = get_secret("OPENAI_API_KEY")
+    # 로컬 스텁 서버 등 다른 OpenAI 호환 주소를 쓸 때만 설정 (없으면 OPENAI_BASE_URL 환경 변수 또는 기본 주소)
+    openai_base_url = get_secret("OPENAI_BASE_URL")
+    llm_model = "gpt-4o-mini"
+    # 검색 문서로 채우는 문맥의 최대 토큰 수
+    context_token_budget = 3000
 
     # 필터링 섹션
     shop_search = st.text_input("🔍 사업장명 검색")      
 
     # 지도 필터링 UI   
     st.sidebar.subheader("지도 필터")
-    selected_category = st.sidebar.multiselect("업종 선택", df['업종'].unique())
+    selected_category = st.sidebar.multiselect("업종 선택", list(df['업종'].unique()))
     상품권_선택 = st.sidebar.selectbox("서울사랑상품권 가맹", ['전체', '가능', '불가능'])
 
+    # 위치 기반 필터 UI
+    st.sidebar.subheader("주변 업소 찾기")
+    # 선택한 자치구 업소 범위 안의 기준 위치만
+    기준_위치 = st.sidebar.selectbox(
+        "기준 위치", ['선택 안 함'] + [name for name, point in LANDMARKS.items() if shard.contains(*point)])
+    반경 = st.sidebar.slider("반경 (m)", 100, 2000, 500, step=100, disabled=기준_위치 == '선택 안 함')
+    화면_영역만 = st.sidebar.checkbox("지도 화면 안의 업소만 표시")
+    동별_보기 = st.sidebar.checkbox("동별 평균 가격 보기 (업소 마커 대신)")
+
+    # 여러 자치구가 등록된 경우: 챗봇 검색을 다른 자치구로 넓힘 (검색어/업종/상품권/위치 조건은 같이 적용)
+    other_districts = [name for name in district_catalog if name != selected_district]
+    if other_districts:
+        st.sidebar.subheader("챗봇 검색 범위")
+        검색_자치구 = st.sidebar.multiselect("함께 검색할 자치구", other_districts)
+    else:
+        검색_자치구 = []
+
 # --------------------------------->
 # 지도 필터링 로직
 # --------------------------------->
-filtered_df = df.copy()
-filters_applied = False  # 필터가 적용되었는지 여부를 추적하는 변수
+# 필터/공간 인덱스와 평가표 자동 채점 결과는 자치구 샤드를 불러올 때 한 번 만들어 모든 세션에서 공유
+filter_index = shard.filter_index
+spatial_index = shard.spatial_index
+shop_scores = shard.scores
+
+# 검색어(대소문자 구분 없이 포함 매칭), 업종, 상품권 조건을 행 번호 교집합으로 계산
+filter_span = trace.begin("filter")
+filtered_ids = filter_index.query(
+    search=shop_search,
+    업종=selected_category,
+    사랑상품권=[상품권_선택] if 상품권_선택 != '전체' else None,
+)
+filters_applied = bool(shop_search or selected_category or 상품권_선택 != '전체')
 
-# 검색 필터링
-if shop_search:
-    # 대소문자 구분 없이 포함 매칭
-    filtered_df = filtered_df[filtered_df['사업장명'].str.contains(shop_search, case=False, na=False)]
+# 기준 위치 반경 필터 (가까운 순으로 정렬)
+near = None
+if 기준_위치 != '선택 안 함':
+    near = (기준_위치, 반경)
+    filtered_ids, _ = spatial_index.radius(*LANDMARKS[기준_위치], 반경, ids=filtered_ids)
     filters_applied = True
 
-# 카테고리 필터링
-if selected_category:
-    filtered_df = filtered_df[filtered_df['업종'].isin(selected_category)]
-    filters_applied = True
+# 지도 화면 범위 필터: 직전 실행에서 지도가 돌려준 화면 범위를 격자에 맞춰 넓힌 뒤 그 안의 업소만 지도에 보냄
+map_view = (st.session_state.get("shop_map") or {}) if 화면_영역만 else {}
+view_bbox = None
+if map_view.get("bounds"):
+    sw, ne = map_view["bounds"]["_southWest"], map_view["bounds"]["_northEast"]
+    if sw.get("lat") is not None and ne.get("lat") is not None:
+        view_bbox = snap_bbox((sw["lat"], sw["lng"], ne["lat"], ne["lng"]), spatial_index.cell_deg * 5)
+        filtered_ids = filtered_ids[np.isin(filtered_ids, spatial_index.bbox(*view_bbox))]
+        filters_applied = True
 
-# 상품권 필터링
-if 상품권_선택 != '전체':
-    filtered_df = filtered_df[filtered_df['사랑상품권'] == 상품권_선택]
-    filters_applied = True
+filtered_df = df.take(filtered_ids) if filters_applied else df
+filter_span.end(rows=len(filtered_df))
+
+# 챗봇 검색에도 같은 필터 적용: 업종/상품권은 Chroma where 조건, 검색어/위치/화면 범위까지 걸리면 허용 업소 행으로 전달
+retrieval_where = build_where(selected_category, 상품권_선택 if 상품권_선택 != '전체' else None)
+retrieval_rows = filtered_ids if filters_applied else None
+
+# 입력 중인 검색어로 시작하는 업소명 제안
+if shop_search:
+    suggestions = df['사업장명'].take(filter_index.prefix(shop_search, limit=5)).tolist()
+    if suggestions:
+        st.sidebar.caption("추천 검색어: " + ", ".join(suggestions))
 
 # 필터링된 결과가 있을 경우 테이블 표시
 if filters_applied and not filtered_df.empty:
     st.markdown("### 필터링된 업소 정보")
     # 보여주고 싶은 컬럼만 선택
     cols_to_show = ['사업장명', '업종', '사랑상품권', '도로명주소']
-    # 대화형 테이블 (스크롤·검색 가능)
+    # 대화형 테이블 (스크롤·검색 가능), 자동 채점 점수/판정 포함
     st.dataframe(
-        filtered_df[cols_to_show].reset_index(drop=True), 
+        filtered_df[cols_to_show].join(shop_scores[['점수', '판정']]).reset_index(drop=True), 
         use_container_width=True)
 elif filters_applied and filtered_df.empty:
     # Streamlit에서 같은 메시지가 중복 출력되지 않도록 경고 메시지 조건을 분리
@@ -148,82 +281,90 @@ else:
     st.info("필터가 적용되지 않았습니다.")
 
 # 지도 중심점 설정
-center = [37.5502596, 127.073139]
-m = folium.Map(location=center, zoom_start=15)
-
-# 업종별 색상 정의
-category_colors = {
-    "한식": "darkred",        # 깊고 전통적인 느낌
-    "분식": "lightred",         # 밝고 활기찬 느낌
-    "일식": "blue",          # 차분하고 정갈한 느낌
-    "중국식": "darkblue",         # 화려하고 풍성한 느낌
-    "까페": "teal",          # 세련되고 편안한 느낌
-    "식육(숯불구이)": "firebrick", # 강렬하고 먹음직스러운 느낌
-    "김밥(도시락)": "mediumpurple", # 산뜻하고 깔끔한 느낌
-    "통닭(치킨)": "goldenrod",   # 고소하고 따뜻한 느낌
-    "경양식": "sandybrown",    # 부드럽고 향수를 불러일으키는 느낌
-    "기타": "gray",           # 무난하고 포괄적인 느낌
-    "외국음식전문점(인도,태국등등)": "olive", # 이국적이고 다채로운 느낌
-    "횟집": "skyblue",        # 시원하고 신선한 느낌
-    "라이브카페": "darkviolet",  # 분위기 있고 개성 있는 느낌
-    "커피숍": "chocolate",      # 따뜻하고 부드러운 느낌
-    "편의점점": "forestgreen",   # 친근하고 활기찬 느낌
-    "기타 휴게음식점점": "dimgray", # 차분하고 보조적인 느낌
-}
-
-
-# 필터가 선택되지 않은 경우 광진구 중심 표시
-if not filters_applied:
-    folium.Marker(
-        location=center,
-        popup="광진구 중심",
-        tooltip="광진구",
-        icon=folium.Icon(color="red", icon="glyphicon-map-marker")
-    ).add_to(m)
-    
-# 필터링된 결과가 있는 경우: 업소 마커 추가
-elif not filtered_df.empty:
-    for idx, row in filtered_df.iterrows():
-        업종 = row['업종']
-        color = category_colors.get(업종, "blue")
-        
-        html = f"""
-<div style="font-family: 'Arial'; border-radius: 8px; padding: 10px; background-color: #f9f9f9;
-            box-shadow: 2px 2px 6px rgba(0,0,0,0.1); display: flex; flex-direction: column; justify-content: flex-start;">
-    <h4 style="margin: 0 auto 8px auto; color: #2c3e50; text-align: center;">{row['사업장명']}</h4>
-    <p style="margin: 3px 0;"><b>업종:</b> {row['업종']}</p>
-    <p style="margin: 3px 0;"><b>평균가격:</b> {row['가격']}</p>
-    <p style="margin: 3px 0;"><b>상품권 가맹:</b> {row['사랑상품권']}</p>
-    <p style="margin: 3px 0;"><b>위생등급:</b> {row['위생등급'] if pd.notna(row['위생등급']) else '미지정'}</p>
-    <p style="margin: 3px 0;"><b>행정처분:</b> {row['행정처분'] if pd.notna(row['행정처분']) else '없음'}</p>
-</div>
-
-"""
-        iframe = IFrame(html, width=300, height=240)
-        popup = folium.Popup(iframe, max_width=300)
-        tooltip = row['사업장명']
-        marker = folium.Marker(
-            location=[row['latitude'], row['longitude']],
-            popup=popup,
-            tooltip=tooltip,
-            icon=folium.Icon(color=color, icon="glyphicon-search")
-        )
-        marker.add_to(m)
-    
-    # 필터링된 결과가 있으면 마커 범위로 지도 조정
-    if len(filtered_df) > 0:
-        bounds = [
-            [filtered_df['latitude'].min(), filtered_df['longitude'].min()],
-            [filtered_df['latitude'].max(), filtered_df['longitude'].max()]
-        ]
-        m.fit_bounds(bounds)
+center = list(shard.center)
 
+# 필터 조합별로 만든 지도(직렬화한 문자열)를 모든 세션에서 공유 (크기 제한 LRU)
+@st.cache_resource(show_spinner=False)
+def get_map_cache():
+    return MapCache(maxsize=32)
 
-# 지도 컨트롤 추가
-folium.LayerControl().add_to(m)
+# overview: 업소 마커 대신 표시할 동별 통계 [(동, 통계)] (None이면 업소 마커)
+def build_shop_map(filtered_df, filters_applied, near=None, view=None, overview=None):
+    import folium  # 지도 시각화 라이브러리 (지도를 처음 만들 때 임포트)
+
+    if view:
+        # 화면 범위 모드: 사용자가 보던 위치/확대 수준 유지
+        m = folium.Map(location=[view["center"]["lat"], view["center"]["lng"]], zoom_start=view["zoom"])
+    else:
+        m = folium.Map(location=center, zoom_start=15)
+
+    # 기준 위치와 반경 표시
+    if near:
+        folium.Circle(
+            location=LANDMARKS[near[0]], radius=near[1], color="crimson", fill=True, fill_opacity=0.05,
+            tooltip=f"{near[0]} 반경 {near[1]}m",
+        ).add_to(m)
+
+    # 동별 보기: 동마다 원 하나 (크기: 업소 수, 색: 평균 가격)
+    if overview is not None:
+        add_district_stats_layer(m, overview, fit=not view)
+
+    # 필터가 선택되지 않은 경우 자치구 중심 표시
+    elif not filters_applied:
+        folium.Marker(
+            location=center,
+            popup=f"{selected_district} 중심",
+            tooltip=selected_district,
+            icon=folium.Icon(color="red", icon="glyphicon-map-marker")
+        ).add_to(m)
+
+    # 필터링된 결과가 있는 경우: 업소 마커를 클러스터 레이어 하나로 추가하고 마커 범위로 지도 조정
+    elif not filtered_df.empty:
+        add_shop_markers(m, filtered_df, fit=not view)
+
+    # 지도 컨트롤 추가
+    folium.LayerControl().add_to(m)
+
+    # 컴포넌트에 넘길 문자열까지 만들어 두고 지도 객체는 버림 (캐시 적중 시 렌더링 없이 그대로 표시)
+    return render_map_payload(m, key="shop_map")
+
+map_cache = get_map_cache()
+map_view_args = {"center": map_view["center"], "zoom": map_view["zoom"]} if view_bbox and map_view.get("center") else None
+with trace.span("map_build", rows=len(filtered_df) if filters_applied else 0, cache_hit=True) as span:
+    def district_overview():
+        # 업종 하나/상품권 조건만 걸렸으면 미리 계산한 통계 큐브에서, 검색어/위치/화면 범위 등이 걸렸으면 필터 결과로 계산
+        if shop_search or near or view_bbox or len(selected_category) > 1:
+            return frame_breakdown(filtered_df, "동")
+        return shard.stats.breakdown(
+            "동", 업종=selected_category[0] if selected_category else None,
+            사랑상품권=상품권_선택 if 상품권_선택 != '전체' else None,
+        )
 
-# 지도 표시
-st_folium(m, width="100%", height=600)
+    def build_map():
+        span.set(cache_hit=False)
+        return build_shop_map(filtered_df, filters_applied, near=near, view=map_view_args,
+                              overview=district_overview() if 동별_보기 else None)
+
+    map_payload = map_cache.get_or_build(
+        map_cache_key(shop_search, selected_category, 상품권_선택, data_version, near, view_bbox, 동별_보기), build_map
+    )
+    span.set(bytes=map_payload["bytes"])
+
+# 지도 표시 (마커 클릭 정보만 돌려받아 지도 이동/확대 때는 다시 실행되지 않도록 함)
+with trace.span("map_render", bytes=map_payload["bytes"]):
+    map_state = show_map(
+        map_payload, key="shop_map", height=600,
+        returned_objects=["last_object_clicked", "last_object_clicked_tooltip"]
+        + (["bounds", "center", "zoom"] if 화면_영역만 else []),
+    )
+
+# 클릭한 업소의 상세 정보 표시
+clicked_id = find_clicked_shop(
+    df, (map_state or {}).get("last_object_clicked"), (map_state or {}).get("last_object_clicked_tooltip")
+)
+if clicked_id is not None:
+    # 업소별 상세 정보 HTML은 자치구당 한 번만 만들어 모든 세션에서 공유
+    st.markdown(shard.popup_table()[clicked_id], unsafe_allow_html=True)
 
 
 
@@ -239,194 +380,242 @@ def get_collection(collection_name):
         st.error(f"컬렉션 가져오기 오류: {e}")
         return None
 
+# 질문 임베딩 함수 (ingest.py로 적재할 때와 같은 임베딩, 프로세스당 한 번 로드)
+@st.cache_resource(show_spinner=False)
+def get_embedding_function(name=EMBEDDING):
+    if name == "hashing":
+        return HashingEmbeddingFunction()
+    from chromadb.utils import embedding_functions  # 텍스트를 숫자 벡터로 변환하는 함수
+    return embedding_functions.DefaultEmbeddingFunction()
+
+# 질문 임베딩 / 검색 결과 캐시 (모든 세션에서 공유)
+@st.cache_resource(show_spinner=False)
+def get_retrieval_cache():
+    return RetrievalCache()
+
 # --------------------------------->
 # 벡터 데이터베이스 검색 함수
 # --------------------------------->
-def search_vector_db(collection, query, n_results=20):
+# where: 메타데이터 조건, doc_ids: 검색을 허용할 문서 id (None이면 전체)
+def search_vector_db(collection, query, n_results=20, where=None, doc_ids=None, filter_key=None):
     try:
         if not collection:
             return [{"content": "컬렉션을 불러올 수 없습니다. 컬렉션을 선택해주세요.", "title": "오류", "metadata": {}}]
-
-        results = collection.query(
-            query_texts=[query],
-            n_results=n_results
-        )
-
-        documents = []
-        for i in range(len(results['documents'][0])):
-            document = {
-                "content": results['documents'][0][i],
-                "title": results['metadatas'][0][i].get('title', '제목 없음'),
-                "metadata": results['metadatas'][0][i]
-            }
-            documents.append(document)
-
-        return documents
+        if doc_ids is not None and len(doc_ids) == 0:
+            return []
+
+        cache = get_retrieval_cache()
+        embedding = cache.embedding(query, lambda q: get_embedding_function()([q])[0])
+
+        def run_query():
+            results = collection.query(
+                query_embeddings=[embedding.tolist()],
+                n_results=n_results,
+                where=where,
+                ids=list(doc_ids) if doc_ids is not None else None,
+            )
+
+            documents = []
+            for i in range(len(results['documents'][0])):
+                document = {
+                    "id": results['ids'][0][i],
+                    "content": results['documents'][0][i],
+                    "title": results['metadatas'][0][i].get('title', '제목 없음'),
+                    "metadata": results['metadatas'][0][i]
+                }
+                if results.get('distances'):
+                    document["distance"] = results['distances'][0][i]
+                documents.append(document)
+            return documents
+
+        return cache.search(collection.name, collection_version(collection), embedding, n_results, filter_key, run_query)
     except Exception as e:
         st.sidebar.error(f"검색 오류: {e}")
         return [{"content": f"검색 중 오류 발생: {e}", "title": "오류", "metadata": {}}]
 
+# --------------------------------->
+# 하이브리드 검색 (BM25 + 벡터, 사이드바 필터 적용)
+# --------------------------------->
+# 자치구 하나에서 검색: rows는 검색을 허용할 업소 행 (None이면 전체), narrow_by_ids이면 벡터 검색도 문서 id로 좁힘
+def search_shard(shard, collection, query, rows, where, narrow_by_ids, n_results, candidates):
+    doc_ids = shard.doc_ids[rows] if rows is not None else None
+    filter_key = {"where": where, "rows": rows_digest(rows), "data": shard.data_version} if rows is not None else None
+
+    with trace.span("vector_search", district=shard.name) as span:
+        vector_results = search_vector_db(
+            collection, query, n_results=candidates,
+            where=None if narrow_by_ids else where,
+            doc_ids=doc_ids if narrow_by_ids else None,
+            filter_key=filter_key,
+        )
+        span.set(rows=len(vector_results))
+    with trace.span("bm25_search", district=shard.name) as span:
+        try:
+            bm25 = shard.bm25(collection)
+            lexical_results = bm25.results(
+                query, n_results=candidates, allowed=bm25.mask(doc_ids) if doc_ids is not None else None
+            )
+        except Exception as e:
+            st.sidebar.error(f"키워드 검색 오류: {e}")
+            lexical_results = []
+        span.set(rows=len(lexical_results))
+
+    # 벡터 검색이 실패하면 키워드 검색 결과만 사용
+    if vector_results and vector_results[0].get("title") == "오류":
+        results = lexical_results[:n_results] or vector_results
+    else:
+        results = reciprocal_rank_fusion([vector_results, lexical_results], n_results=n_results)
+    return [dict(result, district=shard.name) for result in results]
+
+# 함께 검색할 자치구: 검색어/업종/상품권 조건은 그대로, 위치 조건은 그 자치구 업소 범위에 걸칠 때만 검색
+def search_other_district(name, query, locations, n_results, candidates):
+    other = shard_cache.get(district_catalog[name])
+    other_collection = get_collection(other.district.collection)
+    if other_collection is None:
+        return []
+    rows = None
+    if shop_search or selected_category or 상품권_선택 != '전체':
+        rows = other.filter_index.query(
+            search=shop_search,
+            업종=selected_category,
+            사랑상품권=[상품권_선택] if 상품권_선택 != '전체' else None,
+        )
+    for point, radius in locations:
+        if not other.contains(*point, radius):
+            return []
+        rows, _ = other.spatial_index.radius(*point, radius, ids=rows)
+    narrow_by_ids = bool(shop_search or locations)
+    return search_shard(other, other_collection, query, rows, retrieval_where, narrow_by_ids, n_results, candidates)
+
+def search_documents(collection, query, n_results=12, candidates=20):
+    if not collection:
+        return search_vector_db(collection, query)
+
+    # 질문에 "건대입구역 500m 근처" 같은 위치 표현이 있으면 반경 필터 추가
+    rows, where = retrieval_rows, retrieval_where
+    location = parse_location_query(query)
+    if location:
+        rows, _ = spatial_index.radius(*LANDMARKS[location[0]], location[1], ids=filtered_ids)
+    # 업종/상품권만 걸린 경우는 where 조건으로, 그 외 필터가 있으면 허용 문서 id로 벡터 검색 범위를 좁힘
+    narrow_by_ids = bool(shop_search or near or view_bbox or location)
+    results = search_shard(shard, collection, query, rows, where, narrow_by_ids, n_results, candidates)
+    if not 검색_자치구:
+        return results
+
+    # 다른 자치구로 넓혀서 병렬 검색한 뒤 순위 융합 (처음 검색하는 자치구는 샤드를 불러옴)
+    locations = [(LANDMARKS[condition[0]], condition[1]) for condition in (near, location) if condition]
+    ctx = get_script_run_ctx()
+
+    def search(name):
+        add_script_run_ctx(threading.current_thread(), ctx)
+        return search_other_district(name, query, locations, n_results, candidates)
+
+    with ThreadPoolExecutor(max_workers=min(4, len(검색_자치구))) as pool:
+        rankings = [results] + list(pool.map(search, 검색_자치구))
+    return reciprocal_rank_fusion(rankings, n_results=n_results)
+
+# 검색 결과 문서의 자치구 샤드
+def result_shard(result):
+    name = result.get("district", selected_district)
+    return shard if name == selected_district else shard_cache.get(district_catalog[name])
+
+# 검색 결과에 자동 채점 결과를 붙이고, 채점만으로 지정 불가가 확실한 업소는 제외 (질문에 업소명이 나오면 유지)
+def shortlist_results(question, search_results):
+    shortlisted = []
+    for result in search_results:
+        owner = result_shard(result)
+        row = owner.doc_rows.get(result.get("id"))
+        if row is None:
+            shortlisted.append(result)
+            continue
+        if owner.scores['판정'].iat[row] == '지정 불가' and result['title'] not in question:
+            continue
+        shortlisted.append(dict(result, score_summary=describe_score(owner.df.iloc[row], owner.scores.iloc[row])))
+    return shortlisted or search_results
+
 # --------------------------------->
 # OpenAI를 활용한 응답 생성 함수
 # --------------------------------->
-def get_gpt_response(query, search_results, api_key, model="gpt-4o-mini"):
+# OpenAI 오류를 사용자 메시지로 변환
+def gpt_error_message(e):
+    error_msg = str(e)
+    if "auth" in error_msg.lower() or "api key" in error_msg.lower():
+        return "OpenAI API 키 인증에 실패했습니다. API 키를 확인해주세요."
+    else:
+        return f"분석 중 오류가 발생했습니다: {error_msg}"
+
+# 답변 캐시(디스크)와 동일 요청 합치기는 모든 세션에서 공유 (캐시는 처음 열 때 만료/초과 답변 정리)
+@st.cache_resource(show_spinner=False)
+def get_llm_cache(path=LLM_CACHE_PATH):
+    cache = ResponseCache(path)
+    cache.purge_expired()
+    return cache
+
+@st.cache_resource(show_spinner=False)
+def get_single_flight():
+    return SingleFlight()
+
+# stream=True이면 토큰이 도착하는 대로 내보내는 스트림을, 아니면 전체 답변 문자열을 반환
+# 같은 요청의 답변이 캐시에 있으면 바로 문자열로 반환
+# history: (이전 대화 요약, 최근 메시지 목록), 후속 질문의 맥락으로 시스템 프롬프트와 이번 질문 사이에 넣음
+def get_gpt_response(query, search_results, api_key, model="gpt-4o-mini", stream=False, alias=None, history=None):
     if not api_key:
         return "OpenAI API 키가 설정되지 않았습니다. 사이드바에서 API 키를 입력해주세요."
 
     try:
-        api_key = api_key.replace('\ufeff', '')
-        client = OpenAI(api_key=api_key)
-
-        context = "다음은 광진구 착한가격 업소 관련 데이터입니다:\n\n"
-        for i, result in enumerate(search_results):
-            context += f"업소 {i+1}:\n"
-            context += f"업소명: {result['title']}\n"
-            if result['metadata']:
-                metadata = result['metadata']
-                # 메타데이터에 작성일이 있으면 추가
-                if 'published_date' in metadata:
-                    context += f"등록일: {metadata['published_date']}\n"
-                # URL이나 출처가 있으면 추가
-                if 'url' in metadata:
-                    context += f"출처: {metadata['url']}\n"
-                if 'source' in metadata:
-                    context += f"제공처: {metadata['source']}\n"
-            # 본문 내용
-            content = result['content']
-            if len(content) > 8000:
-                content = content[:8000] + "..."
-            context += f"설명: {content}\n\n"
-
-        system_prompt = """당신은 광진구 착한가격업소 심사 전문 평가 AI입니다. 광진구청 또는 행정안전부의 착한가격업소 지정 기준에 따라 업소 후보 리스트를 평가하고, 지정 요건 충족 여부를 심사합니다.
-
-        다음의 평가 기준을 반드시 반영해 업소별 적격성 여부를 판단하고 설명하세요:
-
-        답변 작성 가이드라인:
-        1. 질문과 직접 관련된 정보만 명확하게 전달하세요.
-        2. 문서에서 확인되지 않거나 추정에 기반한 내용은 포함하지 마세요.
-        3. 광진구 또는 행정안전부의 착한가격업소 기준에 기반한 정보만 사용하세요.
-        4. 질문이 업소 평가와 관련된 경우, 지정 필수 조건과 우대 사항을 기준으로 판단하고 그 이유를 명시하세요.
-        5. 각 업소의 업종이 요식업인지 비요식업인지에 따라 아래 평가표 기준에 따라 점수를 계산하고, 총점이 40점 이상이면 "지정 가능", 미만이면 "지정 불가"로 분류하세요.
-
-        - 필수 결격 사유(가격 초과, 행정처분, 세금 체납 등)가 있을 경우, 점수와 관계없이 "지정 불가"로 표시하세요.
-        - 각 항목별 점수와 총점을 명시하고, 지정 가능 여부 및 간단한 사유를 함께 출력하세요.
-
-        [분석 기준]
-        1. 해당 업종 평균 대비 저렴한 가격
-        2. 위생 상태 및 청결 기준 충족
-        4. 지역 화폐 가맹점 여부, 지역 공헌 활동 참여
-        5. 가격 동결·인하 등 물가 안정 기여 노력
-
-        [추가 선별 분석 기준]
-        1. 주요 품목 가격이 지역 평균보다 저렴한가?
-        2. 옥외 가격표시제 이행 여부
-        3. 원산지 표시제 이행 여부 (음식업종)
-        4. 최근 2년 내 행정처분 이력 없음
-        5. 최근 1년 내 휴업 사실 없음
-        6. 지방세 3회 이상 또는 100만 원 이상 체납 없음
-
-        [우대 사항]
-        1. 지역화폐 가맹 여부
-        2. 식품위생등급제 신청 여부 (식품업종 위생 평가)
-        3. 지역사회 공헌 활동 (예: 경로우대, 청소년 할인, 특정시간 할인)
-        4. 최근 5년간 표창 수상 여부 (시장·구청장 이상)
-
-
-        [요식업 평가표 기준 – 총점 55점]
-
-        1. 가격 (최대 30점)
-        - 가격수준 (30점): ‘착한가격메뉴’가 인근 상권 평균보다 저렴하면 30점 (신규 지정 기준)
-        - 가격안정 노력 (10점): 가격 동결 유지 기간에 따라 재지정 시만 평가
-            • 2년 이상 유지: 10점
-            • 1년 이상 2년 미만: 5점
-            ※ 신규지정 시에는 미평가
-
-        2. 위생·청결 (최대 20점)
-        - 아래 조건 중 하나 충족 시 20점 간주
-            • 식품의약품안전처 위생등급제 ‘좋음’ 이상
-            • 최근 1년 내 위생 지도·점검 결과 우수
-
-        또는 아래 세부 평가로 구성:
-            • 주방 (10점)
-                - 바닥, 배수시설 청결(5점) + 위생복·소독도구 사용(5점)
-            • 매장 (7점)
-                - 식탁 정리, 소독용품 비치, 정수기 관리 등
-            • 화장실 (3점)
-                - 세척제·위생종이 등 위생설비 구비, 환기 등
-                ※ 매장 단독 화장실일 경우만 개별 평가
-
-        3. 공공성 (최대 5점) – 항목당 1점
-            • 고아원 양로원 기부
-            • 착한가격업소 표찰 부착
-            • 지역화폐 가맹
-            • 지역특화자원 활용 (로컬푸드 등)
-            • 기타 지역사회 공헌도
-
-        [비요식업 평가표 기준 – 총점 55점]
-
-        1. 가격 (최대 30점)
-        - 가격수준 (30점): 인근 상권 평균보다 저렴하면 30점 (신규 지정 기준)
-        - 가격안정 노력 (10점): 재지정 시만 평가
-            • 3년 이상 유지: 10점
-            • 1년 이상 3년 미만: 5점
-            ※ 신규지정 시에는 미평가
-
-        2. 위생·청결 (최대 20점)
-        - 최근 1년 내 관련 법령 기반 지도·점검 결과 우수 시 20점 간주
-        또는:
-            • 주영업시설 (15점): 시설 및 용품의 위생·청결
-            • 화장실 (5점): 세척제·소독설비·위생종이 등 구비 여부
-                ※ 단독 화장실일 경우만 개별 평가
-
-        3. 지역사회기부와 공헌도 (최대 5점) – 항목당 1점
-            • 고아원 양로원 기부
-            • 기타 지역사회 공헌도
-            • 지역화폐 가맹점점
-            • 착한가격업소 표찰 부착착
-            • 지역특화자원 활용도
-
-
-        
-
-        """
-
-        user_prompt = f"""{context}
-
-        사용자 질문: {query}
-
-        위 문서들을 바탕으로 사용자 질문에만 정확히 답변해주세요.
-                광진구 착한가격업소 지정 기준인 가격, 위생, 서비스, 공공성 등 주요 분석 기준을 포함하여 분석하고, 신규 후보 업소를 발굴해주세요.
-        각 업소의 업종이 요식업인지 비요식업인지에 따라 아래 평가표 기준에 따라 점수를 계산하고, 총점이 40점 이상이면 "지정 가능", 미만이면 "지정 불가"로 분류하세요.
-        프렌차이즈 업소는 기준에 부적합하므로 평가에서 제외 해주세요.
-        제공된 광진구 업소 목록을 정리해주세요. 
-        특히 대전의 성심당처럼 사회공헌 활동을 활발히 하거나, 
-        주변 지역에 실질적인 도움을 주는 지역 기여도가 높은 업소가 있다면 이를 고려하여 점수를 매기고 함께 표시해주시면 좋겠습니다.
-
-        - 필수 결격 사유(가격 초과, 행정처분, 세금 체납 등)가 있을 경우, 점수와 관계없이 "지정 불가"로 표시하세요.
-        - 각 항목별 점수와 총점을 명시하고, 지정 가능 여부 및 간단한 사유를 함께 출력하세요.
-        - 마지막란에 리뷰도 불러와주세요
-        - 주소도 불러와주세요
-        
-        """
-
-
-        response = client.chat.completions.create(
-            model=model,
-            messages=[
+        from llm_client import ChatStream, get_openai_client  # OpenAI 라이브러리는 첫 질문 때 임포트 (사전 준비에서 미리 임포트)
+
+        # 프로세스 전체에서 공유하는 클라이언트 (연결 풀 재사용)
+        client = get_openai_client(api_key, base_url=openai_base_url)
+
+        # 중복 제거 + MMR 재정렬 후 토큰 예산 안에서 문맥 구성
+        with trace.span("prompt", rows=len(search_results)) as span:
+            packed = pack_context(query, search_results, token_budget=context_token_budget)
+            context = packed.text
+
+            system_prompt = SYSTEM_PROMPT
+            user_prompt = build_user_prompt(context, query)
+
+            history_messages = build_history_messages(*history) if history else []
+            messages = [
                 {"role": "system", "content": system_prompt},
+                *history_messages,
                 {"role": "user", "content": user_prompt}
-            ],
-            temperature=0.5,
-            max_tokens=1000
-        )
-        return response.choices[0].message.content
+            ]
+            params = {"temperature": 0.5, "max_tokens": 1000}
+            # 이번 요청에 보낸 토큰 수 기록
+            history_tokens = sum(count_tokens(m["content"]) for m in history_messages)
+            st.session_state["prompt_stats"] = dict(
+                packed.stats(),
+                prompt_tokens=count_tokens(system_prompt) + count_tokens(user_prompt) + history_tokens,
+                history_tokens=history_tokens,
+            )
+            span.set(prompt_tokens=st.session_state["prompt_stats"]["prompt_tokens"])
+        cache = get_llm_cache()
+        key = prompt_key(model, messages, **params)
+        cached = cache.get(key)
+        if cached is not None:
+            if alias:
+                cache.set_alias(alias, key)
+            trace.record("llm", 0.0, cache_hit=True)
+            return cached
+
+        if stream:
+            return CachedChatStream(
+                ChatStream(client, model, messages, **params), key, cache, get_single_flight(), alias=alias
+            )
+
+        def create():
+            response = client.chat.completions.create(model=model, messages=messages, **params)
+            return response.choices[0].message.content
+
+        with trace.span("llm", model=model):
+            answer = get_single_flight().do(key, create)
+        cache.put(key, model, answer, alias=alias)
+        return answer
 
     except Exception as e:
-        error_msg = str(e)
-        if "auth" in error_msg.lower() or "api key" in error_msg.lower():
-            return "OpenAI API 키 인증에 실패했습니다. API 키를 확인해주세요."
-        else:
-            return f"분석 중 오류가 발생했습니다: {error_msg}"
+        return gpt_error_message(e)
 
 # --------------------------------->
 # 간단한 응답 생성 함수 (API 키 없을 때)
@@ -440,6 +629,8 @@ def get_simple_response(query, search_results):
         result_text += f"**문서 {i+1}:** {result['title']}\n"
         if 'published_date' in result['metadata']:
             result_text += f"**날짜:** {result['metadata']['published_date']}\n"
+        if result.get('score_summary'):
+            result_text += f"**사전 채점:** {result['score_summary']}\n"
         content = result['content']
         if len(content) > 150:
             content = content[:150] + "..."
@@ -451,18 +642,47 @@ def get_simple_response(query, search_results):
 # --------------------------------->
 # 챗봇 응답 생성 함수 (메인 로직)
 # --------------------------------->
-def chat_response(question, collection):
-    # 벡터 데이터베이스 검색
-    search_results = search_vector_db(collection, question)
+def chat_response(question, history=None):
+    # 동/업종별 업소 수, 평균 가격처럼 통계만 묻는 질문은 미리 계산한 통계 큐브로 바로 답변 (검색/LLM/벡터 DB 없이)
+    with trace.span("stats") as span:
+        stats_answer = answer_stats_question(question, shard.stats, selected_district)
+        span.set(answered=stats_answer is not None)
+    if stats_answer is not None:
+        return stats_answer
+
+    # 컬렉션 가져오기 (백터 데이터베이스에서 컬렉션을 가져옴), 없는 경우 안내 메시지
+    collection = get_collection(collection_name)
+    if not collection:
+        return "⚠️ 컬렉션을 선택해주세요. 현재 컬렉션이 선택되지 않았거나 찾을 수 없습니다."
+
+    # 같은 질문에 대한 답변이 이미 있으면 검색 없이 바로 반환 (예시 질문 등)
+    # (사이드바 필터나 이전 대화가 다르면 답변이 달라지므로 필터 상태와 대화 맥락도 별칭에 포함)
+    alias = None
+    if api_key:
+        # 대화 맥락은 요약과 역할/내용만 (seq는 대화 위치마다 달라서 같은 후속 질문도 별칭이 달라짐)
+        context = history and (history[0], [(m["role"], m["content"]) for m in history[1]])
+        alias = question_alias(
+            question, llm_model, collection_version(collection), retrieval_where, rows_digest(retrieval_rows),
+            selected_district, 검색_자치구, context,
+        )
+        cached = get_llm_cache().get_by_alias(alias)
+        if cached is not None:
+            return cached
+
+    # 키워드(BM25) + 벡터 검색 (사이드바 필터 적용)
+    search_results = search_documents(collection, question)
+    if not search_results:
+        return "현재 필터 조건에 맞는 업소 문서가 없습니다. 사이드바 필터를 조정해주세요."
+    # 자동 채점으로 후보를 추린 뒤 LLM에는 점수 설명과 현장 확인 항목 보완만 맡김
+    search_results = shortlist_results(question, search_results)
 
     # ChatGPT API 키가 있으면 GPT 사용, 없으면 간단한 응답
     if api_key:
-        return get_gpt_response(question, search_results, api_key)
+        return get_gpt_response(question, search_results, api_key, model=llm_model, stream=True, alias=alias,
+                                history=history)
     else:
         return get_simple_response(question, search_results)
 
-# 컬렉션 가져오기
-collection = get_collection(collection_name) # 백터 데이터베이스에서 컬렉션을 가져옴
 
 #  # 컬렉션 정보 표시
 # if collection:
@@ -474,37 +694,94 @@ collection = get_collection(collection_name) # 백터 데이터베이스에서 
 # else:
 #     st.warning(f"컬렉션을 선택하거나 찾을 수 없습니다. 컬렉션 목록을 확인하세요.")
 
+# 답변 표시: 스트림이면 토큰이 도착하는 대로 그리고, 걸린 시간을 기록한 뒤 전체 텍스트 반환
+def render_response(response):
+    if isinstance(response, str):
+        st.markdown(response)
+        return response
+
+    def chunks():
+        try:
+            yield from response
+        except Exception as e:
+            yield "\n\n" + gpt_error_message(e)
+
+    text = st.write_stream(chunks())
+    timing = response.timing()
+    timings = st.session_state.setdefault("llm_timings", [])
+    timings.append(timing)
+    del timings[:-20]
+    usage = timing["usage"] or {}
+    trace.record(
+        "llm", timing["total"], model=timing["model"], ttft=timing["ttft"],
+        prompt_tokens=usage.get("prompt_tokens"), completion_tokens=usage.get("completion_tokens"),
+    )
+    return text if isinstance(text, str) else response.text
+
 # --------------------------------->
 # 세션 상태 관리 및 대화 UI
 # --------------------------------->
-# 세션 상태 초기화 (대화 기록)
-if "chat_history" not in st.session_state:
-    st.session_state.chat_history = []
-
-# 이전 대화 내용 표시
+# 대화 기록 저장소 (모든 세션에서 공유, 프로세스 시작 때 오래된 대화 정리)
+@st.cache_resource(show_spinner=False)
+def get_chat_store(path=CHAT_DB_PATH):
+    store = ChatStore(path)
+    store.compact()
+    return store
+
+chat_store = get_chat_store()
+# 대화 id는 주소(?chat=...)에 남겨 새로고침해도 같은 대화를 이어서 보여줌
+chat_id = st.query_params.get("chat")
+if not chat_id:
+    chat_id = uuid.uuid4().hex[:12]
+    st.query_params["chat"] = chat_id
+
+# 세션 상태 초기화 (대화 기록): 화면에 그릴 최근 메시지만 보관 (새 세션이면 저장소에서 최근 한 페이지를 불러옴)
+if st.session_state.get("chat_id") != chat_id:
+    st.session_state.chat_id = chat_id
+    st.session_state.chat_visible = CHAT_PAGE
+    st.session_state.chat_history = chat_store.recent(chat_id, CHAT_PAGE)
+
+def add_message(role, content):
+    # 저장소에 추가하고 화면용 목록은 보이는 개수만 유지
+    message = chat_store.append(chat_id, role, content)
+    st.session_state.chat_history.append(message)
+    del st.session_state.chat_history[:-st.session_state.chat_visible]
+    if role == "assistant":
+        chat_store.compact(chat_id)
+    return message
+
+def question_history(message):
+    # 이번 질문 앞의 대화 맥락 (오래된 턴은 요약, 최근 턴은 그대로)
+    with trace.span("history") as span:
+        summary, recent = conversation_context(chat_store, chat_id, HISTORY_TURNS, before=message["seq"])
+        span.set(rows=len(recent))
+    return (summary, recent) if summary or recent else None
+
+# 이전 대화 더 보기 (한 페이지가 차 있고 저장소에 더 오래된 메시지가 있을 때만, 누를 때마다 한 페이지씩 더 불러옴)
+if (len(st.session_state.chat_history) >= st.session_state.chat_visible
+        and chat_store.count(chat_id) > len(st.session_state.chat_history)
+        and st.button("이전 대화 더 보기")):
+    st.session_state.chat_visible += CHAT_PAGE
+    st.session_state.chat_history = chat_store.recent(chat_id, st.session_state.chat_visible)
+
+# 이전 대화 내용 표시 (최근 메시지만)
 for message in st.session_state.chat_history:
     with st.chat_message(message["role"]):
         st.markdown(message["content"])
 
 # 사용자 입력 받기
 if prompt := st.chat_input("질문을 입력하세요 (예: 광진구에서 착한 가격으로 식사할 수 있는 곳은 어디인가요?)"):
-    # 컬렉션이 없는 경우 오류 메시지 표시
-    if not collection:
-        with st.chat_message("assistant"):
-            st.markdown("⚠️ 컬렉션을 선택해주세요. 현재 컬렉션이 선택되지 않았거나 찾을 수 없습니다.")
-        st.session_state.chat_history.append({"role": "assistant", "content": "⚠️ 컬렉션을 선택해주세요. 현재 컬렉션이 선택되지 않았거나 찾을 수 없습니다."})
-    else:
-        # 사용자 메시지 표시
-        with st.chat_message("user"):
-            st.markdown(prompt)
-        st.session_state.chat_history.append({"role": "user", "content": prompt})
-
-        # 응답 생성 및 표시
-        with st.spinner("질문과 관련된 문서를 수집하여 답변을 준비하고 있는 중..."):
-            response = chat_response(prompt, collection)
-        with st.chat_message("assistant"):
-            st.markdown(response)
-        st.session_state.chat_history.append({"role": "assistant", "content": response})
+    # 사용자 메시지 표시
+    with st.chat_message("user"):
+        st.markdown(prompt)
+    history = question_history(add_message("user", prompt))
+
+    # 응답 생성 및 표시 (답변은 생성되는 대로 표시, 컬렉션은 검색이 필요한 질문에서만 가져옴)
+    with st.spinner("질문과 관련된 문서를 수집하여 답변을 준비하고 있는 중..."):
+        response = chat_response(prompt, history)
+    with st.chat_message("assistant"):
+        response = render_response(response)
+    add_message("assistant", response)
 
 # --------------------------------->
 # 사이드바 예시 질문 및 대화 기록 초기화
@@ -522,24 +799,135 @@ example_questions = [
 # 예시 질문 버튼
 for question in example_questions:
     if st.sidebar.button(question):
-        if not collection:
-            with st.chat_message("assistant"):
-                st.markdown("⚠️ 컬렉션을 선택해주세요. 현재 컬렉션이 선택되지 않았거나 찾을 수 없습니다.")
-            st.session_state.chat_history.append({"role": "assistant", "content": "⚠️ 컬렉션을 선택해주세요. 현재 컬렉션이 선택되지 않았거나 찾을 수 없습니다."})
-        else:
-            with st.chat_message("user"):
-                st.markdown(question)
-            st.session_state.chat_history.append({"role": "user", "content": question})
-
-            with st.spinner("질문과 관련된 문서를 수집하여 분석하고 있는 중..."):
-                response = chat_response(question, collection)
-            with st.chat_message("assistant"):
-                st.markdown(response)
-            st.session_state.chat_history.append({"role": "assistant", "content": response})
-            st.rerun()
+        with st.chat_message("user"):
+            st.markdown(question)
+        history = question_history(add_message("user", question))
+
+        with st.spinner("질문과 관련된 문서를 수집하여 분석하고 있는 중..."):
+            response = chat_response(question, history)
+        with st.chat_message("assistant"):
+            response = render_response(response)
+        add_message("assistant", response)
+        get_trace_sink().export(trace)
+        st.rerun()
 
 # 대화 기록 초기화 버튼
 if st.sidebar.button("대화 기록 초기화"):
+    chat_store.clear(chat_id)
     st.session_state.chat_history = []
+    st.session_state.chat_visible = CHAT_PAGE
     st.rerun()
 
+# --------------------------------->
+# 첫 질문 전 사전 준비 (백그라운드)
+# --------------------------------->
+# 첫 화면을 그린 뒤 첫 질문에 필요한 자원(벡터 DB, 임베딩 모델, 벡터 색인, BM25 색인, OpenAI 클라이언트)을
+# 백그라운드 스레드에서 미리 불러옴. 자원은 각자의 캐시에 들어가므로 질문 처리 코드는 그대로 쓰고,
+# 준비 중에 질문이 들어와도 캐시/잠금 덕분에 같은 자원을 두 번 만들지 않음 (자치구/컬렉션마다 한 번)
+@st.cache_resource(show_spinner=False)
+def start_warmup(collection_name, data_version, _shard, api_key, base_url):
+    state = {}
+
+    def open_collection():
+        state["collection"] = init_chroma_client().get_collection(name=collection_name)
+
+    def load_vector_index():
+        # 질문 하나를 검색해 벡터 색인(HNSW)을 메모리에 올림
+        embedding = get_embedding_function()(["착한가격업소"])[0]
+        state["collection"].query(query_embeddings=[embedding.tolist()], n_results=1)
+
+    def load_openai():
+        from llm_client import get_openai_client
+        get_openai_client(api_key, base_url)
+
+    steps = [
+        ("벡터 DB", open_collection),
+        ("임베딩 모델", lambda: get_embedding_function()(["착한가격업소"])),
+        ("벡터 색인", load_vector_index),
+        ("BM25 색인", lambda: _shard.bm25(state["collection"])),
+    ]
+    if api_key:
+        steps.append(("OpenAI 클라이언트", load_openai))
+    return Warmup(steps).start()
+
+warmup = None
+if WARMUP:
+    # API 키가 없으면(secrets.toml이 없는 경우 포함) OpenAI 클라이언트는 준비하지 않음
+    warmup = start_warmup(collection_name, data_version, shard, api_key, openai_base_url)
+
+# 지도 캐시 상태 (적중률)
+with st.sidebar.expander("성능 정보"):
+    if warmup is not None:
+        st.caption(
+            f"사전 준비: {'완료' if warmup.done() else '진행 중'} ({warmup.elapsed():.1f}초) · " + ", ".join(
+                f"{name} {'오류' if error else (f'{seconds:.1f}초' if seconds is not None else '대기')}"
+                for name, seconds, error in warmup.status()
+            )
+        )
+    map_cache_stats = map_cache.stats()
+    st.caption(
+        f"지도 캐시: {map_cache_stats['size']}/{map_cache_stats['maxsize']}개, "
+        f"적중 {map_cache_stats['hits']}회 / 생성 {map_cache_stats['misses']}회 "
+        f"(적중률 {map_cache_stats['hit_rate']:.0%})"
+    )
+    shard_stats = shard_cache.stats()
+    st.caption(
+        f"자치구 데이터: {', '.join(shard_stats['loaded'])} "
+        f"({shard_stats['used_bytes'] / 2**20:.0f}/{shard_stats['budget_bytes'] / 2**20:.0f}MB), "
+        f"불러옴 {shard_stats['loads']}회 / 내림 {shard_stats['evictions']}회"
+    )
+    for label, cache_stats in get_retrieval_cache().stats().items():
+        st.caption(
+            f"검색 캐시({'임베딩' if label == 'embeddings' else '결과'}): {cache_stats['size']}개, "
+            f"적중 {cache_stats['hits']}회 / 미적중 {cache_stats['misses']}회 (적중률 {cache_stats['hit_rate']:.0%})"
+        )
+    llm_cache_stats = get_llm_cache().stats()
+    st.caption(
+        f"답변 캐시: {llm_cache_stats['size']}개 저장, 적중 {llm_cache_stats['hits']}회 / 미적중 {llm_cache_stats['misses']}회, "
+        f"동시 요청 합침 {get_single_flight().coalesced}회"
+    )
+    prompt_stats = st.session_state.get("prompt_stats")
+    if prompt_stats:
+        st.caption(
+            f"최근 프롬프트: {prompt_stats['prompt_tokens']}토큰 (문맥 {prompt_stats['context_tokens']}토큰, "
+            f"대화 맥락 {prompt_stats.get('history_tokens', 0)}토큰, "
+            f"문서 {prompt_stats['documents']}개 / 중복 제외 {prompt_stats['deduplicated']}개, "
+            f"예산 초과 제외 {prompt_stats['dropped']}개)"
+        )
+    for timing in st.session_state.get("llm_timings", [])[-3:]:
+        if timing["total"] is not None:
+            first_token = f"{timing['ttft']:.2f}초" if timing["ttft"] is not None else "-"
+            st.caption(f"답변 생성: 첫 토큰 {first_token}, 전체 {timing['total']:.2f}초")
+
+# 단계별 소요 시간 (이번 실행 + 모든 세션 누적), 끝나면 내보내기
+trace_sink = get_trace_sink()
+if st.sidebar.checkbox("단계별 소요 시간 보기", key="trace_panel"):
+    with st.sidebar.expander("단계별 소요 시간", expanded=True):
+        st.caption(f"이번 실행: {trace.elapsed() * 1000:.0f}ms")
+        st.dataframe(
+            pd.DataFrame([
+                {
+                    "단계": span.name,
+                    "시간(ms)": round(span.duration * 1000, 1) if span.duration is not None else None,
+                    "행": span.attrs.get("rows"),
+                    "바이트": span.attrs.get("bytes"),
+                    "토큰": span.attrs.get("prompt_tokens"),
+                    "답변 토큰": span.attrs.get("completion_tokens"),
+                    "캐시": {True: "적중", False: "생성"}.get(span.attrs.get("cache_hit"), ""),
+                }
+                for span in trace.spans
+            ]).convert_dtypes(),
+            hide_index=True,
+        )
+        summary = trace_sink.summary()
+        if summary:
+            st.caption(f"누적 ({trace_sink.runs}회 실행, 모든 세션)")
+            st.dataframe(
+                pd.DataFrame([
+                    {"단계": name, "횟수": s["count"], "평균(ms)": round(s["avg"] * 1000, 1),
+                     "최대(ms)": round(s["max"] * 1000, 1)}
+                    for name, s in summary.items()
+                ]),
+                hide_index=True,
+            )
+trace_sink.export(trace)
@@ -0,0 +1,172 @@
+# 하이브리드 검색 (BM25 + 벡터)
+# 컬렉션 문서를 한글 글자 n-gram(2/3글자) BM25 색인으로 만들어 두고, 임베딩 검색 결과와 순위 융합(RRF)으로 합친다.
+# "친절"처럼 특정 단어가 들어간 업소를 찾는 질문은 BM25가, 의미가 비슷한 업소를 찾는 질문은 임베딩이 잘 찾는다.
+# 사이드바 필터는 검색 전에 적용한다: 벡터 검색은 Chroma where 조건 또는 허용 문서 id, BM25는 허용 문서 마스크.
+import hashlib
+import re
+import zlib
+from collections import Counter
+
+import numpy as np  # 수치 연산 라이브러리
+
+from filter_index import normalize_text
+
+NGRAM_SIZES = (2, 3)
+
+
+def char_ngrams(text, sizes=NGRAM_SIZES):
+    # 단어별 글자 n-gram (조사가 붙은 "친절한", "친절하고"도 "친절"로 맞춰짐), 짧은 단어는 그대로
+    grams = []
+    for word in normalize_text(text).split():
+        word = re.sub(r'[^\w]', '', word)
+        if len(word) < min(sizes):
+            if word:
+                grams.append(word)
+            continue
+        for n in sizes:
+            grams.extend(word[i:i + n] for i in range(len(word) - n + 1))
+    return grams
+
+
+class HashingEmbeddingFunction:
+    # 모델 다운로드 없이 쓰는 임베딩: 글자 n-gram을 고정 크기 벡터에 부호 해싱 후 정규화
+    # (오프라인 환경, 벤치마크용. 적재와 검색에 같은 함수를 써야 함)
+    def __init__(self, dim=256):
+        self.dim = dim
+
+    def __call__(self, input):
+        vectors = np.zeros((len(input), self.dim), dtype=np.float32)
+        for i, text in enumerate(input):
+            grams = char_ngrams(text or '')
+            if not grams:
+                continue
+            h = np.fromiter((zlib.crc32(g.encode('utf-8')) for g in grams), dtype=np.uint32, count=len(grams))
+            signs = np.where(h & 0x80000000, 1.0, -1.0)
+            vectors[i] = np.bincount(h % self.dim, weights=signs, minlength=self.dim)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return list(vectors / np.maximum(norms, 1e-12))
+
+
+# --------------------------------->
+# BM25 색인
+# --------------------------------->
+class BM25Index:
+    def __init__(self, ids, documents, metadatas=None, k1=1.2, b=0.75, max_df=0.5):
+        self.ids = np.array(ids, dtype=object)
+        self.documents = list(documents)
+        self.metadatas = list(metadatas) if metadatas is not None else [{} for _ in self.documents]
+        self.size = len(self.ids)
+        self._positions = {doc_id: i for i, doc_id in enumerate(self.ids)}
+
+        # (gram 번호, 문서 번호, 빈도) → gram별 posting을 CSR 형태로 저장
+        self.vocab = {}
+        terms, docs, freqs = [], [], []
+        lengths = np.zeros(self.size, dtype=np.float32)
+        for d, text in enumerate(self.documents):
+            counts = Counter(char_ngrams(text or ''))
+            lengths[d] = sum(counts.values())
+            for gram, count in counts.items():
+                terms.append(self.vocab.setdefault(gram, len(self.vocab)))
+                docs.append(d)
+                freqs.append(count)
+        terms = np.array(terms, dtype=np.int64)
+        order = np.argsort(terms, kind='stable')
+        self._postings = np.array(docs, dtype=np.int32)[order]
+        self._offsets = np.searchsorted(terms[order], np.arange(len(self.vocab) + 1))
+
+        # 문서별 BM25 가중치를 미리 계산 (질문 시에는 gram별 가중치를 더하기만 함)
+        tf = np.array(freqs, dtype=np.float32)[order]
+        df = np.diff(self._offsets).astype(np.float32)
+        idf = np.log1p((self.size - df + 0.5) / (df + 0.5))
+        avg_length = lengths.mean() if self.size else 1.0
+        norm = k1 * (1 - b + b * lengths[self._postings] / max(avg_length, 1.0))
+        self._weights = (np.repeat(idf, np.diff(self._offsets)) * tf * (k1 + 1) / (tf + norm)).astype(np.float32)
+        # 절반 넘는 문서에 나오는 gram("업소", "주소" 등)은 질문에서 무시
+        self._common = df > max_df * self.size
+
+    def mask(self, doc_ids):
+        # 문서 id 목록 → 색인 순서의 허용 여부 배열 (색인에 없는 id는 무시)
+        allowed = np.zeros(self.size, dtype=bool)
+        positions = [self._positions[doc_id] for doc_id in doc_ids if doc_id in self._positions]
+        allowed[positions] = True
+        return allowed
+
+    def search(self, query, n_results=20, allowed=None):
+        # (문서 번호 배열, 점수 배열), 점수 높은 순
+        scores = np.zeros(self.size, dtype=np.float32)
+        for gram in set(char_ngrams(query)):
+            term = self.vocab.get(gram)
+            if term is None or self._common[term]:
+                continue
+            start, end = self._offsets[term], self._offsets[term + 1]
+            scores[self._postings[start:end]] += self._weights[start:end]
+        if allowed is not None:
+            scores[~allowed] = 0
+        hits = np.flatnonzero(scores > 0)
+        top = hits[np.argsort(-scores[hits], kind='stable')[:n_results]]
+        return top, scores[top]
+
+    def results(self, query, n_results=20, allowed=None):
+        # search_vector_db와 같은 형식의 문서 목록
+        top, scores = self.search(query, n_results, allowed)
+        return [
+            {"id": self.ids[i], "content": self.documents[i],
+             "title": (self.metadatas[i] or {}).get('title', '제목 없음'),
+             "metadata": self.metadatas[i] or {}, "bm25": float(score)}
+            for i, score in zip(top, scores)
+        ]
+
+
+def load_bm25_index(collection, page_size=1000):
+    # 컬렉션 전체 문서로 BM25 색인 생성
+    ids, documents, metadatas = [], [], []
+    offset = 0
+    while True:
+        page = collection.get(include=["documents", "metadatas"], limit=page_size, offset=offset)
+        ids.extend(page["ids"])
+        documents.extend(page["documents"])
+        metadatas.extend(page["metadatas"])
+        if len(page["ids"]) < page_size:
+            return BM25Index(ids, documents, metadatas)
+        offset += page_size
+
+
+# --------------------------------->
+# 필터 조건 / 순위 융합
+# --------------------------------->
+def build_where(categories=None, voucher=None):
+    # 사이드바의 업종/상품권 선택 → Chroma where 조건 (ingest.py가 적재한 메타데이터 기준)
+    clauses = []
+    if categories:
+        clauses.append({"업종": {"$in": list(categories)}})
+    if voucher:
+        clauses.append({"사랑상품권": voucher})
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def rows_digest(rows):
+    # 허용 업소 행 번호 집합을 캐시 키에 넣을 짧은 해시로 (None이면 필터 없음)
+    if rows is None:
+        return None
+    return hashlib.sha1(np.sort(np.asarray(rows, dtype=np.int64)).tobytes()).hexdigest()[:16]
+
+
+def reciprocal_rank_fusion(rankings, n_results=None, k=60):
+    # rankings: 검색 방식별 문서 목록 (순위 순서, 문서마다 "id" 또는 "title")
+    # 각 문서 점수 = Σ 1 / (k + 순위), 여러 방식에서 상위에 오른 문서가 앞으로 옴
+    fused, scores = {}, Counter()
+    for ranking in rankings:
+        for rank, document in enumerate(ranking, start=1):
+            key = document.get("id") or document.get("title")
+            scores[key] += 1.0 / (k + rank)
+            fused.setdefault(key, dict(document))
+    results = []
+    for key, score in scores.most_common(n_results):
+        document = fused[key]
+        document.pop("distance", None)
+        document["score"] = score
+        results.append(document)
+    return results
+
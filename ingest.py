@@ -0,0 +1,251 @@
+# gjg_report 컬렉션 적재 스크립트
+# 업소 CSV(와 리뷰 CSV)를 문서로 만들어 ChromaDB 컬렉션에 넣는다.
+# 문서마다 본문/메타데이터 해시를 메타데이터로 저장해 두고, 다시 실행하면 본문이 바뀐 문서만 임베딩하고
+# 메타데이터만 바뀐 문서는 임베딩 없이 메타데이터만 갱신한다.
+#
+# 사용 예:
+#   python ingest.py --csv 광진구_추천업소_최종데이터333.csv --reviews 리뷰.csv
+#   python ingest.py --dry-run      # 바뀔 문서 수만 확인
+try:
+    __import__('pysqlite3')
+    import sys
+    sys.modules['sqlite3'] = sys.modules.pop('pysqlite3')
+except ImportError:
+    pass
+
+import argparse
+import hashlib
+import json
+import os
+import time
+from urllib.parse import quote
+
+import numpy as np  # 수치 연산 라이브러리
+import pandas as pd  # 데이터 분석 라이브러리
+
+from data_store import load_shop_table
+from hybrid_search import HashingEmbeddingFunction
+
+DEFAULT_CSV = "광진구_추천업소_최종데이터333.csv"
+DEFAULT_DB_PATH = "chroma_db3"
+DEFAULT_COLLECTION = "gjg_report"
+
+# 리뷰는 업소당 이 개수까지만 문서에 포함
+MAX_REVIEWS_PER_SHOP = 30
+
+
+# --------------------------------->
+# 문서 생성
+# --------------------------------->
+def shop_doc_id(name, address):
+    # 업소명 + 주소로 만든 고정 id (데이터를 다시 받아도 같은 업소는 같은 id)
+    key = f"{name}|{address}".encode('utf-8')
+    return "shop-" + hashlib.sha1(key).hexdigest()[:16]
+
+
+def shop_doc_ids(df):
+    # 업소 행 순서대로의 문서 id 배열 (앱에서 사이드바 필터 결과를 문서 id로 바꿀 때 사용)
+    return np.array([shop_doc_id(name, _value(address)) for name, address in zip(df['사업장명'], df['도로명주소'])],
+                    dtype=object)
+
+
+def content_hash(value):
+    payload = json.dumps(value, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def load_reviews(path):
+    # 리뷰 CSV(사업장명, 리뷰[, 도로명주소]) → {(사업장명, 도로명주소 또는 None): [리뷰, ...]}
+    reviews = pd.read_csv(path)
+    reviews = reviews.dropna(subset=['사업장명', '리뷰'])
+    has_address = '도로명주소' in reviews.columns
+    grouped = {}
+    for row in reviews.itertuples(index=False):
+        address = getattr(row, '도로명주소') if has_address and isinstance(getattr(row, '도로명주소'), str) else None
+        grouped.setdefault((row.사업장명, address), []).append(str(row.리뷰).strip())
+    return grouped
+
+
+def _value(value, missing=''):
+    return missing if pd.isna(value) else value
+
+
+def build_documents(df, source, reviews=None):
+    # 업소 행 → (id, 본문, 메타데이터) 목록
+    # 메타데이터의 title/published_date/url/source는 앱의 답변 생성에서 읽는 필드,
+    # 업종/동/사랑상품권/가격/좌표는 검색 시 필터 조건으로 쓰는 필드
+    reviews = reviews or {}
+    docs = []
+    for row in df.to_dict('records'):
+        name, address = row['사업장명'], _value(row['도로명주소'])
+        shop_reviews = reviews.get((name, address)) or reviews.get((name, None)) or []
+        lines = [
+            f"업소명: {name}",
+            f"업종: {_value(row['업종'])} ({_value(row['업종구분'])})",
+            f"주소: {address} / {_value(row['지번주소'])}",
+            f"동: {_value(row['동'])}",
+            f"대표 가격: {_value(row['가격'], '정보 없음')}",
+            f"서울사랑상품권 가맹: {_value(row['사랑상품권'])}",
+            f"위생등급: {_value(row['위생등급'], '미지정')}",
+            f"행정처분: {_value(row['행정처분'], '없음')}",
+            f"인허가일자: {_value(row['인허가일자'])}",
+            f"착한업소 지정: {_value(row['착한업소'])}",
+        ]
+        if shop_reviews:
+            lines.append("리뷰:")
+            lines.extend(f"- {text}" for text in shop_reviews[:MAX_REVIEWS_PER_SHOP])
+        document = "\n".join(lines)
+
+        metadata = {
+            "title": name,
+            "published_date": str(_value(row['인허가일자'])),
+            "url": "https://map.naver.com/p/search/" + quote(f"{name} {address}".strip()),
+            "source": source,
+            "업종": str(_value(row['업종'])),
+            "동": str(_value(row['동'])),
+            "사랑상품권": str(_value(row['사랑상품권'])),
+            "가격": int(_value(row['가격'], -1)),
+            "latitude": float(row['latitude']),
+            "longitude": float(row['longitude']),
+        }
+        metadata["meta_hash"] = content_hash(metadata)
+        metadata["content_hash"] = content_hash(document)
+        docs.append((shop_doc_id(name, address), document, metadata))
+
+    # 같은 업소가 여러 번 나오면 마지막 행 기준
+    return list({doc_id: (doc_id, d, m) for doc_id, d, m in docs}.values())
+
+
+# --------------------------------->
+# 변경분 계산 및 적재
+# --------------------------------->
+def _hashes(metadata):
+    metadata = metadata or {}
+    return metadata.get("content_hash"), metadata.get("meta_hash")
+
+
+def existing_hashes(collection, page_size=1000):
+    # 컬렉션에 이미 있는 {id: (content_hash, meta_hash)}
+    hashes = {}
+    offset = 0
+    while True:
+        page = collection.get(include=["metadatas"], limit=page_size, offset=offset)
+        for doc_id, metadata in zip(page["ids"], page["metadatas"]):
+            hashes[doc_id] = _hashes(metadata)
+        if len(page["ids"]) < page_size:
+            return hashes
+        offset += page_size
+
+
+def plan_changes(docs, current):
+    # (다시 임베딩할 문서, 메타데이터만 갱신할 문서, 컬렉션에만 남은 id)
+    embed, relabel = [], []
+    for doc in docs:
+        old = current.get(doc[0])
+        new = _hashes(doc[2])
+        if old is None or old[0] != new[0]:
+            embed.append(doc)
+        elif old[1] != new[1]:
+            relabel.append(doc)
+    keep_ids = {doc[0] for doc in docs}
+    removed = [doc_id for doc_id in current if doc_id not in keep_ids]
+    return embed, relabel, removed
+
+
+def ingest_version(hashes):
+    # 컬렉션 전체 내용({id: (content_hash, meta_hash)})을 대표하는 버전 (검색 캐시 무효화에 사용)
+    digest = hashlib.sha256()
+    for doc_id in sorted(hashes):
+        digest.update(f"{doc_id}:{hashes[doc_id]}\n".encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+def upsert_in_batches(collection, docs, embed, batch_size):
+    for start in range(0, len(docs), batch_size):
+        batch = docs[start:start + batch_size]
+        ids = [d[0] for d in batch]
+        documents = [d[1] for d in batch]
+        metadatas = [d[2] for d in batch]
+        embeddings = embed(documents)
+        collection.upsert(ids=ids, documents=documents, metadatas=metadatas, embeddings=embeddings)
+        print(f"  {start + len(batch)}/{len(docs)}개 업서트")
+
+
+def run_ingest(csv_paths, db_path=DEFAULT_DB_PATH, collection_name=DEFAULT_COLLECTION,
+               reviews_path=None, batch_size=256, prune=False, dry_run=False, embedding_function=None):
+    # embedding_function: 문서 목록 → 벡터 목록 (기본은 컬렉션 조회 시와 같은 Chroma 기본 임베딩)
+    import chromadb  # 확장성 있는 벡터 데이터베이스 라이브러리
+    from chromadb.utils import embedding_functions  # 텍스트를 숫자 벡터로 변환하는 함수
+
+    started = time.perf_counter()
+    reviews = load_reviews(reviews_path) if reviews_path else None
+    docs = []
+    for csv_path in csv_paths:
+        df, _ = load_shop_table(csv_path)
+        source = os.path.splitext(os.path.basename(csv_path))[0]
+        docs.extend(build_documents(df, source, reviews))
+    docs = list({d[0]: d for d in docs}.values())
+
+    client = chromadb.PersistentClient(path=db_path)
+    collection = client.get_or_create_collection(name=collection_name)
+    current = existing_hashes(collection)
+    changed, relabel, removed = plan_changes(docs, current)
+    print(f"문서 {len(docs)}개 중 임베딩 {len(changed)}개, 메타데이터 갱신 {len(relabel)}개, "
+          f"삭제 대상 {len(removed)}개 (기존 {len(current)}개)")
+    summary = {"documents": len(docs), "changed": len(changed), "relabeled": len(relabel),
+               "removed": len(removed) if prune else 0}
+    if dry_run:
+        return summary
+
+    if changed:
+        embed = embedding_function or embedding_functions.DefaultEmbeddingFunction()
+        upsert_in_batches(collection, changed, embed, batch_size)
+    for start in range(0, len(relabel), batch_size):
+        batch = relabel[start:start + batch_size]
+        collection.update(ids=[d[0] for d in batch], metadatas=[d[2] for d in batch])
+    if prune and removed:
+        for start in range(0, len(removed), batch_size):
+            collection.delete(ids=removed[start:start + batch_size])
+        print(f"  {len(removed)}개 삭제")
+
+    if changed or relabel or (prune and removed):
+        final = dict(current)
+        final.update({doc_id: _hashes(metadata) for doc_id, _, metadata in changed + relabel})
+        if prune:
+            for doc_id in removed:
+                final.pop(doc_id, None)
+        version = ingest_version(final)
+        metadata = dict(collection.metadata or {})
+        metadata.update({"ingest_version": version, "ingested_at": time.strftime("%Y-%m-%dT%H:%M:%S")})
+        collection.modify(metadata=metadata)
+    print(f"완료 ({time.perf_counter() - started:.1f}초)")
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="업소 CSV를 gjg_report ChromaDB 컬렉션에 적재 (변경분만)")
+    parser.add_argument("--csv", action="append", help=f"업소 CSV 경로 (여러 번 지정 가능, 기본: {DEFAULT_CSV})")
+    parser.add_argument("--reviews", help="리뷰 CSV 경로 (사업장명, 리뷰[, 도로명주소] 컬럼)")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="ChromaDB 저장 경로")
+    parser.add_argument("--collection", default=DEFAULT_COLLECTION, help="컬렉션 이름")
+    parser.add_argument("--batch-size", type=int, default=256, help="임베딩/업서트 배치 크기")
+    parser.add_argument("--prune", action="store_true", help="CSV에서 사라진 업소 문서 삭제")
+    parser.add_argument("--dry-run", action="store_true", help="변경 사항만 출력하고 적재하지 않음")
+    parser.add_argument("--embedding", choices=["default", "hashing"], default="default",
+                        help="임베딩 (hashing: 모델 다운로드 없는 해시 임베딩, 앱은 GJG_EMBEDDING=hashing으로 실행)")
+    args = parser.parse_args(argv)
+
+    run_ingest(
+        args.csv or [DEFAULT_CSV],
+        db_path=args.db,
+        collection_name=args.collection,
+        reviews_path=args.reviews,
+        batch_size=args.batch_size,
+        prune=args.prune,
+        dry_run=args.dry_run,
+        embedding_function=HashingEmbeddingFunction() if args.embedding == "hashing" else None,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+# LLM 답변 캐시 (SQLite) 및 동일 요청 합치기(single-flight)
+# 시스템 프롬프트, 검색 문맥, 질문, 모델 파라미터가 완전히 같은 요청은 저장된 답변을 바로 돌려주고,
+# 같은 요청이 동시에 여러 세션에서 들어오면 OpenAI 호출은 하나만 하고 나머지는 그 결과를 기다린다.
+# 만료된 답변과 최대 개수를 넘는 오래된 답변은 시작할 때와 저장 purge_every번마다 지운다.
+import hashlib
+import itertools
+import json
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import closing, contextmanager
+
+from filter_index import normalize_text
+
+DEFAULT_CACHE_PATH = "llm_cache.sqlite3"
+
+
+def prompt_key(model, messages, **params):
+    # 요청 내용 전체의 해시
+    payload = json.dumps({"model": model, "messages": messages, "params": params},
+                         ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def question_alias(question, model, *context):
+    # 질문 문장 기준 별칭 (예시 질문처럼 같은 질문이면 검색 없이 바로 답변을 찾기 위한 키)
+    # context: 컬렉션 버전처럼 답변 내용에 영향을 주는 값
+    payload = json.dumps([normalize_text(question), model, context], ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_age_days=30, max_rows=5000, purge_every=100):
+        self.path = path
+        self.max_age = max_age_days * 86400
+        self.max_rows = max_rows  # 보관할 답변 수 (넘으면 오래된 것부터 지움)
+        self.purge_every = purge_every
+        self._puts = itertools.count(1)
+        self.hits = 0
+        self.misses = 0
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY, model TEXT, response TEXT NOT NULL, created REAL NOT NULL,"
+                " hits INTEGER NOT NULL DEFAULT 0)"
+            )
+            conn.execute("CREATE TABLE IF NOT EXISTS aliases (alias TEXT PRIMARY KEY, key TEXT NOT NULL)")
+
+    @contextmanager
+    def _connect(self):
+        # 세션(스레드)마다 짧게 열고, 끝나면 커밋(오류 시 롤백)한 뒤 닫음
+        with closing(sqlite3.connect(self.path, timeout=10)) as conn, conn:
+            yield conn
+
+    def get(self, key):
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT response FROM responses WHERE key = ? AND created >= ?",
+                (key, time.time() - self.max_age),
+            ).fetchone()
+            if row is not None:
+                conn.execute("UPDATE responses SET hits = hits + 1 WHERE key = ?", (key,))
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return row[0]
+
+    def put(self, key, model, response, alias=None):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, response, created, hits) VALUES (?, ?, ?, ?, 0)",
+                (key, model, response, time.time()),
+            )
+            if alias:
+                conn.execute("INSERT OR REPLACE INTO aliases (alias, key) VALUES (?, ?)", (alias, key))
+        if next(self._puts) % self.purge_every == 0:
+            self.purge_expired()
+
+    def set_alias(self, alias, key):
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO aliases (alias, key) VALUES (?, ?)", (alias, key))
+
+    def get_by_alias(self, alias):
+        with self._connect() as conn:
+            row = conn.execute("SELECT key FROM aliases WHERE alias = ?", (alias,)).fetchone()
+        return self.get(row[0]) if row else None
+
+    def purge_expired(self):
+        # 만료된 답변과 max_rows개를 넘는 오래된 답변(및 그 별칭)을 지우고 지운 답변 수 반환
+        with self._connect() as conn:
+            removed = conn.execute("DELETE FROM responses WHERE created < ?", (time.time() - self.max_age,)).rowcount
+            removed += conn.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY created DESC LIMIT -1 OFFSET ?)",
+                (self.max_rows,),
+            ).rowcount
+            if removed:
+                conn.execute("DELETE FROM aliases WHERE key NOT IN (SELECT key FROM responses)")
+        return removed
+
+    def stats(self):
+        with self._connect() as conn:
+            size = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        total = self.hits + self.misses
+        return {"size": size, "hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0}
+
+
+# --------------------------------->
+# 동일 요청 합치기
+# --------------------------------->
+class SingleFlight:
+    def __init__(self):
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.coalesced = 0
+
+    def begin(self, key):
+        # (먼저 온 요청인지 여부, 결과를 받을 Future)
+        with self._lock:
+            future = self._flights.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return False, future
+            future = Future()
+            self._flights[key] = future
+            return True, future
+
+    def finish(self, key, result=None, error=None):
+        with self._lock:
+            future = self._flights.pop(key, None)
+        if future is None:
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def do(self, key, fn):
+        # 스트리밍이 아닌 호출용: 같은 key가 진행 중이면 그 결과를 기다림
+        leader, future = self.begin(key)
+        if not leader:
+            return future.result()
+        try:
+            result = fn()
+        except BaseException as e:
+            self.finish(key, error=e)
+            raise
+        self.finish(key, result=result)
+        return result
+
+
+class CachedChatStream:
+    # ChatStream을 감싸서, 다 받은 답변을 캐시에 저장하고 같은 요청을 기다리는 다른 세션에 전달
+    # 같은 요청이 이미 진행 중이면 OpenAI를 호출하지 않고 그 결과가 나오면 한 번에 내보낸다.
+    def __init__(self, stream, key, cache, flights, alias=None):
+        self.stream = stream
+        self.key = key
+        self.cache = cache
+        self.flights = flights
+        self.alias = alias
+        self.text = ''
+        self.coalesced = False
+        self._started = None
+        self._finished = None
+
+    def __iter__(self):
+        self._started = time.perf_counter()
+        leader, future = self.flights.begin(self.key)
+        if not leader:
+            self.coalesced = True
+            self.text = future.result()
+            self._finished = time.perf_counter()
+            if self.alias:
+                self.cache.set_alias(self.alias, self.key)
+            yield self.text
+            return
+        try:
+            yield from self.stream
+        except BaseException as e:
+            # 화면 재실행 등으로 중단된 경우에도 기다리는 세션이 멈추지 않도록 오류로 끝냄
+            error = e if isinstance(e, Exception) else RuntimeError("답변 생성이 중단되었습니다.")
+            self.flights.finish(self.key, error=error)
+            raise
+        self.text = self.stream.text
+        self._finished = time.perf_counter()
+        if self.text:
+            self.cache.put(self.key, self.stream.model, self.text, alias=self.alias)
+        self.flights.finish(self.key, result=self.text)
+
+    def timing(self):
+        if not self.coalesced:
+            return self.stream.timing()
+        total = self._finished - self._started if self._finished else None
+        return {"model": self.stream.model, "ttft": total, "total": total, "usage": None}
@@ -0,0 +1,85 @@
+# OpenAI 클라이언트 공유 및 스트리밍 응답
+# 요청마다 OpenAI 클라이언트를 새로 만들지 않고 (api_key, base_url)별로 하나를 만들어 프로세스 전체에서 재사용한다.
+# 클라이언트 내부의 httpx 연결 풀을 공유하므로 TLS 연결을 다시 맺는 비용이 없다.
+import threading
+import time
+
+import httpx  # openai 라이브러리가 사용하는 HTTP 클라이언트
+from openai import OpenAI  # OpenAI API 사용 라이브러리
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+# 동시 세션 수를 고려한 연결 풀 크기
+POOL_LIMITS = httpx.Limits(max_connections=64, max_keepalive_connections=32, keepalive_expiry=60)
+REQUEST_TIMEOUT = httpx.Timeout(60.0, connect=5.0)
+
+
+def clean_api_key(api_key):
+    return api_key.replace('\ufeff', '').strip()
+
+
+def get_openai_client(api_key, base_url=None):
+    # base_url을 주지 않으면 OpenAI 기본 주소 (또는 OPENAI_BASE_URL 환경 변수)
+    key = (clean_api_key(api_key), base_url)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = OpenAI(
+                api_key=key[0],
+                base_url=base_url,
+                http_client=httpx.Client(limits=POOL_LIMITS, timeout=REQUEST_TIMEOUT),
+                max_retries=2,
+            )
+            _clients[key] = client
+        return client
+
+
+# --------------------------------->
+# 스트리밍 응답
+# --------------------------------->
+class ChatStream:
+    # 토큰이 도착하는 대로 텍스트 조각을 내보내는 반복 객체
+    # 다 읽은 뒤에는 text, 첫 토큰까지 걸린 시간(ttft), 전체 시간(total), 토큰 사용량(usage)을 담고 있다.
+    def __init__(self, client, model, messages, **params):
+        self.client = client
+        self.model = model
+        self.messages = messages
+        self.params = params
+        self.text = ''
+        self.ttft = None
+        self.total = None
+        self.usage = None
+
+    def __iter__(self):
+        started = time.perf_counter()
+        parts = []
+        stream = self.client.chat.completions.create(
+            model=self.model,
+            messages=self.messages,
+            stream=True,
+            stream_options={"include_usage": True},
+            **self.params,
+        )
+        try:
+            for chunk in stream:
+                if chunk.usage is not None:
+                    self.usage = {
+                        "prompt_tokens": chunk.usage.prompt_tokens,
+                        "completion_tokens": chunk.usage.completion_tokens,
+                    }
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    if self.ttft is None:
+                        self.ttft = time.perf_counter() - started
+                    parts.append(delta)
+                    yield delta
+        finally:
+            stream.close()
+            self.text = ''.join(parts)
+            self.total = time.perf_counter() - started
+
+    def timing(self):
+        return {"model": self.model, "ttft": self.ttft, "total": self.total, "usage": self.usage}
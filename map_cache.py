@@ -0,0 +1,66 @@
+# 필터 조합별 지도 캐시
+# 같은 필터(검색어, 업종, 상품권, 데이터 버전)로 이미 만든 지도(직렬화한 문자열, map_layer.render_map_payload)를 재사용한다.
+# 크기가 정해진 LRU로 관리하며, 적중률을 함께 기록한다.
+import threading
+from collections import OrderedDict
+
+from filter_index import normalize_text
+
+
+def map_cache_key(search, categories, voucher, data_version, *extra):
+    # 입력 순서/대소문자/공백 차이가 같은 키가 되도록 정규화
+    # extra: 위치 조건처럼 지도 내용에 영향을 주는 추가 값 (해시 가능한 값)
+    return (
+        normalize_text(search) if search else '',
+        tuple(sorted(categories or ())),
+        voucher or '전체',
+        data_version,
+    ) + extra
+
+
+class MapCache:
+    def __init__(self, maxsize=32):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_build(self, key, build):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        # 지도 생성은 잠금 밖에서 (다른 키 조회를 막지 않도록)
+        value = build()
+
+        with self._lock:
+            if key in self._entries:
+                # 그 사이 다른 세션이 같은 지도를 만들었으면 먼저 만든 것을 사용
+                self._entries.move_to_end(key)
+                return self._entries[key]
+            self._entries[key] = value
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / total if total else 0.0,
+            }
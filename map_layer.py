@@ -0,0 +1,241 @@
+# 지도 마커 레이어
+# 업소마다 folium.Marker + IFrame 팝업을 만드는 대신, 좌표/색상/이름만 담은 배열 하나를
+# FastMarkerCluster로 넘겨 브라우저에서 마커를 그린다. 상세 정보 HTML은 업소별로 미리 만들어 두고
+# 지도에서 클릭된 업소의 것만 꺼내 보여준다.
+import html
+
+import numpy as np  # 수치 연산 라이브러리
+
+# 업종별 색상 정의
+CATEGORY_COLORS = {
+    "한식": "darkred",        # 깊고 전통적인 느낌
+    "분식": "lightred",         # 밝고 활기찬 느낌
+    "일식": "blue",          # 차분하고 정갈한 느낌
+    "중국식": "darkblue",         # 화려하고 풍성한 느낌
+    "까페": "teal",          # 세련되고 편안한 느낌
+    "식육(숯불구이)": "firebrick", # 강렬하고 먹음직스러운 느낌
+    "김밥(도시락)": "mediumpurple", # 산뜻하고 깔끔한 느낌
+    "통닭(치킨)": "goldenrod",   # 고소하고 따뜻한 느낌
+    "경양식": "sandybrown",    # 부드럽고 향수를 불러일으키는 느낌
+    "기타": "gray",           # 무난하고 포괄적인 느낌
+    "외국음식전문점(인도,태국등)": "olive", # 이국적이고 다채로운 느낌
+    "횟집": "skyblue",        # 시원하고 신선한 느낌
+    "라이브카페": "darkviolet",  # 분위기 있고 개성 있는 느낌
+    "커피숍": "chocolate",      # 따뜻하고 부드러운 느낌
+    "편의점": "forestgreen",   # 친근하고 활기찬 느낌
+    "기타 휴게음식점": "dimgray", # 차분하고 보조적인 느낌
+}
+DEFAULT_COLOR = "blue"
+
+# folium.Icon 전용 색 이름 중 CSS 색 이름이 아닌 것
+_CSS_COLORS = {"lightred": "#ff8e7f"}
+
+# 브라우저에서 배열 한 줄([위도, 경도, 색상, 업소명])로 마커를 만드는 함수
+MARKER_CALLBACK = """
+function (row) {
+    var marker = L.circleMarker(new L.LatLng(row[0], row[1]), {
+        radius: 7, color: row[2], fillColor: row[2], fillOpacity: 0.85, weight: 1
+    });
+    marker.bindTooltip(row[3]);
+    return marker;
+}
+"""
+
+# 좌표 반올림 자릿수 (지도에 보낸 값과 클릭으로 돌아온 값을 맞추는 기준)
+COORD_DECIMALS = 6
+
+
+def marker_colors(categories):
+    # 업종 Series → CSS 색상 배열 (범주형이면 범주 수만큼만 계산)
+    colors = {k: _CSS_COLORS.get(v, v) for k, v in CATEGORY_COLORS.items()}
+    return categories.astype(object).map(colors).fillna(_CSS_COLORS.get(DEFAULT_COLOR, DEFAULT_COLOR)).to_numpy()
+
+
+def build_marker_rows(df):
+    # 마커 데이터 배열을 한 번에 생성 (행 단위 반복 없이 컬럼 단위로 변환)
+    lat = df['latitude'].to_numpy(dtype=np.float64).round(COORD_DECIMALS)
+    lon = df['longitude'].to_numpy(dtype=np.float64).round(COORD_DECIMALS)
+    return [list(r) for r in zip(lat.tolist(), lon.tolist(), marker_colors(df['업종']).tolist(), df['사업장명'].tolist())]
+
+
+def add_shop_markers(m, df, name="업소", fit=True):
+    # 필터링된 업소를 클러스터 레이어 하나로 추가하고 지도 범위를 맞춤
+    from folium.plugins import FastMarkerCluster  # 대량 마커용 클러스터 레이어 (지도를 그릴 때만 임포트)
+
+    FastMarkerCluster(build_marker_rows(df), callback=MARKER_CALLBACK, name=name).add_to(m)
+    if not fit:
+        return m
+    m.fit_bounds([
+        [float(df['latitude'].min()), float(df['longitude'].min())],
+        [float(df['latitude'].max()), float(df['longitude'].max())],
+    ])
+    return m
+
+
+def add_district_stats_layer(m, rows, name="동별 평균 가격", fit=True):
+    # 동별 통계 [(동, 통계)] (stats_cube.StatsCube.breakdown) → 동마다 원 하나 (크기: 업소 수, 색: 평균 가격)
+    import folium  # 지도 시각화 라이브러리
+    from branca.colormap import LinearColormap  # folium이 쓰는 색상 척도
+
+    prices = [cell["price_mean"] for _, cell in rows if cell["price_mean"] is not None]
+    if not prices:
+        return m
+    colormap = LinearColormap(["#2c7bb6", "#ffffbf", "#d7191c"], vmin=min(prices), vmax=max(prices) + 1e-9,
+                              caption="평균 가격 (원)")
+    largest = max(cell["count"] for _, cell in rows)
+    layer = folium.FeatureGroup(name=name)
+    for dong, cell in rows:
+        color = colormap(cell["price_mean"]) if cell["price_mean"] is not None else "gray"
+        price = f"{cell['price_mean']:,.0f}원" if cell["price_mean"] is not None else "정보 없음"
+        folium.CircleMarker(
+            location=[cell["lat"], cell["lon"]],
+            radius=8 + 22 * (cell["count"] / largest) ** 0.5,
+            color=color, fill=True, fill_color=color, fill_opacity=0.6, weight=1,
+            tooltip=f"{html.escape(str(dong))}: {cell['count']}곳, 평균 {price}",
+        ).add_to(layer)
+    layer.add_to(m)
+    colormap.add_to(m)
+    if fit:
+        lat = [cell["lat"] for _, cell in rows]
+        lon = [cell["lon"] for _, cell in rows]
+        m.fit_bounds([[min(lat), min(lon)], [max(lat), max(lon)]])
+    return m
+
+
+# --------------------------------->
+# 지도 직렬화 / 표시
+# --------------------------------->
+# st_folium은 실행마다 folium 지도를 다시 렌더링해 HTML, 헤더, leaflet 스크립트를 만들고(큰 지도는 0.1초 이상),
+# 그 과정에서 지도 객체를 고친다. 지도를 만들 때 그 값들을 한 번만 만들어 두고(render_map_payload),
+# 실행마다 그대로 컴포넌트에 넘긴다(show_map). 캐시에는 문자열만 남으므로 세션끼리 지도 객체를 나눠 쓰지 않는다.
+# streamlit_folium 0.27의 내부 함수를 쓰므로 requirements.txt에서 0.27.x로 고정하고,
+# tests/test_map_layer.py가 내부 함수가 있는지와 st_folium과 같은 값을 보내는지 확인한다.
+STREAMLIT_FOLIUM_INTERNALS = (
+    "_component_func", "_get_html", "_get_header", "_get_map_string", "get_full_id", "generate_js_hash",
+)
+MAP_DEFAULTS = (
+    "last_clicked", "last_object_clicked", "last_object_clicked_count", "last_object_clicked_tooltip",
+    "last_object_clicked_popup", "all_drawings", "last_active_drawing", "last_circle_radius",
+    "last_circle_polygon", "selected_layers", "selected_tags", "last_geocoder_result",
+)
+
+
+def _bounds_dict(bounds):
+    (south, west), (north, east) = bounds
+    return {"_southWest": {"lat": south, "lng": west}, "_northEast": {"lat": north, "lng": east}}
+
+
+def _asset_links(m):
+    # 지도에 쓰인 요소들의 CSS/JS 링크 (중복 제거, 색상 척도가 있으면 d3 포함)
+    from branca.colormap import ColorMap  # folium이 쓰는 색상 척도
+
+    css_links, js_links = [], []
+    stack = [m]
+    while stack:
+        element = stack.pop(0)
+        if isinstance(element, ColorMap):
+            js_links[:0] = ["https://d3js.org/d3.v4.min.js", "https://cdnjs.cloudflare.com/ajax/libs/d3/3.5.5/d3.min.js"]
+        css_links.extend(href for _, href in getattr(element, "default_css", []))
+        js_links.extend(src for _, src in getattr(element, "default_js", []))
+        stack[:0] = list(getattr(element, "_children", {}).values())
+    return list(dict.fromkeys(css_links)), list(dict.fromkeys(js_links))
+
+
+def render_map_payload(m, key):
+    # 새로 만든 folium 지도 → 컴포넌트에 넘길 값 dict (지도 객체는 이후 쓰지 않음)
+    import streamlit_folium as sf  # Streamlit에서 Folium 지도를 사용하기 위한 라이브러리
+
+    m.get_root().render()
+    m.render()
+    html_text = sf._get_html(m)
+    header = sf._get_header(m)
+    script = sf._get_map_string(m)
+    css_links, js_links = _asset_links(m)
+    try:
+        bounds = m.get_bounds()
+    except AttributeError:
+        bounds = [[None, None], [None, None]]
+    return {
+        "script": script, "header": header, "html": html_text, "id": sf.get_full_id(m),
+        "hash_key": sf.generate_js_hash(script, key, False),
+        "bounds": _bounds_dict(bounds), "zoom": m.options.get("zoom"),
+        "css_links": css_links, "js_links": js_links,
+        "bytes": len(script.encode('utf-8')) + len(header.encode('utf-8')) + len(html_text.encode('utf-8')),
+    }
+
+
+def show_map(payload, key, width="100%", height=600, returned_objects=None):
+    # 미리 만든 지도 값으로 st_folium 컴포넌트 표시 → 돌려받은 값 dict (st.session_state[key]에도 저장)
+    import streamlit as st  # type: ignore
+    import streamlit_folium as sf  # Streamlit에서 Folium 지도를 사용하기 위한 라이브러리
+
+    defaults = dict.fromkeys(MAP_DEFAULTS, None)
+    defaults.update(bounds=payload["bounds"], zoom=payload["zoom"])
+    if returned_objects is not None:
+        defaults = {name: value for name, value in defaults.items() if name in returned_objects}
+    hash_key = payload["hash_key"]
+
+    def on_change():
+        st.session_state[key] = st.session_state.get(hash_key, {})
+
+    return sf._component_func(
+        script=payload["script"], header=payload["header"], html=payload["html"], id=payload["id"],
+        key=hash_key, height=height, width=width, returned_objects=returned_objects, default=defaults,
+        zoom=None, center=None, feature_group=None, return_on_hover=False, layer_control=None,
+        pixelated=False, css_links=payload["css_links"], js_links=payload["js_links"],
+        on_change=on_change, wrap_longitude=False,
+    )
+
+
+# --------------------------------->
+# 업소 상세 정보 (클릭 시 표시)
+# --------------------------------->
+POPUP_TEMPLATE = """
+<div style="font-family: 'Arial'; border-radius: 8px; padding: 10px; background-color: #f9f9f9;
+            box-shadow: 2px 2px 6px rgba(0,0,0,0.1); display: flex; flex-direction: column; justify-content: flex-start;">
+    <h4 style="margin: 0 auto 8px auto; color: #2c3e50; text-align: center;">{name}</h4>
+    <p style="margin: 3px 0;"><b>업종:</b> {category}</p>
+    <p style="margin: 3px 0;"><b>평균가격:</b> {price}</p>
+    <p style="margin: 3px 0;"><b>상품권 가맹:</b> {voucher}</p>
+    <p style="margin: 3px 0;"><b>위생등급:</b> {grade}</p>
+    <p style="margin: 3px 0;"><b>행정처분:</b> {sanction}</p>
+</div>
+"""
+
+
+def _text_column(series, missing):
+    return series.astype(object).where(series.notna(), missing).astype(str).map(html.escape).tolist()
+
+
+def build_popup_table(df):
+    # 행 번호(업소 id) 순서의 상세 정보 HTML 목록 (데이터 버전당 한 번 생성)
+    price = df['가격'].astype(object).where(df['가격'].notna(), '정보 없음')
+    columns = zip(
+        _text_column(df['사업장명'], ''),
+        _text_column(df['업종'], ''),
+        price.astype(str).tolist(),
+        _text_column(df['사랑상품권'], ''),
+        _text_column(df['위생등급'], '미지정'),
+        _text_column(df['행정처분'], '없음'),
+    )
+    return [
+        POPUP_TEMPLATE.format(name=n, category=c, price=p, voucher=v, grade=g, sanction=s)
+        for n, c, p, v, g, s in columns
+    ]
+
+
+def find_clicked_shop(df, clicked, tooltip=None):
+    # st_folium이 돌려준 클릭 좌표(와 툴팁)로 업소 행 번호를 찾음, 없으면 None
+    if not clicked:
+        return None
+    lat = df['latitude'].to_numpy(dtype=np.float64).round(COORD_DECIMALS)
+    lon = df['longitude'].to_numpy(dtype=np.float64).round(COORD_DECIMALS)
+    hits = np.flatnonzero(
+        (lat == round(float(clicked['lat']), COORD_DECIMALS)) & (lon == round(float(clicked['lng']), COORD_DECIMALS))
+    )
+    if len(hits) > 1 and tooltip:
+        # 같은 건물에 여러 업소가 있으면 툴팁(업소명)으로 구분
+        named = hits[df['사업장명'].to_numpy()[hits] == tooltip]
+        if len(named):
+            hits = named
+    return int(hits[0]) if len(hits) else None
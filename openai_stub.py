@@ -0,0 +1,163 @@
+# 로컬 OpenAI 호환 스텁 서버
+# /v1/chat/completions 요청에 정해진 답변을 (스트리밍이면 SSE로 한 조각씩) 돌려준다.
+# 네트워크나 API 키 없이 스트리밍 표시, 지연 시간 측정, 일괄 평가 처리량 측정을 할 때 사용한다.
+#
+# 사용 예:
+#   python openai_stub.py --port 8765 --ttft 0.3 --token-delay 0.02
+#   OPENAI_BASE_URL=http://127.0.0.1:8765/v1 streamlit run gjg2.py
+#   python openai_stub.py --rate-limit-every 10   # 10번째 요청마다 429 (재시도 처리 확인용)
+import argparse
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_REPLY = (
+    "업소명: 서북면옥\n"
+    "- 가격: 30점 (업종 평균보다 저렴)\n"
+    "- 위생·청결: 20점\n"
+    "- 공공성: 1점 (지역화폐 가맹)\n"
+    "총점: 51점 → 지정 가능\n"
+)
+
+
+class StubConfig:
+    def __init__(self, reply=DEFAULT_REPLY, ttft=0.0, token_delay=0.0, chunk_chars=4,
+                 rate_limit_every=0, retry_after=0.1):
+        self.reply = reply
+        self.ttft = ttft                # 첫 조각까지 지연(초)
+        self.token_delay = token_delay  # 조각 사이 지연(초)
+        self.chunk_chars = chunk_chars  # 조각당 글자 수
+        self.rate_limit_every = rate_limit_every  # N번째 요청마다 429 응답 (0이면 사용 안 함)
+        self.retry_after = retry_after            # 429 응답의 Retry-After(초)
+        self.requests = 0
+        self.rate_limited = 0
+        self.lock = threading.Lock()
+
+
+def _usage(messages, reply):
+    # 대략적인 토큰 수 (글자 수 기준)
+    prompt_chars = sum(len(str(m.get("content", ""))) for m in messages)
+    return {"prompt_tokens": prompt_chars // 2, "completion_tokens": len(reply) // 2,
+            "total_tokens": (prompt_chars + len(reply)) // 2}
+
+
+def make_handler(config):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _send_json(self, status, payload, headers=None):
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self._send_json(404, {"error": {"message": "not found"}})
+                return
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            with config.lock:
+                config.requests += 1
+                limited = config.rate_limit_every and config.requests % config.rate_limit_every == 0
+                if limited:
+                    config.rate_limited += 1
+            if limited:
+                self._send_json(429, {"error": {"message": "Rate limit reached (stub)", "type": "requests",
+                                                "code": "rate_limit_exceeded"}},
+                                headers={"Retry-After": str(config.retry_after)})
+                return
+
+            model = request.get("model", "stub")
+            reply = config.reply
+            completion_id = "chatcmpl-" + uuid.uuid4().hex[:12]
+            created = int(time.time())
+            usage = _usage(request.get("messages", []), reply)
+            time.sleep(config.ttft)
+
+            if not request.get("stream"):
+                self._send_json(200, {
+                    "id": completion_id, "object": "chat.completion", "created": created, "model": model,
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": reply},
+                                 "finish_reason": "stop"}],
+                    "usage": usage,
+                })
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+
+            def send_event(payload):
+                data = ("data: " + (payload if isinstance(payload, str) else json.dumps(payload, ensure_ascii=False))
+                        + "\n\n").encode("utf-8")
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+
+            def chunk(delta, finish_reason=None):
+                return {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+
+            send_event(chunk({"role": "assistant", "content": ""}))
+            for start in range(0, len(reply), config.chunk_chars):
+                send_event(chunk({"content": reply[start:start + config.chunk_chars]}))
+                time.sleep(config.token_delay)
+            send_event(chunk({}, "stop"))
+            if (request.get("stream_options") or {}).get("include_usage"):
+                send_event({"id": completion_id, "object": "chat.completion.chunk", "created": created,
+                            "model": model, "choices": [], "usage": usage})
+            send_event("[DONE]")
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+
+    return Handler
+
+
+def start_stub_server(host="127.0.0.1", port=0, **config_kwargs):
+    # 백그라운드 스레드로 서버 시작, (서버, 설정, base_url) 반환 (port=0이면 빈 포트 자동 선택)
+    config = StubConfig(**config_kwargs)
+    server = ThreadingHTTPServer((host, port), make_handler(config))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://{host}:{server.server_address[1]}/v1"
+    return server, config, base_url
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="로컬 OpenAI 호환 스텁 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--ttft", type=float, default=0.0, help="첫 조각까지 지연(초)")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="조각 사이 지연(초)")
+    parser.add_argument("--reply-file", help="답변으로 돌려줄 텍스트 파일")
+    parser.add_argument("--rate-limit-every", type=int, default=0, help="N번째 요청마다 429 응답")
+    parser.add_argument("--retry-after", type=float, default=0.1, help="429 응답의 Retry-After(초)")
+    args = parser.parse_args(argv)
+
+    reply = DEFAULT_REPLY
+    if args.reply_file:
+        with open(args.reply_file, encoding="utf-8") as f:
+            reply = f.read()
+    config = StubConfig(reply=reply, ttft=args.ttft, token_delay=args.token_delay,
+                        rate_limit_every=args.rate_limit_every, retry_after=args.retry_after)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(config))
+    print(f"OpenAI 스텁 서버: http://{args.host}:{args.port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# 인허가 원본 CSV 전처리
+# 좌표정보(X)/(Y)(중부원점 TM)를 WGS84 위경도로 한 번에 변환해 비어 있는 위경도를 채우고,
+# 앱이 읽는 컬럼 구성으로 정리한 CSV를 만든다. (주소 지오코딩 API 호출 없음)
+# 기존 위경도가 있는 행은 변환값과 비교해 차이를 출력하므로 좌표계 설정을 확인할 수 있다.
+#
+# 사용 예:
+#   python preprocess.py 인허가원본.csv -o 광진구_추천업소_전처리_위경도추가.csv
+#   python preprocess.py 인허가원본.csv --recompute          # 기존 위경도도 모두 TM 변환값으로 교체
+import argparse
+import os
+import time
+
+import numpy as np  # 수치 연산 라이브러리
+import pandas as pd  # 데이터 분석 라이브러리
+
+from data_store import TM_COLUMNS, fill_coordinates, normalize_shop_frame, numeric_column
+from spatial_index import haversine_m
+from tm_coords import DEFAULT_PROJECTION, PROJECTIONS, tm_to_wgs84
+
+
+def coordinate_report(raw, projection=DEFAULT_PROJECTION):
+    # 위경도와 TM 좌표가 모두 있는 행에서 변환값과의 거리 차이(m) 통계
+    lat, lon = numeric_column(raw, 'latitude'), numeric_column(raw, 'longitude')
+    x, y = numeric_column(raw, TM_COLUMNS[0]), numeric_column(raw, TM_COLUMNS[1])
+    both = ~(np.isnan(lat) | np.isnan(lon) | np.isnan(x) | np.isnan(y))
+    if not both.any():
+        return None
+    tm_lat, tm_lon = tm_to_wgs84(x[both], y[both], projection)
+    dist = haversine_m(lat[both], lon[both], tm_lat, tm_lon)
+    return {
+        "rows": int(both.sum()),
+        "median_m": float(np.median(dist)),
+        "p99_m": float(np.percentile(dist, 99)),
+        "max_m": float(dist.max()),
+        "over_50m": int((dist > 50).sum()),
+    }
+
+
+def preprocess(csv_path, out_path, projection=DEFAULT_PROJECTION, recompute=False):
+    started = time.perf_counter()
+    raw = pd.read_csv(csv_path, low_memory=False)
+    raw.columns = [str(c).lstrip('﻿') for c in raw.columns]
+    if not all(col in raw.columns for col in TM_COLUMNS):
+        raise SystemExit(f"TM 좌표 컬럼이 없습니다: {', '.join(TM_COLUMNS)}")
+
+    report = coordinate_report(raw, projection)
+    if report:
+        print(f"기존 위경도 {report['rows']}행과 비교 ({projection}): 중앙값 {report['median_m']:.2f}m, "
+              f"99% {report['p99_m']:.1f}m, 최대 {report['max_m']:.0f}m, 50m 초과 {report['over_50m']}행")
+
+    filled = fill_coordinates(raw, projection, overwrite=recompute)
+    df = normalize_shop_frame(raw)
+    df.to_csv(out_path, index=False, encoding='utf-8-sig')
+    print(f"{len(raw)}행 중 위경도 {filled}행 {'재계산' if recompute else '채움'}, 위치 없는 {len(raw) - len(df)}행 제외 "
+          f"→ {out_path} ({len(df)}행, {time.perf_counter() - started:.1f}초)")
+    return df
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="인허가 CSV의 TM 좌표를 WGS84 위경도로 변환해 앱용 CSV 생성")
+    parser.add_argument("csv", help="원본 CSV 경로 (좌표정보(X), 좌표정보(Y) 컬럼 필요)")
+    parser.add_argument("-o", "--out", help="출력 CSV 경로 (기본: 원본이름_위경도.csv)")
+    parser.add_argument("--projection", default=DEFAULT_PROJECTION, choices=sorted(PROJECTIONS),
+                        help="TM 좌표계")
+    parser.add_argument("--recompute", action="store_true", help="기존 위경도도 TM 변환값으로 교체")
+    args = parser.parse_args(argv)
+
+    out_path = args.out or os.path.splitext(args.csv)[0] + "_위경도.csv"
+    preprocess(args.csv, out_path, args.projection, args.recompute)
+
+
+if __name__ == "__main__":
+    main()
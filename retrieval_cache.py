@@ -0,0 +1,120 @@
+# 벡터 검색 캐시
+# 1단계: 정규화한 질문 → 질문 임베딩
+# 2단계: (컬렉션, 컬렉션 버전, 임베딩, n_results, 필터) → 검색 결과
+# 둘 다 만료 시간(TTL)이 있는 LRU이며, 컬렉션이 다시 적재되어 버전이 바뀌면 그 컬렉션의 검색 결과를 비운다.
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np  # 수치 연산 라이브러리
+
+from filter_index import normalize_text
+
+
+class TTLCache:
+    def __init__(self, maxsize=1024, ttl=3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key → (저장 시각, 값)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] <= self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def get_or_set(self, key, compute):
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.set(key, value)
+        return value
+
+    def discard_where(self, predicate):
+        with self._lock:
+            for key in [k for k in self._entries if predicate(k)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+            }
+
+
+def collection_version(collection):
+    # ingest.py가 기록한 적재 버전, 없으면 문서 수로 대신함
+    metadata = getattr(collection, 'metadata', None) or {}
+    version = metadata.get('ingest_version')
+    return version if version else f"count:{collection.count()}"
+
+
+def _vector_key(embedding):
+    return hashlib.sha1(np.asarray(embedding, dtype=np.float32).tobytes()).hexdigest()
+
+
+class RetrievalCache:
+    def __init__(self, max_embeddings=4096, max_results=1024, embedding_ttl=24 * 3600, result_ttl=3600):
+        self.embeddings = TTLCache(max_embeddings, embedding_ttl)
+        self.results = TTLCache(max_results, result_ttl)
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def embedding(self, query, embed):
+        # embed: 질문 문자열 → 벡터
+        return self.embeddings.get_or_set(normalize_text(query), lambda: np.asarray(embed(query), dtype=np.float32))
+
+    def _check_version(self, collection_name, version):
+        # 컬렉션이 다시 적재되었으면 이전 버전의 검색 결과를 정리
+        with self._lock:
+            previous = self._versions.get(collection_name)
+            self._versions[collection_name] = version
+        if previous is not None and previous != version:
+            self.results.discard_where(lambda key: key[0] == collection_name and key[1] != version)
+
+    def search(self, collection_name, version, embedding, n_results, where, run_query):
+        # run_query: 캐시에 없을 때 실제 검색을 수행하는 함수
+        self._check_version(collection_name, version)
+        key = (
+            collection_name,
+            version,
+            _vector_key(embedding),
+            n_results,
+            json.dumps(where, ensure_ascii=False, sort_keys=True) if where else None,
+        )
+        return self.results.get_or_set(key, run_query)
+
+    def invalidate(self, collection_name=None):
+        if collection_name is None:
+            self.results.clear()
+        else:
+            self.results.discard_where(lambda key: key[0] == collection_name)
+
+    def stats(self):
+        return {'embeddings': self.embeddings.stats(), 'results': self.results.stats()}
@@ -0,0 +1,88 @@
+# 착한가격업소 평가표 자동 채점
+# 55점 평가표 중 데이터로 판단할 수 있는 항목(가격 수준, 위생등급, 지역화폐 가맹, 착한업소 표찰, 행정처분 결격)을
+# 모든 업소에 대해 한 번에(벡터 연산) 계산한다.
+# 현장 확인이 필요한 항목(위생 세부 점검, 기부 등)은 점수에 넣지 않고 '최대점수'(확인되면 받을 수 있는 최대치)로만 반영한다.
+import numpy as np  # 수치 연산 라이브러리
+import pandas as pd  # 데이터 분석 라이브러리
+
+PASS_SCORE = 40        # 지정 기준 점수
+PRICE_POINTS = 30      # 가격수준 (인근 상권 평균보다 저렴)
+HYGIENE_POINTS = 20    # 위생·청결 (위생등급 '좋음' 이상이면 만점 간주)
+PUBLIC_ITEMS = 5       # 공공성 / 지역사회 공헌 (항목당 1점)
+DATA_PUBLIC_ITEMS = 2  # 그중 데이터로 확인하는 항목 수 (지역화폐 가맹, 착한업소 표찰)
+
+FOOD_TYPES = ('일반음식점', '휴게음식점', '제과점영업')
+HYGIENE_GRADES = ('매우우수', '우수', '좋음')
+CLOSED_PATTERN = '휴업|폐업'
+
+# 업종×동 평균을 기준 가격으로 쓰기 위한 최소 업소 수 (적으면 업종 전체 평균)
+MIN_GROUP_SIZE = 3
+
+SCORE_COLUMNS = ['요식업', '기준가격', '가격비율', '가격점수', '위생점수', '공공성점수', '점수', '최대점수', '결격사유', '판정']
+
+
+def price_reference(df, min_group_size=MIN_GROUP_SIZE):
+    # 업소별 비교 기준 가격: 같은 업종·같은 동 평균 (업소가 적으면 같은 업종 평균)
+    price = df['가격'].astype('float64')
+    by_type = price.groupby(df['업종'], observed=True).transform('mean')
+    local = price.groupby([df['업종'], df['동']], observed=True)
+    local_mean = local.transform('mean')
+    local_count = local.transform('count')
+    return local_mean.where(local_count >= min_group_size, by_type)
+
+
+def score_shops(df, min_group_size=MIN_GROUP_SIZE):
+    # df와 같은 행 순서의 채점 결과 (SCORE_COLUMNS)
+    price = df['가격'].astype('float64').to_numpy()
+    reference = price_reference(df, min_group_size).to_numpy()
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ratio = price / reference
+    price_known = ~np.isnan(ratio)
+    price_points = np.where(price_known & (ratio < 1.0), PRICE_POINTS, 0)
+
+    hygiene_points = np.where(df['위생등급'].isin(HYGIENE_GRADES).to_numpy(), HYGIENE_POINTS, 0)
+    public_points = (df['사랑상품권'].eq('가능').fillna(False).to_numpy().astype(int)
+                     + df['착한업소'].eq('등록').fillna(False).to_numpy().astype(int))
+    score = price_points + hygiene_points + public_points
+
+    # 현장 확인으로 더 받을 수 있는 점수: 가격 정보 없음 → 가격, 위생등급 없음 → 위생, 나머지 공공성 항목
+    max_score = (score + np.where(price_known, 0, PRICE_POINTS) + np.where(hygiene_points, 0, HYGIENE_POINTS)
+                 + (PUBLIC_ITEMS - DATA_PUBLIC_ITEMS))
+
+    # 필수 결격 사유: 행정처분 이력, 휴업/폐업
+    sanctioned = df['행정처분'].eq('있음').fillna(False).to_numpy()
+    closed = df['영업상태명'].astype('string').str.contains(CLOSED_PATTERN).fillna(False).to_numpy()
+    reason = np.where(sanctioned, '행정처분 이력', np.where(closed, '휴업/폐업', ''))
+
+    verdict = np.select(
+        [reason != '', score >= PASS_SCORE, max_score < PASS_SCORE],
+        ['지정 불가', '지정 가능', '지정 불가'],
+        '현장 확인 필요',
+    )
+    return pd.DataFrame({
+        '요식업': df['업종구분'].isin(FOOD_TYPES).to_numpy(),
+        '기준가격': reference.round(),
+        '가격비율': ratio,
+        '가격점수': price_points,
+        '위생점수': hygiene_points,
+        '공공성점수': public_points,
+        '점수': score,
+        '최대점수': max_score,
+        '결격사유': reason,
+        '판정': verdict,
+    }, index=df.index)
+
+
+def describe_score(shop, score):
+    # 프롬프트/화면에 넣을 한 줄 요약
+    if np.isnan(score['가격비율']):
+        price = "정보 없음 0점"
+    else:
+        price = (f"{int(shop['가격']):,}원 (기준 {int(score['기준가격']):,}원, {score['가격비율']:.0%}) "
+                 f"{score['가격점수']}점")
+    line = (f"{shop['사업장명']} [{'요식업' if score['요식업'] else '비요식업'}] 가격 {price}, "
+            f"위생 {score['위생점수']}점, 공공성 {score['공공성점수']}점 → 합계 {score['점수']}점 "
+            f"(현장 확인 시 최대 {score['최대점수']}점), {score['판정']}")
+    if score['결격사유']:
+        line += f" - 결격: {score['결격사유']}"
+    return line
@@ -0,0 +1,155 @@
+# 업소 위치 공간 인덱스
+# 위도/경도를 일정 크기 격자 칸으로 나눠 칸별 행 번호를 모아두고,
+# 지도 화면 범위(bbox) 조회와 반경/최근접(k개) 조회를 벡터화된 haversine 거리로 처리한다.
+import math
+import re
+
+import numpy as np  # 수치 연산 라이브러리
+
+EARTH_RADIUS_M = 6371008.8
+EMPTY_IDS = np.empty(0, dtype=np.int32)
+
+# 자주 묻는 기준 위치 (지하철역, 주요 시설)
+LANDMARKS = {
+    "건대입구역": (37.540372, 127.069276),
+    "구의역": (37.537077, 127.085916),
+    "강변역": (37.535095, 127.094681),
+    "아차산역": (37.551691, 127.089761),
+    "광나루역": (37.545303, 127.103485),
+    "군자역": (37.557121, 127.079542),
+    "중곡역": (37.565923, 127.084350),
+    "어린이대공원역": (37.548014, 127.074658),
+    "뚝섬유원지역": (37.531528, 127.066700),
+    "광진구청": (37.538617, 127.082375),
+    "세종대학교": (37.550418, 127.073229),
+    "건국대학교": (37.540658, 127.079431),
+}
+
+
+def haversine_m(lat, lon, lats, lons):
+    # 한 지점(또는 같은 길이의 지점 배열)에서 여러 지점까지의 거리(m), 배열 단위 계산
+    lat1, lon1 = np.radians(np.asarray(lat, dtype=np.float64)), np.radians(np.asarray(lon, dtype=np.float64))
+    lat2, lon2 = np.radians(lats.astype(np.float64)), np.radians(lons.astype(np.float64))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def radius_bbox(lat, lon, radius_m):
+    # 반경을 포함하는 (남, 서, 북, 동) 범위
+    dlat = math.degrees(radius_m / EARTH_RADIUS_M)
+    dlon = dlat / max(math.cos(math.radians(lat)), 1e-6)
+    return lat - dlat, lon - dlon, lat + dlat, lon + dlon
+
+
+def snap_bbox(bbox, step, pad=0.5):
+    # 지도 화면 범위를 여유 있게 넓히고 격자에 맞춰, 조금 움직여도 같은 범위(= 같은 캐시 키)가 되도록 함
+    south, west, north, east = bbox
+    dlat, dlon = (north - south) * pad, (east - west) * pad
+    return (
+        math.floor((south - dlat) / step) * step,
+        math.floor((west - dlon) / step) * step,
+        math.ceil((north + dlat) / step) * step,
+        math.ceil((east + dlon) / step) * step,
+    )
+
+
+def parse_location_query(text, default_radius_m=500):
+    # "건대입구역 500m 근처", "구의역 1km 이내" 같은 질문에서 (기준 위치, 반경 m) 추출, 없으면 None
+    landmark = next((name for name in LANDMARKS if name in text), None)
+    if landmark is None:
+        return None
+    match = re.search(r'(\d+(?:\.\d+)?)\s*(km|킬로|m|미터)', text, re.IGNORECASE)
+    if match:
+        value = float(match.group(1))
+        radius_m = value * 1000 if match.group(2).lower() in ('km', '킬로') else value
+    else:
+        radius_m = default_radius_m
+    return landmark, radius_m
+
+
+# --------------------------------->
+# 격자 공간 인덱스
+# --------------------------------->
+class SpatialIndex:
+    def __init__(self, lats, lons, cell_deg=0.002):
+        # cell_deg 0.002도 ≈ 위도 방향 220m
+        self.lats = np.asarray(lats, dtype=np.float64)
+        self.lons = np.asarray(lons, dtype=np.float64)
+        self.size = len(self.lats)
+        self.cell_deg = cell_deg
+
+        rows, cols = self._cells(self.lats, self.lons)
+        keys = self._key(rows, cols)
+        order = np.argsort(keys, kind='stable')
+        sorted_keys = keys[order]
+        self._ids = order.astype(np.int32)
+        starts = np.flatnonzero(np.concatenate(([True], sorted_keys[1:] != sorted_keys[:-1]))) if self.size else EMPTY_IDS
+        self._keys = sorted_keys[starts]
+        self._offsets = np.append(starts, self.size).astype(np.int64)
+
+    @classmethod
+    def from_frame(cls, df, **kwargs):
+        return cls(df['latitude'].to_numpy(), df['longitude'].to_numpy(), **kwargs)
+
+    def _cells(self, lats, lons):
+        return (np.floor(np.asarray(lats) / self.cell_deg).astype(np.int64),
+                np.floor(np.asarray(lons) / self.cell_deg).astype(np.int64))
+
+    @staticmethod
+    def _key(rows, cols):
+        return (rows << 32) + (cols & 0xFFFFFFFF)
+
+    def _candidates(self, south, west, north, east):
+        # 범위에 걸치는 격자 칸의 행 번호 (정렬 안 됨)
+        (r0, r1), (c0, c1) = self._cells([south, north], [west, east])
+        if self.size == 0 or (r1 - r0 + 1) * (c1 - c0 + 1) > len(self._keys):
+            # 범위가 넓으면 칸을 하나씩 찾는 것보다 전체를 보는 편이 빠름
+            return np.arange(self.size, dtype=np.int32)
+        rr, cc = np.meshgrid(np.arange(r0, r1 + 1), np.arange(c0, c1 + 1), indexing='ij')
+        keys = self._key(rr.ravel(), cc.ravel())
+        pos = np.searchsorted(self._keys, keys)
+        pos_ok = pos < len(self._keys)
+        found = pos[pos_ok][self._keys[pos[pos_ok]] == keys[pos_ok]]
+        if len(found) == 0:
+            return EMPTY_IDS
+        return np.concatenate([self._ids[self._offsets[k]:self._offsets[k + 1]] for k in found])
+
+    def bbox(self, south, west, north, east, ids=None):
+        # 화면 범위 안의 행 번호 (정렬됨), ids를 주면 그 안에서만
+        cand = self._candidates(south, west, north, east)
+        lat, lon = self.lats[cand], self.lons[cand]
+        result = np.sort(cand[(lat >= south) & (lat <= north) & (lon >= west) & (lon <= east)])
+        if ids is not None:
+            result = np.intersect1d(result, ids, assume_unique=True)
+        return result.astype(np.int32, copy=False)
+
+    def radius(self, lat, lon, radius_m, ids=None):
+        # 반경 안의 (행 번호, 거리 m)를 가까운 순으로
+        cand = self._candidates(*radius_bbox(lat, lon, radius_m))
+        if ids is not None:
+            cand = np.intersect1d(cand, ids)
+        dist = haversine_m(lat, lon, self.lats[cand], self.lons[cand])
+        inside = dist <= radius_m
+        cand, dist = cand[inside], dist[inside]
+        order = np.argsort(dist, kind='stable')
+        return cand[order].astype(np.int32, copy=False), dist[order]
+
+    def nearest(self, lat, lon, k=10, ids=None):
+        # 가장 가까운 k개의 (행 번호, 거리 m): 반경을 두 배씩 넓혀가며 찾음
+        total = self.size if ids is None else len(ids)
+        k = min(k, total)
+        if k <= 0:
+            return EMPTY_IDS, np.empty(0)
+        radius_m = self.cell_deg * 111_000
+        while True:
+            found, dist = self.radius(lat, lon, radius_m, ids=ids)
+            if len(found) >= k or radius_m > 50_000:
+                break
+            radius_m *= 2
+        if len(found) < k:
+            # 반경 밖에 흩어진 경우 전체 거리 계산
+            cand = np.arange(self.size, dtype=np.int32) if ids is None else np.asarray(ids, dtype=np.int32)
+            dist = haversine_m(lat, lon, self.lats[cand], self.lons[cand])
+            order = np.argsort(dist, kind='stable')
+            found, dist = cand[order], dist[order]
+        return found[:k], dist[:k]
@@ -0,0 +1,218 @@
+# 업소 통계 큐브
+# 동 x 업종 x 사랑상품권 x 착한업소의 모든 조합(각 차원의 "전체" 포함)별 업소 수, 대표 가격 평균/중앙값,
+# 위생등급 분포, 평균 위치를 데이터 버전당 한 번 미리 계산해 두고, 조회는 dict 한 번으로 답한다.
+#   - 지도: 동별 평균 가격 레이어 (업소 마커 대신 동마다 원 하나)
+#   - 챗봇: "구의동 분식 평균가격"처럼 통계만 묻는 질문은 검색/LLM 없이 바로 답변
+import re
+from itertools import combinations
+
+import numpy as np  # 수치 연산 라이브러리
+import pandas as pd  # 데이터 분석 라이브러리
+
+from filter_index import normalize_text
+from scoring import HYGIENE_GRADES
+from spatial_index import parse_location_query
+
+DIMENSIONS = ("동", "업종", "사랑상품권", "착한업소")
+MISSING_VALUE = "정보 없음"
+MISSING_GRADE = "미지정"
+
+
+class StatsCube:
+    def __init__(self, cells, values):
+        self.cells = cells  # (동, 업종, 사랑상품권, 착한업소) → 통계 dict, None은 그 차원 전체
+        self.values = values  # 차원 → 값 목록 (업소 수가 많은 순)
+
+    @classmethod
+    def from_frame(cls, df):
+        frame = pd.DataFrame({dim: df[dim].astype(object).where(df[dim].notna(), MISSING_VALUE) for dim in DIMENSIONS})
+        frame['가격'] = pd.to_numeric(df['가격'], errors='coerce').astype('float64')
+        frame['위생등급'] = df['위생등급'].astype(object).where(df['위생등급'].notna(), MISSING_GRADE)
+        frame['latitude'] = df['latitude'].astype('float64')
+        frame['longitude'] = df['longitude'].astype('float64')
+        values = {dim: frame[dim].value_counts().index.tolist() for dim in DIMENSIONS}
+
+        cells = {}
+        # 차원 부분집합(16가지)마다 groupby 한 번씩
+        for size in range(len(DIMENSIONS) + 1):
+            for dims in combinations(DIMENSIONS, size):
+                positions = [DIMENSIONS.index(dim) for dim in dims]
+
+                def key(group):
+                    group = group if isinstance(group, tuple) else (group,)
+                    full = [None] * len(DIMENSIONS)
+                    for position, value in zip(positions, group):
+                        full[position] = value
+                    return tuple(full)
+
+                grouped = frame.groupby(list(dims), sort=False) if dims else frame.groupby(np.zeros(len(frame)))
+                stats = grouped.agg(
+                    shops=('가격', 'size'), price_count=('가격', 'count'), price_mean=('가격', 'mean'),
+                    price_median=('가격', 'median'), lat=('latitude', 'mean'), lon=('longitude', 'mean'),
+                )
+                grades = (frame.groupby(list(dims) + ['위생등급'], sort=False) if dims
+                          else frame.groupby('위생등급', sort=False)).size()
+                for group, row in zip(stats.index if dims else [()], stats.itertuples(index=False)):
+                    cells[key(group)] = {
+                        "count": int(row.shops),
+                        "price_count": int(row.price_count),
+                        "price_mean": None if np.isnan(row.price_mean) else float(row.price_mean),
+                        "price_median": None if np.isnan(row.price_median) else float(row.price_median),
+                        "lat": float(row.lat),
+                        "lon": float(row.lon),
+                        "hygiene": {},
+                    }
+                for group, n in grades.items():
+                    group = group if isinstance(group, tuple) else (group,)
+                    cells[key(group[:-1])]["hygiene"][group[-1]] = int(n)
+        return cls(cells, values)
+
+    def cell(self, **conditions):
+        # 조건(차원=값, 없으면 전체)의 통계, 해당 업소가 없으면 None
+        return self.cells.get(tuple(conditions.get(dim) for dim in DIMENSIONS))
+
+    def breakdown(self, dim, **conditions):
+        # 한 차원의 값별 통계 [(값, 통계)] (나머지 조건 고정, 업소가 있는 값만)
+        rows = []
+        for value in self.values[dim]:
+            cell = self.cell(**dict(conditions, **{dim: value}))
+            if cell:
+                rows.append((value, cell))
+        return rows
+
+
+def frame_breakdown(df, dim):
+    # 큐브로 표현할 수 없는 조건(검색어, 위치 등)이 걸린 업소 목록의 값별 통계 (breakdown과 같은 형식)
+    return StatsCube.from_frame(df).breakdown(dim) if len(df) else []
+
+
+# --------------------------------->
+# 통계 질문 바로 답하기
+# --------------------------------->
+# 통계를 묻는 표현과, 업소를 찾거나 평가해 달라는 표현(있으면 검색 + LLM으로 보냄)
+STATS_PATTERN = re.compile(r"평균(?!적)|중앙값|중간값|몇\s*(개|곳|군데)|개수|업소\s*수|통계|분포|가격대")
+SEARCH_PATTERN = re.compile(r"추천|어디|평가|리뷰|후보|보다|심사|지정\s*가능")
+BY_PATTERNS = {"동": re.compile(r"동\s*(별|마다)"), "업종": re.compile(r"업종\s*(별|마다)")}
+# 업종 이름 외에 자주 쓰는 말
+CATEGORY_ALIASES = {"카페": "까페", "중식": "중국식", "중국집": "중국식", "양식": "경양식", "치킨": "통닭(치킨)"}
+# 큐브로 나타낼 수 없는 조건: 숫자/가격 범위, 위생등급 값 (있으면 검색 + LLM으로 보냄)
+PRICE_PATTERN = re.compile(r"\d|[십백천만]\s*원|이하|이상|미만|초과|이내|저렴|싼|싸|비싼|비싸")
+HYGIENE_PATTERN = re.compile("|".join(HYGIENE_GRADES))
+# 조건과 통계 표현을 지운 뒤 남아도 되는 말 (업소를 가리키는 말, 조사, 어미, 문장 부호)
+STATS_WORDS = re.compile(r"가격|위생\s*등급|위생|통계|평균|전체|모든|모두|총")
+PAYMENT_WORDS = re.compile(r"(서울\s*)?(사랑\s*)?상품권|지역\s*화폐|미?가맹|불가능?|가능|안\s*(되|받)|받")
+FILLER_PATTERN = re.compile(
+    r"업소|가게|식당|음식점|집|곳|군데|개|수|얼마|어때|되|돼|있|없|나와|알려|보여|궁금|해|줘|주세요|"
+    r"이야|이에요|인가|인지|나요|요|야|은|는|이|가|을|를|의|에서|에|와|과|랑|하고|및|[\s?!.,~]"
+)
+
+
+def _aliases(value, dim):
+    # 값 하나를 가리키는 질문 속 표현 ("식육(숯불구이)" → 식육, 숯불구이 / "구의동" → 구의)
+    names = {normalize_text(value)}
+    if dim == "업종":
+        names.update(part.strip() for part in re.split(r"[(),]", normalize_text(value))
+                     if len(part.strip()) >= 2 and not part.strip().endswith("등"))
+    if dim == "동" and value.endswith("동") and len(value) >= 3:
+        names.add(normalize_text(value[:-1]))
+    return names
+
+
+def _match(text, cube, dim):
+    # 질문에 나온 (차원 값, 질문 속 표현) (가장 긴 표현 우선, 없으면 (None, None))
+    candidates = [(name, value) for value in cube.values[dim] if value != MISSING_VALUE
+                  for name in _aliases(value, dim)]
+    if dim == "업종":
+        candidates += [(alias, value) for alias, value in CATEGORY_ALIASES.items() if value in cube.values[dim]]
+    for name, value in sorted(candidates, key=lambda c: -len(c[0])):
+        if name in text:
+            return value, name
+    return None, None
+
+
+def parse_stats_question(question, cube, district=None):
+    # 통계만 묻는 질문이면 {"conditions", "by", "metric"}, 아니면 None
+    # 큐브 조건(동/업종/상품권/착한업소)과 통계 표현을 지우고 의미 있는 말이 남으면 통계 질문이 아님
+    # ("구의동 만원 이하 한식집 몇 곳", "건대입구역 근처 분식집 몇 개", "가격대 괜찮은 한식집 알려줘")
+    text = normalize_text(question)
+    if not STATS_PATTERN.search(text) or SEARCH_PATTERN.search(text):
+        return None
+    if parse_location_query(text) or PRICE_PATTERN.search(text) or HYGIENE_PATTERN.search(text):
+        return None
+    rest = text.replace(normalize_text(district), " ") if district else text
+    conditions = {}
+    for dim in ("동", "업종"):
+        value, name = _match(text, cube, dim)
+        if value is not None:
+            conditions[dim] = value
+            rest = rest.replace(name, " ")
+    if "상품권" in text:
+        if re.search(r"불가|안\s*되|안\s*받|미가맹", text) and "불가능" in cube.values["사랑상품권"]:
+            conditions["사랑상품권"] = "불가능"
+        elif "가능" in cube.values["사랑상품권"]:
+            conditions["사랑상품권"] = "가능"
+        rest = PAYMENT_WORDS.sub(" ", rest)
+    for value in sorted(cube.values["착한업소"], key=len, reverse=True):
+        if value != MISSING_VALUE and normalize_text(value) in text:
+            conditions["착한업소"] = value
+            rest = rest.replace(normalize_text(value), " ")
+            break
+    for pattern in (STATS_PATTERN, *BY_PATTERNS.values(), STATS_WORDS, FILLER_PATTERN):
+        rest = pattern.sub("", rest)
+    if rest:
+        return None
+    by = next((dim for dim, pattern in BY_PATTERNS.items() if pattern.search(text) and dim not in conditions), None)
+    if re.search(r"중앙값|중간값", text):
+        metric = "price_median"
+    elif "위생" in text:
+        metric = "hygiene"
+    elif re.search(r"평균|가격", text):
+        metric = "price_mean"
+    else:
+        metric = "count"
+    return {"conditions": conditions, "by": by, "metric": metric}
+
+
+def _won(value):
+    return f"{value:,.0f}원" if value is not None else "정보 없음"
+
+
+def _hygiene(cell):
+    return ", ".join(f"{grade} {n}곳" for grade, n in sorted(cell["hygiene"].items(), key=lambda g: -g[1]))
+
+
+def format_stats_answer(cube, query, district=None):
+    conditions = query["conditions"]
+    scope = " · ".join([district] * bool(district) + [
+        f"상품권 {value}" if dim == "사랑상품권" else value for dim, value in conditions.items()
+    ]) or "전체"
+    cell = cube.cell(**conditions)
+    if not cell:
+        return f"**{scope}** 조건에 맞는 업소가 없습니다."
+
+    lines = [
+        f"**{scope}** 업소 통계 (업소 데이터 기준, 사이드바 필터는 적용하지 않음)",
+        "",
+        f"- 업소 수: {cell['count']}곳",
+        f"- 대표 가격: 평균 {_won(cell['price_mean'])} / 중앙값 {_won(cell['price_median'])} "
+        f"(가격 정보 {cell['price_count']}곳)",
+        f"- 위생등급: {_hygiene(cell)}",
+    ]
+    if "사랑상품권" not in conditions:
+        accepted = cube.cell(**dict(conditions, 사랑상품권="가능"))
+        lines.append(f"- 서울사랑상품권 가맹: {accepted['count'] if accepted else 0}곳")
+
+    if query["by"]:
+        metric = query["metric"] if query["metric"] in ("price_mean", "price_median") else "count"
+        rows = sorted(cube.breakdown(query["by"], **conditions),
+                      key=lambda r: (r[1][metric] is None, -(r[1][metric] or 0)))
+        lines += ["", f"| {query['by']} | 업소 수 | 평균 가격 | 중앙값 |", "|---|---:|---:|---:|"]
+        lines += [f"| {value} | {c['count']} | {_won(c['price_mean'])} | {_won(c['price_median'])} |"
+                  for value, c in rows]
+    return "\n".join(lines)
+
+
+def answer_stats_question(question, cube, district=None):
+    # 통계 질문이면 답변 문자열, 아니면 None (검색 + LLM으로 처리)
+    query = parse_stats_question(question, cube, district)
+    return format_stats_answer(cube, query, district) if query else None
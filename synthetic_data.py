@@ -0,0 +1,67 @@
+# 벤치마크용 합성 업소 데이터
+# 실제 업소 CSV의 행을 복제·변형해 원하는 크기(700 ~ 100k+ 행)의 업소 CSV를 만든다.
+# 원본과 같은 컬럼 구성이므로 앱/적재 스크립트가 그대로 읽을 수 있다.
+#   - 원본 크기까지는 원본 행 그대로, 그 이상은 무작위로 고른 행을 복제
+#   - 복제 행은 업소명에 "N호점"을 붙여 업소명(+주소)이 겹치지 않게 함 (문서 id가 업소마다 달라짐)
+#   - 위경도는 약 ±200m 흔들고, 가격은 로그정규 배율로 조정
+#
+# 사용 예:
+#   python synthetic_data.py 100000 -o /tmp/shops_100k.csv
+import argparse
+import time
+
+import numpy as np  # 수치 연산 라이브러리
+import pandas as pd  # 데이터 분석 라이브러리
+
+DEFAULT_BASE_CSV = "광진구_추천업소_최종데이터333.csv"
+
+# 복제 행의 위경도 흔들림(도)과 가격 배율의 로그 표준편차
+COORD_JITTER_DEG = 0.002
+PRICE_SIGMA = 0.25
+
+
+def synthetic_shops(n, base_csv=DEFAULT_BASE_CSV, seed=0):
+    # 원본 CSV 형식 그대로의 n행 DataFrame
+    base = pd.read_csv(base_csv)
+    rng = np.random.default_rng(seed)
+    head = base.head(n)
+    extra = n - len(head)
+    if extra <= 0:
+        return head.reset_index(drop=True)
+
+    picks = rng.integers(0, len(base), size=extra)
+    clones = base.iloc[picks].reset_index(drop=True)
+    branch = clones.groupby(clones['사업장명'].astype(str)).cumcount() + 2
+    clones['사업장명'] = clones['사업장명'].astype(str) + " " + branch.astype(str) + "호점"
+
+    for col in ('latitude', 'longitude'):
+        values = pd.to_numeric(clones[col], errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+        clones[col] = (values + rng.uniform(-COORD_JITTER_DEG, COORD_JITTER_DEG, size=extra)).round(7)
+
+    if '가격' in clones.columns:
+        price = pd.to_numeric(clones['가격'], errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+        scaled = np.round(price * rng.lognormal(0.0, PRICE_SIGMA, size=extra), -2)
+        clones['가격'] = pd.array(np.where(np.isnan(scaled), np.nan, np.maximum(scaled, 1000)), dtype='Int64')
+    return pd.concat([base, clones], ignore_index=True)
+
+
+def write_synthetic_csv(n, out_path, base_csv=DEFAULT_BASE_CSV, seed=0):
+    synthetic_shops(n, base_csv, seed).to_csv(out_path, index=False, encoding='utf-8-sig')
+    return out_path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="원본 업소 CSV를 복제·변형해 원하는 크기의 합성 업소 CSV 생성")
+    parser.add_argument("rows", type=int, help="만들 행 수")
+    parser.add_argument("-o", "--out", help="출력 CSV 경로 (기본: shops_<행 수>.csv)")
+    parser.add_argument("--base", default=DEFAULT_BASE_CSV, help="원본 업소 CSV 경로")
+    parser.add_argument("--seed", type=int, default=0, help="난수 시드")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    out_path = write_synthetic_csv(args.rows, args.out or f"shops_{args.rows}.csv", args.base, args.seed)
+    print(f"{args.rows}행 → {out_path} ({time.perf_counter() - started:.1f}초)")
+
+
+if __name__ == "__main__":
+    main()
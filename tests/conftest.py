@@ -0,0 +1,18 @@
+import os
+import shutil
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SHOP_CSV = os.path.join(ROOT, "광진구_추천업소_최종데이터333.csv")
+
+
+@pytest.fixture(scope="session")
+def shops(tmp_path_factory):
+    # 앱 기본 업소 CSV를 임시 폴더로 복사해 읽음 (스냅샷 파일이 저장소에 생기지 않도록)
+    from data_store import load_shop_table
+
+    path = tmp_path_factory.mktemp("shops") / os.path.basename(SHOP_CSV)
+    shutil.copy(SHOP_CSV, path)
+    df, _ = load_shop_table(str(path))
+    return df
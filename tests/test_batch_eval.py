@@ -0,0 +1,66 @@
+import asyncio
+
+import httpx
+import pytest
+from openai import APIConnectionError, RateLimitError
+
+from batch_eval import CHROMA_CATALOG, RateGate, create_with_retry, load_documents
+
+REQUEST = httpx.Request("POST", "http://stub/v1/chat/completions")
+
+
+class FailingCompletions:
+    # 항상 같은 오류를 내는 chat.completions 대역
+    def __init__(self, make_error):
+        self.make_error = make_error
+        self.calls = 0
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        raise self.make_error()
+
+
+class FailingClient:
+    def __init__(self, make_error):
+        self.chat = type("Chat", (), {})()
+        self.chat.completions = FailingCompletions(make_error)
+
+
+def _rate_limited():
+    response = httpx.Response(429, headers={"retry-after": "0"}, request=REQUEST)
+    return RateLimitError("rate limited", response=response, body=None)
+
+
+def _retry(client, stats, max_attempts=3):
+    return asyncio.run(create_with_retry(
+        client, RateGate(), stats, "stub", [], {}, max_attempts=max_attempts, base_delay=0.001))
+
+
+def _stats():
+    return {"retries": 0, "rate_limited": 0}
+
+
+def test_rate_limit_error_reaches_caller_after_last_attempt():
+    client = FailingClient(_rate_limited)
+    stats = _stats()
+    with pytest.raises(RateLimitError):
+        _retry(client, stats)
+    assert client.chat.completions.calls == 3
+    assert stats == {"retries": 2, "rate_limited": 3}
+
+
+def test_connection_error_reaches_caller_after_last_attempt():
+    client = FailingClient(lambda: APIConnectionError(request=REQUEST))
+    with pytest.raises(APIConnectionError):
+        _retry(client, _stats())
+    assert client.chat.completions.calls == 3
+
+
+def test_load_documents_without_catalog_leaves_db_untouched(shops, tmp_path):
+    # 카탈로그 없는 저장소 경로 → CSV로 만든 문서, 카탈로그 파일을 만들지 않음
+    db_path = tmp_path / "chroma_db"
+    db_path.mkdir()
+    documents = load_documents(shops.head(5), "test.csv", str(db_path))
+    assert len(documents) == 5
+    assert not (db_path / CHROMA_CATALOG).exists()
+    assert list(db_path.iterdir()) == []
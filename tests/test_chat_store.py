@@ -0,0 +1,77 @@
+import threading
+
+from chat_store import ChatStore, conversation_context, summarize_turns
+
+
+def _store(tmp_path, **kwargs):
+    return ChatStore(str(tmp_path / "chat.sqlite3"), **kwargs)
+
+
+def test_recent_pages_backwards(tmp_path):
+    store = _store(tmp_path)
+    for i in range(7):
+        store.append("s", "user" if i % 2 == 0 else "assistant", f"메시지 {i}")
+    assert [m["seq"] for m in store.recent("s", 3)] == [5, 6, 7]
+    assert [m["seq"] for m in store.recent("s", 3, before=5)] == [2, 3, 4]
+    assert [m["seq"] for m in store.between("s", 2, 4)] == [3, 4]
+    assert store.count("s") == 7
+    assert store.recent("other", 3) == []
+
+
+def test_concurrent_appends_get_distinct_seqs(tmp_path):
+    # 같은 대화를 연 두 탭(서로 다른 ChatStore)이 동시에 추가해도 seq가 겹치지 않아야 함
+    path = str(tmp_path / "chat.sqlite3")
+    ChatStore(path)
+    errors = []
+    barrier = threading.Barrier(8)
+
+    def writer(n):
+        store = ChatStore(path)
+        barrier.wait()
+        try:
+            for i in range(20):
+                store.append("s", "user", f"{n}-{i}")
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert [m["seq"] for m in ChatStore(path).recent("s", 1000)] == list(range(1, 161))
+
+
+def test_compact_only_removes_summarized_messages(tmp_path):
+    store = _store(tmp_path, max_messages=4)
+    for i in range(10):
+        store.append("s", "user", f"질문 {i}")
+    # 요약에 접히지 않은 메시지는 개수를 넘어도 지우지 않음
+    assert store.compact("s") == 0
+    store.set_summary("s", 8, "요약")
+    assert store.compact("s") == 6
+    assert [m["seq"] for m in store.recent("s", 100)] == [7, 8, 9, 10]
+
+
+def test_summarize_turns_keeps_first_lines_within_budget():
+    messages = [
+        {"role": "user", "content": "구의동 분식 추천해줘"},
+        {"role": "assistant", "content": "## 추천 결과\n\n- 첫 업소\n- 둘째 업소"},
+    ]
+    assert summarize_turns("", messages) == "- 질문: 구의동 분식 추천해줘\n- 답변: 추천 결과"
+    long_summary = summarize_turns("", messages * 50, token_budget=30)
+    assert long_summary.endswith("- 답변: 추천 결과")
+    assert len(long_summary.splitlines()) < 100
+
+
+def test_conversation_context_folds_older_turns_once(tmp_path):
+    store = _store(tmp_path)
+    for i in range(6):
+        store.append("s", "user", f"질문 {i}")
+        store.append("s", "assistant", f"답변 {i}")
+    question = store.append("s", "user", "다음 질문")
+    summary, recent = conversation_context(store, "s", recent_turns=2, before=question["seq"])
+    assert [m["content"] for m in recent] == ["질문 4", "답변 4", "질문 5", "답변 5"]
+    assert summary.splitlines()[0] == "- 질문: 질문 0"
+    assert store.summary("s") == (8, summary)
@@ -0,0 +1,58 @@
+from context_packer import CONTEXT_HEADER, count_tokens, pack_context, truncate_to_tokens
+
+
+def _doc(title, content, **extra):
+    return dict({"title": title, "content": content, "metadata": {}}, **extra)
+
+
+def test_truncate_to_tokens_respects_budget():
+    text = "광진구 착한가격 업소 " * 200
+    for budget in (0, 1, 17, 200):
+        truncated = truncate_to_tokens(text, budget)
+        assert count_tokens(truncated) <= budget
+        assert text.startswith(truncated)
+    assert truncate_to_tokens("짧은 글", 100) == "짧은 글"
+
+
+def test_near_duplicates_are_dropped_keeping_the_higher_rank():
+    body = "업소명: 성민식당\n업종: 한식\n주소: 군자동 346-20\n대표 가격: 6750"
+    packed = pack_context("한식", [_doc("성민식당", body), _doc("성민식당 2", body + " "), _doc("다른 업소", "카페 디저트 조용함")])
+    assert packed.deduplicated == 1
+    assert packed.included == [0, 2]
+    assert "업소명: 성민식당\n" in packed.text and "성민식당 2" not in packed.text
+
+
+def test_packed_context_stays_within_budget():
+    results = [_doc(f"업소{i}", f"업소{i} 설명 " + "가격이 저렴하고 친절함 " * (20 + i)) for i in range(30)]
+    for budget in (200, 800, 3000):
+        packed = pack_context("저렴한 업소", results, token_budget=budget)
+        # 블록별 토큰 수의 합이라 전체를 한 번에 센 값보다 작지 않음 (경계에서 토큰이 합쳐질 수 있음)
+        assert count_tokens(packed.text) <= packed.tokens <= budget
+        assert packed.text.startswith(CONTEXT_HEADER)
+        assert len(packed.included) + packed.dropped + packed.deduplicated == len(results)
+        # 문서 번호는 담긴 순서대로 1부터
+        for number in range(1, len(packed.included) + 1):
+            assert f"업소 {number}:\n" in packed.text
+
+
+def test_long_document_is_truncated_when_room_is_left():
+    packed = pack_context("질문", [_doc("긴 업소", "설명 " * 2000)], token_budget=500, min_excerpt_tokens=50)
+    assert packed.truncated == 1 and packed.included == [0]
+    assert packed.text.rstrip().endswith("...")
+
+
+def test_shop_named_in_question_comes_first():
+    results = [_doc(f"업소{i}", f"업소{i}의 특징 {'다양한 설명 ' * i}", distance=i * 0.1) for i in range(5)]
+    packed = pack_context("업소4 어때?", results)
+    assert packed.included[0] == 4
+
+
+def test_mmr_moves_redundant_documents_down():
+    shared = "칼국수 수제비 칼국수 수제비 칼국수 면요리 전문"
+    results = [
+        _doc("A", shared + " 자양동", score=1.0),
+        _doc("B", shared + " 구의동", score=0.95),
+        _doc("C", "카페 라떼 케이크 디저트", score=0.9),
+    ]
+    packed = pack_context("칼국수", results, mmr_lambda=0.5, dedup_threshold=0.99)
+    assert packed.included == [0, 2, 1]
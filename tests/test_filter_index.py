@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import filter_index
+from filter_index import ShopFilterIndex, TextIndex, intersect_ids, normalize_text
+
+QUERIES = ["식당", "김", "국수", "피자 ", "  카페", "Coffee", "광진구 자양", "천호대로", "없는업소이름", "a"]
+
+
+def _brute_contains(values, query):
+    query = normalize_text(query)
+    texts = pd.Series([normalize_text(v) if isinstance(v, str) else '' for v in values])
+    return np.flatnonzero(texts.str.contains(query, regex=False).to_numpy())
+
+
+def test_normalize_text():
+    assert normalize_text("  Coffee   BEAN ") == "coffee bean"
+
+
+@pytest.mark.parametrize("column", ["사업장명", "도로명주소"])
+def test_contains_matches_brute_force(shops, column):
+    index = TextIndex(shops[column].tolist())
+    for query in QUERIES:
+        np.testing.assert_array_equal(index.contains(query), _brute_contains(shops[column].tolist(), query), query)
+
+
+def test_contains_across_chunk_boundaries(monkeypatch, shops):
+    # 청크 경계를 넘어도 같은 결과 (작은 청크로 강제)
+    values = shops["사업장명"].tolist()
+    monkeypatch.setattr(filter_index, "_CHUNK_ROWS", 7)
+    index = TextIndex(values)
+    for query in QUERIES:
+        np.testing.assert_array_equal(index.contains(query), _brute_contains(values, query), query)
+
+
+def test_contains_handles_missing_values():
+    index = TextIndex(["김밥천국", None, float("nan"), "천국"])
+    np.testing.assert_array_equal(index.contains("천국"), [0, 3])
+    np.testing.assert_array_equal(index.contains(""), [0, 1, 2, 3])
+
+
+def test_prefix_matches_sorted_startswith(shops):
+    values = shops["사업장명"].tolist()
+    index = TextIndex(values)
+    texts = [normalize_text(v) if isinstance(v, str) else '' for v in values]
+    for query in ("김", "카", "Coffee", "없는"):
+        expected = sorted((i for i, t in enumerate(texts) if t.startswith(normalize_text(query))),
+                          key=lambda i: (texts[i], i))
+        np.testing.assert_array_equal(index.prefix(query), expected)
+        np.testing.assert_array_equal(index.prefix(query, limit=3), expected[:3])
+
+
+@pytest.mark.parametrize("size_a,size_b", [(5, 1000), (300, 400), (0, 10)])
+def test_intersect_ids_matches_numpy(size_a, size_b):
+    rng = np.random.default_rng(size_a + size_b)
+    a = np.unique(rng.integers(0, 2000, size_a)).astype(np.int32)
+    b = np.unique(rng.integers(0, 2000, size_b)).astype(np.int32)
+    np.testing.assert_array_equal(intersect_ids(a, b), np.intersect1d(a, b))
+    np.testing.assert_array_equal(intersect_ids(b, a), np.intersect1d(a, b))
+
+
+def test_query_matches_pandas_filter(shops):
+    index = ShopFilterIndex(shops)
+    categories = shops["업종"].value_counts().index[:2].tolist()
+    name = normalize_text(shops["사업장명"].iloc[0])[:2]
+    names = shops["사업장명"].map(lambda v: normalize_text(v) if isinstance(v, str) else '')
+    cases = [
+        (dict(), np.ones(len(shops), bool)),
+        (dict(업종=categories[:1]), shops["업종"].isin(categories[:1])),
+        (dict(업종=categories), shops["업종"].isin(categories)),
+        (dict(업종=categories, 사랑상품권=["가능"]), shops["업종"].isin(categories) & (shops["사랑상품권"] == "가능")),
+        (dict(search=name, 사랑상품권=["가능"]),
+         names.str.contains(name, regex=False) & (shops["사랑상품권"] == "가능")),
+        (dict(업종=["없는 업종"]), np.zeros(len(shops), bool)),
+        (dict(업종=[]), np.ones(len(shops), bool)),
+    ]
+    for kwargs, mask in cases:
+        np.testing.assert_array_equal(index.query(**kwargs), np.flatnonzero(np.asarray(mask)), str(kwargs))
+
+
+def test_search_unions_columns(shops):
+    index = ShopFilterIndex(shops)
+    both = index.search("자양", columns=("사업장명", "도로명주소"))
+    expected = np.union1d(index.search("자양", ("사업장명",)), index.search("자양", ("도로명주소",)))
+    np.testing.assert_array_equal(both, expected)
@@ -0,0 +1,90 @@
+import math
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from hybrid_search import (BM25Index, HashingEmbeddingFunction, build_where, char_ngrams, reciprocal_rank_fusion,
+                           rows_digest)
+
+DOCS = [
+    "친절한 사장님이 운영하는 한식 식당",
+    "가격이 저렴한 분식집, 직원이 친절하고 빠름",
+    "조용한 카페, 디저트가 맛있음",
+    "한식 뷔페, 가격 저렴",
+    "중국집 짜장면 맛집",
+]
+
+
+def test_char_ngrams_match_inflected_words():
+    assert char_ngrams("친절") == ["친절"]
+    assert "친절" in char_ngrams("친절한") and "친절" in char_ngrams("친절하고!")
+    assert char_ngrams("A 김") == ["a", "김"]
+
+
+def _brute_bm25(documents, query, k1=1.2, b=0.75, max_df=0.5):
+    counts = [Counter(char_ngrams(d)) for d in documents]
+    lengths = [sum(c.values()) for c in counts]
+    avg = max(sum(lengths) / len(lengths), 1.0)
+    scores = []
+    for c, length in zip(counts, lengths):
+        score = 0.0
+        for gram in set(char_ngrams(query)):
+            df = sum(gram in other for other in counts)
+            if gram not in c or df > max_df * len(documents):
+                continue
+            idf = math.log1p((len(documents) - df + 0.5) / (df + 0.5))
+            tf = c[gram]
+            score += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * length / avg))
+        scores.append(score)
+    return np.array(scores)
+
+
+@pytest.mark.parametrize("query", ["친절한 식당", "저렴한 한식", "카페 디저트", "없는말"])
+def test_bm25_scores_match_formula(query):
+    index = BM25Index([f"d{i}" for i in range(len(DOCS))], DOCS)
+    expected = _brute_bm25(DOCS, query)
+    top, scores = index.search(query, n_results=10)
+    np.testing.assert_allclose(scores, expected[top], rtol=1e-5)
+    assert set(top) == set(np.flatnonzero(expected > 0))
+    assert np.all(np.diff(scores) <= 0)
+
+
+def test_bm25_allowed_mask_and_results():
+    ids = [f"d{i}" for i in range(len(DOCS))]
+    index = BM25Index(ids, DOCS, [{"title": f"업소{i}"} for i in range(len(DOCS))])
+    allowed = index.mask(["d1", "d3", "없는 id"])
+    results = index.results("저렴한 한식", allowed=allowed)
+    assert {r["id"] for r in results} <= {"d1", "d3"}
+    assert results[0]["title"] in ("업소1", "업소3")
+
+
+def test_hashing_embedding_is_normalized_and_deterministic():
+    embed = HashingEmbeddingFunction(dim=32)
+    first, empty = embed(["친절한 식당", ""])
+    assert np.linalg.norm(first) == pytest.approx(1.0, rel=1e-5)
+    assert not empty.any()
+    np.testing.assert_array_equal(first, HashingEmbeddingFunction(dim=32)(["친절한 식당"])[0])
+
+
+def test_build_where():
+    assert build_where() is None
+    assert build_where(["한식"]) == {"업종": {"$in": ["한식"]}}
+    assert build_where(["한식"], "가능") == {"$and": [{"업종": {"$in": ["한식"]}}, {"사랑상품권": "가능"}]}
+
+
+def test_rows_digest_ignores_order():
+    assert rows_digest(None) is None
+    assert rows_digest([3, 1, 2]) == rows_digest(np.array([1, 2, 3]))
+    assert rows_digest([1, 2]) != rows_digest([1, 2, 3])
+
+
+def test_reciprocal_rank_fusion_prefers_documents_ranked_by_both():
+    vector = [{"id": "a", "distance": 0.1}, {"id": "b"}, {"id": "c"}]
+    keyword = [{"id": "b"}, {"id": "d"}, {"id": "a"}]
+    fused = reciprocal_rank_fusion([vector, keyword])
+    # b: 2위 + 1위, a: 1위 + 3위
+    assert [d["id"] for d in fused] == ["b", "a", "d", "c"]
+    assert fused[0]["score"] == pytest.approx(1 / 62 + 1 / 61)
+    assert "distance" not in fused[1]
+    assert len(reciprocal_rank_fusion([vector, keyword], n_results=2)) == 2
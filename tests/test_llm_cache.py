@@ -0,0 +1,97 @@
+import sqlite3
+import threading
+import time
+
+from llm_cache import ResponseCache, SingleFlight, prompt_key
+
+
+def _rows(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_prompt_key_ignores_param_order():
+    messages = [{"role": "user", "content": "혼밥 식당"}]
+    assert prompt_key("m", messages, temperature=0, top_p=1) == prompt_key("m", messages, top_p=1, temperature=0)
+    assert prompt_key("m", messages) != prompt_key("m2", messages)
+
+
+def test_put_get_and_alias(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite3"))
+    cache.put("k", "m", "답변", alias="a")
+    assert cache.get("k") == "답변"
+    assert cache.get_by_alias("a") == "답변"
+    assert cache.get("missing") is None
+    assert cache.stats()["hits"] == 2
+
+
+def test_purge_removes_expired_rows_and_their_aliases(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = ResponseCache(path)
+    cache.put("old", "m", "오래된 답변", alias="old-alias")
+    cache.put("new", "m", "새 답변")
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.execute("UPDATE responses SET created = ? WHERE key = 'old'", (time.time() - 40 * 86400,))
+    conn.close()
+    assert cache.purge_expired() == 1
+    assert cache.get_by_alias("old-alias") is None
+    assert cache.get("new") == "새 답변"
+
+
+def test_row_count_is_capped_on_put(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = ResponseCache(path, max_rows=5, purge_every=4)
+    for i in range(12):
+        cache.put(f"k{i}", "m", f"답변 {i}")
+    # 4번째, 8번째, 12번째 저장 뒤 정리 → 최근 5개만 남음
+    assert _rows(path) == 5
+    assert cache.get("k11") == "답변 11"
+    assert cache.get("k0") is None
+
+
+def test_single_flight_runs_identical_calls_once():
+    flights = SingleFlight()
+    calls = []
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "결과"
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flights.do("k", slow)))
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(flights.do("k", slow))) for _ in range(3)]
+    for thread in followers:
+        thread.start()
+    while flights.coalesced < 3:
+        time.sleep(0.001)
+    release.set()
+    for thread in [leader] + followers:
+        thread.join(5)
+    assert calls == [1]
+    assert results == ["결과"] * 4
+
+
+def test_single_flight_passes_errors_to_waiters():
+    flights = SingleFlight()
+    leader, future = flights.begin("k")
+    follower, same = flights.begin("k")
+    assert leader and not follower and same is future
+    flights.finish("k", error=ValueError("실패"))
+    try:
+        same.result(timeout=1)
+    except ValueError as e:
+        assert str(e) == "실패"
+    else:
+        raise AssertionError("오류가 전달되지 않았습니다.")
+    # 끝난 key는 다시 새 요청으로 시작
+    assert flights.begin("k")[0]
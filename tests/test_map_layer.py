@@ -0,0 +1,44 @@
+import re
+from importlib.metadata import version
+
+import pytest
+
+folium = pytest.importorskip("folium")
+sf = pytest.importorskip("streamlit_folium")
+
+import map_layer
+
+RETURNED = ["last_object_clicked", "bounds", "zoom"]
+
+
+def _build():
+    m = folium.Map(location=[37.54, 127.07], zoom_start=14)
+    folium.Marker([37.541, 127.071], popup="업소").add_to(m)
+    folium.CircleMarker([37.539, 127.069], radius=5).add_to(m)
+    return m
+
+
+def _normalize(value):
+    # folium 요소 id(32자리 hex)는 지도마다 달라서 지움
+    return re.sub(r"_[0-9a-f]{32}", "_ID", value) if isinstance(value, str) else value
+
+
+def test_streamlit_folium_internals_exist():
+    # render_map_payload/show_map이 쓰는 streamlit_folium 내부 함수 (버전이 바뀌어 없어지면 여기서 실패)
+    missing = [name for name in map_layer.STREAMLIT_FOLIUM_INTERNALS if not hasattr(sf, name)]
+    assert not missing, f"streamlit_folium {version('streamlit_folium')}에 없는 내부 함수: {missing}"
+
+
+def test_show_map_sends_what_st_folium_sends(monkeypatch):
+    calls = []
+    monkeypatch.setattr(sf, "_component_func", lambda **kwargs: calls.append(kwargs))
+    sf.st_folium(_build(), key="shop_map", width="100%", height=600, returned_objects=RETURNED)
+    payload = map_layer.render_map_payload(_build(), key="shop_map")
+    map_layer.show_map(payload, key="shop_map", width="100%", height=600, returned_objects=RETURNED)
+
+    expected, actual = calls
+    assert set(actual) == set(expected)
+    for name in expected:
+        if name != "on_change":
+            assert _normalize(actual[name]) == _normalize(expected[name]), name
+    assert payload["bytes"] > 0
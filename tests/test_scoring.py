@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+
+from scoring import HYGIENE_POINTS, PASS_SCORE, PRICE_POINTS, price_reference, score_shops
+
+
+def _frame(rows):
+    columns = ['가격', '업종', '동', '위생등급', '사랑상품권', '착한업소', '행정처분', '영업상태명', '업종구분']
+    defaults = dict(가격=8000, 업종='한식', 동='구의동', 위생등급=None, 사랑상품권='불가능', 착한업소='미등록',
+                    행정처분='없음', 영업상태명='영업/정상', 업종구분='일반음식점')
+    df = pd.DataFrame([dict(defaults, **row) for row in rows], columns=columns)
+    df['가격'] = df['가격'].astype('Int32')
+    for column in columns[1:]:
+        df[column] = df[column].astype('category')
+    return df
+
+
+def test_price_reference_falls_back_to_category_mean():
+    # 구의동 한식은 3곳 → 동 평균, 자양동 한식은 1곳 → 한식 전체 평균
+    df = _frame([{'가격': 6000}, {'가격': 7000}, {'가격': 8000}, {'동': '자양동', '가격': 11000}])
+    reference = price_reference(df, min_group_size=3)
+    assert reference.iloc[:3].tolist() == [7000.0] * 3
+    assert reference.iloc[3] == 8000.0
+
+
+def test_price_reference_matches_pandas(shops):
+    reference = price_reference(shops)
+    price = shops['가격'].astype('float64')
+    for (category, dong), group in shops.groupby(['업종', '동'], observed=True):
+        n = price[group.index].count()
+        expected = price[group.index].mean() if n >= 3 else price[shops['업종'] == category].mean()
+        np.testing.assert_allclose(reference[group.index].dropna(), expected, err_msg=f"{category} {dong}")
+
+
+def test_verdicts():
+    df = _frame([
+        {'가격': 5000, '위생등급': '우수'},                    # 가격 30 + 위생 20 → 지정 가능
+        {'가격': 5000, '위생등급': '우수', '행정처분': '있음'},  # 결격
+        {'가격': 5000, '위생등급': '우수', '영업상태명': '폐업'},  # 결격
+        {'가격': 20000, '위생등급': '좋음'},                   # 기준보다 비쌈 → 최대 23점 → 지정 불가
+        {'가격': None},                                         # 가격·위생 미확인 → 현장 확인 필요
+        {'가격': 5000, '사랑상품권': '가능'},                   # 위생 미확인 → 현장 확인 필요
+    ])
+    score = score_shops(df)
+    assert score['판정'].tolist() == ['지정 가능', '지정 불가', '지정 불가', '지정 불가', '현장 확인 필요', '현장 확인 필요']
+    assert score['결격사유'].tolist()[:3] == ['', '행정처분 이력', '휴업/폐업']
+    assert score['점수'].iloc[0] == PRICE_POINTS + HYGIENE_POINTS
+    assert score['최대점수'].iloc[3] < PASS_SCORE
+    assert np.isnan(score['가격비율'].iloc[4]) and score['최대점수'].iloc[4] >= PASS_SCORE
+    assert score['공공성점수'].iloc[5] == 1
+
+
+def test_scores_are_consistent(shops):
+    score = score_shops(shops)
+    assert score.index.equals(shops.index)
+    assert (score['점수'] <= score['최대점수']).all()
+    assert (score['점수'] == score['가격점수'] + score['위생점수'] + score['공공성점수']).all()
+    assert (score.loc[score['판정'] == '지정 가능', '점수'] >= PASS_SCORE).all()
+    assert (score.loc[shops['행정처분'].eq('있음').fillna(False).to_numpy(), '판정'] == '지정 불가').all()
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from spatial_index import LANDMARKS, SpatialIndex, haversine_m, parse_location_query, snap_bbox
+
+
+@pytest.fixture(scope="module")
+def points(shops):
+    return shops["latitude"].to_numpy(np.float64), shops["longitude"].to_numpy(np.float64)
+
+
+def test_haversine_known_distance():
+    # 위도 1도 ≈ 111.2km
+    assert haversine_m(37.0, 127.0, np.array([38.0]), np.array([127.0]))[0] == pytest.approx(111_195, rel=1e-3)
+
+
+@pytest.mark.parametrize("cell_deg", [0.0005, 0.002, 0.05])
+def test_bbox_matches_brute_force(points, cell_deg):
+    lats, lons = points
+    index = SpatialIndex(lats, lons, cell_deg=cell_deg)
+    for south, west, north, east in [(37.53, 127.06, 37.55, 127.09), (37.54, 127.07, 37.541, 127.071),
+                                     (37.0, 126.0, 38.0, 128.0), (36.0, 126.0, 36.1, 126.1)]:
+        expected = np.flatnonzero((lats >= south) & (lats <= north) & (lons >= west) & (lons <= east))
+        np.testing.assert_array_equal(index.bbox(south, west, north, east), expected)
+
+
+@pytest.mark.parametrize("radius_m", [100, 500, 2000])
+def test_radius_matches_brute_force(points, radius_m):
+    lats, lons = points
+    index = SpatialIndex(lats, lons)
+    allowed = np.arange(0, len(lats), 3)
+    for lat, lon in LANDMARKS.values():
+        dist = haversine_m(lat, lon, lats, lons)
+        ids, found = index.radius(lat, lon, radius_m)
+        assert set(ids) == set(np.flatnonzero(dist <= radius_m))
+        assert np.all(np.diff(found) >= 0)
+        np.testing.assert_allclose(found, dist[ids])
+        ids, _ = index.radius(lat, lon, radius_m, ids=allowed)
+        assert set(ids) == set(allowed[dist[allowed] <= radius_m])
+
+
+def test_nearest_matches_brute_force(points):
+    lats, lons = points
+    index = SpatialIndex(lats, lons)
+    for lat, lon in [LANDMARKS["건대입구역"], (37.6, 127.2)]:
+        dist = haversine_m(lat, lon, lats, lons)
+        ids, found = index.nearest(lat, lon, k=15)
+        np.testing.assert_allclose(found, np.sort(dist)[:15])
+        np.testing.assert_allclose(dist[ids], found)
+    assert len(index.nearest(37.54, 127.07, k=5, ids=np.array([], dtype=np.int32))[0]) == 0
+
+
+def test_snap_bbox_contains_original_and_is_stable():
+    bbox = (37.5401, 127.0702, 37.5452, 127.0781)
+    snapped = snap_bbox(bbox, 0.01)
+    assert snapped[0] <= bbox[0] and snapped[1] <= bbox[1] and snapped[2] >= bbox[2] and snapped[3] >= bbox[3]
+    # 조금 움직여도 같은 범위
+    assert snap_bbox(tuple(v + 0.0003 for v in bbox), 0.01) == snapped
+
+
+def test_parse_location_query():
+    assert parse_location_query("건대입구역 근처 한식") == ("건대입구역", 500)
+    assert parse_location_query("구의역 1.5km 이내 분식") == ("구의역", 1500)
+    assert parse_location_query("강변역 300미터") == ("강변역", 300)
+    assert parse_location_query("근처 맛집") is None
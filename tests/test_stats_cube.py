@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from stats_cube import DIMENSIONS, MISSING_VALUE, StatsCube, answer_stats_question, parse_stats_question
+
+
+@pytest.fixture(scope="module")
+def cube(shops):
+    return StatsCube.from_frame(shops)
+
+
+def _frame(shops):
+    frame = shops.copy()
+    for dim in DIMENSIONS:
+        frame[dim] = frame[dim].astype(object).where(frame[dim].notna(), MISSING_VALUE)
+    frame['가격'] = frame['가격'].astype('float64')
+    return frame
+
+
+@pytest.mark.parametrize("dims", [(), ("동",), ("업종",), ("동", "업종"), ("동", "업종", "사랑상품권")])
+def test_cells_match_groupby(shops, cube, dims):
+    frame = _frame(shops)
+    groups = frame.groupby(list(dims)) if dims else [((), frame)]
+    for group, rows in groups:
+        group = group if isinstance(group, tuple) else (group,)
+        cell = cube.cell(**dict(zip(dims, group)))
+        assert cell["count"] == len(rows)
+        assert cell["price_count"] == rows['가격'].count()
+        if cell["price_count"]:
+            assert cell["price_mean"] == pytest.approx(rows['가격'].mean())
+            assert cell["price_median"] == pytest.approx(rows['가격'].median())
+        assert sum(cell["hygiene"].values()) == len(rows)
+        assert cell["lat"] == pytest.approx(rows['latitude'].astype('float64').mean())
+
+
+def test_missing_cell(cube):
+    assert cube.cell(동="없는동") is None
+
+
+def test_breakdown(shops, cube):
+    rows = cube.breakdown("동", 업종="한식")
+    counts = _frame(shops).query("업종 == '한식'")['동'].value_counts()
+    assert {value: cell["count"] for value, cell in rows} == counts.to_dict()
+    # 값 순서는 전체 업소 수 순 (조건과 무관하게 고정)
+    assert [value for value, _ in rows] == [value for value in cube.values["동"] if value in counts]
+
+
+@pytest.mark.parametrize("question, expected", [
+    ("구의동 분식 평균가격", {"conditions": {"동": "구의동", "업종": "분식"}, "by": None, "metric": "price_mean"}),
+    ("동별 한식 업소 수", {"conditions": {"업종": "한식"}, "by": "동", "metric": "count"}),
+    ("자양 중국집 가격 중앙값", {"conditions": {"동": "자양동", "업종": "중국식"}, "by": None, "metric": "price_median"}),
+    ("상품권 안 되는 곳 몇 곳이야", {"conditions": {"사랑상품권": "불가능"}, "by": None, "metric": "count"}),
+    ("구의동의 평균 가격은 얼마야?", {"conditions": {"동": "구의동"}, "by": None, "metric": "price_mean"}),
+])
+def test_parse_stats_question(cube, question, expected):
+    assert parse_stats_question(question, cube) == expected
+
+
+@pytest.mark.parametrize("question", [
+    "혼밥 식당 추천해줘", "구의동 분식 평균가격 싼 곳 추천", "평균적인 맛집 어디",
+    # 큐브로 나타낼 수 없는 조건이 있으면 검색 + LLM으로 (가격 범위, 위치, 위생등급 값, 그 밖의 말)
+    "구의동 만원 이하 한식집 몇 곳 있어?", "구의동 한식 8000원 이하 몇곳",
+    "건대입구역 근처 분식집 몇 개?", "위생등급 우수 업소 몇 곳",
+    "자양동 가격대 괜찮은 한식집 알려줘", "혼밥하기 좋은 분식집 몇 곳?",
+])
+def test_non_stats_questions(cube, question):
+    assert parse_stats_question(question, cube) is None
+
+
+def test_district_name_is_not_extra_text(cube):
+    assert parse_stats_question("광진구 업종별 업소 수는?", cube) is None
+    assert parse_stats_question("광진구 업종별 업소 수는?", cube, district="광진구") == {
+        "conditions": {}, "by": "업종", "metric": "count"}
+
+
+def test_answer_stats_question(cube):
+    cell = cube.cell(동="구의동", 업종="분식")
+    answer = answer_stats_question("구의동 분식 평균가격", cube, district="광진구")
+    assert answer.startswith("**광진구 · 구의동 · 분식**")
+    assert f"업소 수: {cell['count']}곳" in answer
+    table = answer_stats_question("동별 한식 업소 수", cube)
+    assert table.count("\n| ") == len(cube.breakdown("동", 업종="한식")) + 1
+    empty = next(value for value in cube.values["업종"] if cube.cell(동="능동", 업종=value) is None)
+    assert "없습니다" in answer_stats_question(f"능동 {empty} 평균가격", cube)
@@ -0,0 +1,72 @@
+import os
+
+import numpy as np
+import pytest
+
+from preprocess import coordinate_report
+from tm_coords import PROJECTIONS, helmert, helmert_inverse, tm_forward, tm_inverse, tm_to_wgs84, wgs84_to_tm
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SHIPPED_CSV = os.path.join(ROOT, "광진구_추천업소_전처리_위경도추가.csv")
+
+# 광진구 주변 20km 격자 (중부원점 TM)
+GRID_X, GRID_Y = (a.ravel() for a in np.meshgrid(np.linspace(190000, 220000, 31), np.linspace(435000, 465000, 31)))
+
+
+def _projection(name="EPSG:5174"):
+    return {k: v for k, v in PROJECTIONS[name].items() if k != "towgs84"}
+
+
+def test_origin_maps_to_projection_origin():
+    lat, lon = tm_inverse(np.array([200000.0]), np.array([500000.0]), **_projection())
+    assert np.degrees(lat)[0] == pytest.approx(38.0, abs=1e-9)
+    assert np.degrees(lon)[0] == pytest.approx(PROJECTIONS["EPSG:5174"]["lon0"], abs=1e-9)
+
+
+def test_tm_series_round_trip_is_submillimetre():
+    lat, lon = tm_inverse(GRID_X, GRID_Y, **_projection())
+    x, y = tm_forward(lat, lon, **_projection())
+    assert np.abs(x - GRID_X).max() < 1e-3
+    assert np.abs(y - GRID_Y).max() < 1e-3
+
+
+def test_helmert_inverse_undoes_helmert():
+    point = (np.array([-3.05e6]), np.array([4.05e6]), np.array([3.86e6]))
+    params = PROJECTIONS["EPSG:5174"]["towgs84"]
+    back = helmert_inverse(*helmert(*point, *params), *params)
+    for original, restored in zip(point, back):
+        assert np.abs(original - restored).max() < 1e-6
+
+
+@pytest.mark.parametrize("projection", sorted(PROJECTIONS))
+def test_wgs84_round_trip_within_one_centimetre(projection):
+    lat, lon = tm_to_wgs84(GRID_X, GRID_Y, projection)
+    x, y = wgs84_to_tm(lat, lon, projection)
+    assert np.hypot(x - GRID_X, y - GRID_Y).max() < 0.01
+
+
+def test_datum_shift_is_applied():
+    # 베셀 → WGS84 변환을 빼먹으면 서울에서 수백 m 어긋남
+    lat, lon = tm_to_wgs84(GRID_X, GRID_Y)
+    bessel_lat, bessel_lon = tm_inverse(GRID_X, GRID_Y, **_projection())
+    shift_m = np.hypot((lat - np.degrees(bessel_lat)) * 111000, (lon - np.degrees(bessel_lon)) * 88000)
+    assert 300 < shift_m.min() and shift_m.max() < 500
+
+
+def test_missing_coordinates_stay_missing():
+    lat, lon = tm_to_wgs84([np.nan, 205000.0], [448000.0, np.nan])
+    assert np.isnan(lat).all() and np.isnan(lon).all()
+
+
+@pytest.mark.skipif(not os.path.exists(SHIPPED_CSV), reason="전처리 CSV 없음")
+def test_shipped_coordinates_match_epsg_5174():
+    import pandas as pd
+
+    raw = pd.read_csv(SHIPPED_CSV, low_memory=False)
+    report = coordinate_report(raw, "EPSG:5174")
+    # TM 좌표가 있는 행 대부분은 cm 단위로 일치
+    assert report["median_m"] < 0.05
+    # 50m 넘는 행은 기존 위경도가 주소 지오코딩 값인 행 (같은 TM 좌표에 다른 위경도), 비율만 확인
+    assert report["over_50m"] / report["rows"] < 0.03
+    # 경도 원점 보정이 없는 EPSG:2097은 전부 수백 m 어긋남
+    assert coordinate_report(raw, "EPSG:2097")["median_m"] > 200
@@ -0,0 +1,143 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from hybrid_search import HashingEmbeddingFunction, build_where
+from ingest import build_documents
+from vector_store import MatrixClient, MatrixCollection, quantize, where_mask, write_collection
+
+QUERIES = ["혼밥하기 좋은 한식", "저렴한 분식집", "자양동 카페", "상품권 되는 중국집"]
+WHERES = [
+    None,
+    {"업종": "한식"},
+    {"사랑상품권": "가능"},
+    build_where(["한식", "분식"], "가능"),
+    {"$or": [{"동": "자양동"}, {"가격": {"$lte": 7000}}]},
+    {"가격": {"$gt": 10000}},
+    {"업종": {"$nin": ["한식", "분식"]}},
+    {"없는필드": "값"},
+]
+
+
+@pytest.fixture(scope="module")
+def documents(shops):
+    unique = {}
+    for doc_id, document, metadata in build_documents(shops.head(400), "test"):
+        unique.setdefault(doc_id, (doc_id, document, metadata))
+    ids, texts, metadatas = zip(*unique.values())
+    embeddings = np.array(HashingEmbeddingFunction(dim=64)(list(texts)))
+    return list(ids), list(texts), list(metadatas), embeddings
+
+
+@pytest.fixture(scope="module", params=["float16", "int8"])
+def matrix(request, documents, tmp_path_factory):
+    ids, texts, metadatas, embeddings = documents
+    path = str(tmp_path_factory.mktemp("matrix"))
+    write_collection(path, "shops", ids, texts, metadatas, embeddings, {"version": "v1"}, dtype=request.param)
+    return MatrixCollection(path, "shops")
+
+
+def _python_where(metadata, where):
+    # where 조건을 메타데이터 dict 하나에 직접 적용 (비교 기준)
+    ops = {"$eq": lambda v, x: v == x, "$ne": lambda v, x: v != x, "$in": lambda v, x: v in x,
+           "$nin": lambda v, x: v not in x, "$gt": lambda v, x: v is not None and v > x,
+           "$gte": lambda v, x: v is not None and v >= x, "$lt": lambda v, x: v is not None and v < x,
+           "$lte": lambda v, x: v is not None and v <= x}
+    for key, condition in where.items():
+        if key == "$and":
+            if not all(_python_where(metadata, clause) for clause in condition):
+                return False
+        elif key == "$or":
+            if not any(_python_where(metadata, clause) for clause in condition):
+                return False
+        else:
+            if key not in metadata:
+                return False
+            condition = condition if isinstance(condition, dict) else {"$eq": condition}
+            if not all(ops[op](metadata.get(key), value) for op, value in condition.items()):
+                return False
+    return True
+
+
+@pytest.mark.parametrize("where", [w for w in WHERES if w])
+def test_where_mask_matches_per_row_evaluation(documents, where):
+    _, _, metadatas, _ = documents
+    table = pd.DataFrame(metadatas)
+    expected = [_python_where(metadata, where) for metadata in metadatas]
+    np.testing.assert_array_equal(where_mask(table, where), expected)
+
+
+def test_quantize_error_is_small(documents):
+    embeddings = documents[3].astype(np.float32)
+    for dtype, tolerance in (("float16", 1e-3), ("int8", 1e-2)):
+        matrix, scales, norms = quantize(embeddings, dtype)
+        restored = matrix.astype(np.float32) * (scales[:, None] if scales is not None else 1)
+        assert np.abs(restored - embeddings).max() < tolerance
+        np.testing.assert_allclose(norms, (restored ** 2).sum(axis=1), rtol=1e-5)
+
+
+def test_get_round_trips_documents_and_metadata(documents, matrix):
+    ids, texts, metadatas, _ = documents
+    page = matrix.get(ids=[ids[5], ids[2], "없는 id"])
+    assert page["ids"] == [ids[2], ids[5]]
+    assert page["documents"] == [texts[2], texts[5]]
+    assert page["metadatas"] == [metadatas[2], metadatas[5]]
+    assert matrix.get(limit=3, offset=10)["ids"] == ids[10:13]
+    assert matrix.count() == len(ids)
+
+
+@pytest.mark.parametrize("where", WHERES)
+def test_query_matches_brute_force(documents, matrix, where):
+    ids, texts, metadatas, _ = documents
+    queries = np.array(HashingEmbeddingFunction(dim=64)(QUERIES))
+    restored = np.asarray(matrix.get(include=("embeddings",))["embeddings"])
+    allowed = np.array([_python_where(m, where) if where else True for m in metadatas])
+    result = matrix.query(queries, n_results=10, where=where)
+    for j, query in enumerate(queries):
+        distances = ((restored - query) ** 2).sum(axis=1)
+        distances[~allowed] = np.inf
+        order = np.argsort(distances, kind="stable")[:min(10, allowed.sum())]
+        np.testing.assert_allclose(result["distances"][j], distances[order], rtol=1e-4, atol=1e-5)
+        # 거리가 같은 문서는 순서가 바뀔 수 있으므로, 돌려준 문서 각각의 실제 거리가 돌려준 거리와 같은지 확인
+        rows = [ids.index(doc_id) for doc_id in result["ids"][j]]
+        np.testing.assert_allclose(distances[rows], result["distances"][j], rtol=1e-4, atol=1e-5)
+
+
+def test_query_respects_ids(documents, matrix):
+    ids = documents[0]
+    subset = ids[:7]
+    result = matrix.query(HashingEmbeddingFunction(dim=64)(QUERIES[:1]), n_results=20, ids=subset)
+    assert sorted(result["ids"][0]) == sorted(subset)
+
+
+def test_matches_chroma(documents, tmp_path):
+    chromadb = pytest.importorskip("chromadb")
+    ids, texts, metadatas, embeddings = documents
+    client = chromadb.EphemeralClient()
+    collection = client.create_collection("vector_store_test", embedding_function=None)
+    collection.add(ids=ids, documents=texts, metadatas=metadatas, embeddings=embeddings.tolist())
+    write_collection(str(tmp_path), "shops", ids, texts, metadatas, embeddings, dtype="float16")
+    matrix = MatrixCollection(str(tmp_path), "shops")
+
+    for where in WHERES[1:6]:
+        assert sorted(matrix.get(where=where)["ids"]) == sorted(collection.get(where=where)["ids"]), where
+    queries = HashingEmbeddingFunction(dim=64)(QUERIES)
+    ours = matrix.query(queries, n_results=10, where=WHERES[3])
+    theirs = collection.query(query_embeddings=[q.tolist() for q in queries], n_results=10, where=WHERES[3])
+    for mine, chroma, chroma_distances in zip(ours["ids"], theirs["ids"], theirs["distances"]):
+        # 작은 컬렉션에서 HNSW는 정확 검색과 같고, float16 저장 오차만큼만 거리가 다름
+        assert len(set(mine) & set(chroma)) >= 9
+    np.testing.assert_allclose(ours["distances"][0], theirs["distances"][0], atol=2e-3)
+
+
+def test_client_reopens_rewritten_collection(documents, tmp_path):
+    ids, texts, metadatas, embeddings = documents
+    write_collection(str(tmp_path), "shops", ids[:10], texts[:10], metadatas[:10], embeddings[:10])
+    client = MatrixClient(str(tmp_path))
+    assert client.get_collection("shops").count() == 10
+    assert client.get_collection("shops") is client.get_collection("shops")
+    write_collection(str(tmp_path), "shops", ids[:20], texts[:20], metadatas[:20], embeddings[:20])
+    assert client.get_collection("shops").count() == 20
+    assert [c.name for c in client.list_collections()] == ["shops"]
+    with pytest.raises(ValueError):
+        client.get_collection("missing")
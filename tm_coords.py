@@ -0,0 +1,146 @@
+# 중부원점 TM 좌표 → WGS84 위경도 변환
+# 지방행정 인허가 데이터의 좌표정보(X)/(Y)는 베셀 타원체 기준 중부원점 TM 좌표(EPSG:5174)이다.
+# (전처리 CSV의 기존 위경도와 비교하면 EPSG:5174는 중앙값 1cm, EPSG:2097은 약 255m 차이)
+# 외부 라이브러리(pyproj) 없이 NumPy 배열 연산 한 번으로 변환한다:
+#   TM 역변환(베셀 위경도) → 지심 직교좌표 → 7변수 Helmert 변환 → WGS84 위경도
+import numpy as np  # 수치 연산 라이브러리
+
+# 타원체 (장반경, 편평률)
+BESSEL = (6377397.155, 1 / 299.1528128)
+WGS84 = (6378137.0, 1 / 298.257223563)
+
+# 투영 정의: 원점 위도/경도(도), 축척계수, 가산 X(동), 가산 Y(북), 베셀→WGS84 Helmert 변수
+# (dx, dy, dz [m], rx, ry, rz [초], ds [ppm], position vector 방식 = PROJ towgs84와 같은 부호)
+_KOREA_TOWGS84 = (-115.80, 474.99, 674.11, 1.16, -2.31, -1.63, 6.43)
+PROJECTIONS = {
+    # 중부원점 (경도 원점 127도)
+    "EPSG:2097": dict(lat0=38.0, lon0=127.0, k0=1.0, x0=200000.0, y0=500000.0, towgs84=_KOREA_TOWGS84),
+    # 중부원점 (경도 원점 10.405초 보정, 인허가 데이터 기본)
+    "EPSG:5174": dict(lat0=38.0, lon0=127.0028902777778, k0=1.0, x0=200000.0, y0=500000.0,
+                      towgs84=_KOREA_TOWGS84),
+}
+DEFAULT_PROJECTION = "EPSG:5174"
+
+_ARCSEC = np.pi / (180 * 3600)
+
+
+def _meridian_arc(phi, a, e2):
+    e4, e6 = e2 * e2, e2 * e2 * e2
+    return a * ((1 - e2 / 4 - 3 * e4 / 64 - 5 * e6 / 256) * phi
+                - (3 * e2 / 8 + 3 * e4 / 32 + 45 * e6 / 1024) * np.sin(2 * phi)
+                + (15 * e4 / 256 + 45 * e6 / 1024) * np.sin(4 * phi)
+                - (35 * e6 / 3072) * np.sin(6 * phi))
+
+
+def tm_inverse(x, y, lat0, lon0, k0, x0, y0, ellipsoid=BESSEL):
+    # TM 좌표 → 같은 타원체의 위경도(라디안), 급수 전개 (USGS Snyder 식)
+    a, f = ellipsoid
+    e2 = f * (2 - f)
+    ep2 = e2 / (1 - e2)
+    e4, e6 = e2 * e2, e2 * e2 * e2
+
+    m = _meridian_arc(np.radians(lat0), a, e2) + (y - y0) / k0
+    mu = m / (a * (1 - e2 / 4 - 3 * e4 / 64 - 5 * e6 / 256))
+    e1 = (1 - np.sqrt(1 - e2)) / (1 + np.sqrt(1 - e2))
+    phi1 = (mu + (3 * e1 / 2 - 27 * e1 ** 3 / 32) * np.sin(2 * mu)
+            + (21 * e1 ** 2 / 16 - 55 * e1 ** 4 / 32) * np.sin(4 * mu)
+            + (151 * e1 ** 3 / 96) * np.sin(6 * mu)
+            + (1097 * e1 ** 4 / 512) * np.sin(8 * mu))
+
+    sin1, cos1, tan1 = np.sin(phi1), np.cos(phi1), np.tan(phi1)
+    c1 = ep2 * cos1 ** 2
+    t1 = tan1 ** 2
+    w = 1 - e2 * sin1 ** 2
+    n1 = a / np.sqrt(w)
+    r1 = a * (1 - e2) / w ** 1.5
+    d = (x - x0) / (n1 * k0)
+
+    lat = phi1 - (n1 * tan1 / r1) * (
+        d ** 2 / 2
+        - (5 + 3 * t1 + 10 * c1 - 4 * c1 ** 2 - 9 * ep2) * d ** 4 / 24
+        + (61 + 90 * t1 + 298 * c1 + 45 * t1 ** 2 - 252 * ep2 - 3 * c1 ** 2) * d ** 6 / 720
+    )
+    lon = np.radians(lon0) + (
+        d
+        - (1 + 2 * t1 + c1) * d ** 3 / 6
+        + (5 - 2 * c1 + 28 * t1 - 3 * c1 ** 2 + 8 * ep2 + 24 * t1 ** 2) * d ** 5 / 120
+    ) / cos1
+    return lat, lon
+
+
+def tm_forward(lat, lon, lat0, lon0, k0, x0, y0, ellipsoid=BESSEL):
+    # 위경도(라디안) → 같은 타원체의 TM 좌표 (tm_inverse의 역, 검증/역변환용)
+    a, f = ellipsoid
+    e2 = f * (2 - f)
+    ep2 = e2 / (1 - e2)
+    n = a / np.sqrt(1 - e2 * np.sin(lat) ** 2)
+    t = np.tan(lat) ** 2
+    c = ep2 * np.cos(lat) ** 2
+    d = (lon - np.radians(lon0)) * np.cos(lat)
+    m = _meridian_arc(lat, a, e2) - _meridian_arc(np.radians(lat0), a, e2)
+    x = x0 + k0 * n * (d + (1 - t + c) * d ** 3 / 6 + (5 - 18 * t + t ** 2 + 72 * c - 58 * ep2) * d ** 5 / 120)
+    y = y0 + k0 * (m + n * np.tan(lat) * (
+        d ** 2 / 2
+        + (5 - t + 9 * c + 4 * c ** 2) * d ** 4 / 24
+        + (61 - 58 * t + t ** 2 + 600 * c - 330 * ep2) * d ** 6 / 720
+    ))
+    return x, y
+
+
+def geodetic_to_ecef(lat, lon, ellipsoid, h=0.0):
+    a, f = ellipsoid
+    e2 = f * (2 - f)
+    n = a / np.sqrt(1 - e2 * np.sin(lat) ** 2)
+    return ((n + h) * np.cos(lat) * np.cos(lon),
+            (n + h) * np.cos(lat) * np.sin(lon),
+            (n * (1 - e2) + h) * np.sin(lat))
+
+
+def ecef_to_geodetic(x, y, z, ellipsoid):
+    # 위도는 반복 계산 (3회면 mm 수준으로 수렴)
+    a, f = ellipsoid
+    e2 = f * (2 - f)
+    p = np.hypot(x, y)
+    lat = np.arctan2(z, p * (1 - e2))
+    for _ in range(3):
+        n = a / np.sqrt(1 - e2 * np.sin(lat) ** 2)
+        lat = np.arctan2(z + e2 * n * np.sin(lat), p)
+    return lat, np.arctan2(y, x)
+
+
+def helmert(x, y, z, dx, dy, dz, rx, ry, rz, ds):
+    # 7변수 변환 (position vector 방식, 미소 회전 근사)
+    rx, ry, rz = rx * _ARCSEC, ry * _ARCSEC, rz * _ARCSEC
+    scale = 1 + ds * 1e-6
+    return (dx + scale * (x - rz * y + ry * z),
+            dy + scale * (rz * x + y - rx * z),
+            dz + scale * (-ry * x + rx * y + z))
+
+
+def helmert_inverse(x, y, z, dx, dy, dz, rx, ry, rz, ds):
+    # helmert의 정확한 역변환 (3x3 행렬을 풀어서, 변수 부호만 바꾸는 근사보다 mm 단위로 정확)
+    rx, ry, rz = rx * _ARCSEC, ry * _ARCSEC, rz * _ARCSEC
+    matrix = (1 + ds * 1e-6) * np.array([[1, -rz, ry], [rz, 1, -rx], [-ry, rx, 1]])
+    shifted = np.stack([np.asarray(x) - dx, np.asarray(y) - dy, np.asarray(z) - dz])
+    return tuple(np.tensordot(np.linalg.inv(matrix), shifted, axes=1))
+
+
+def tm_to_wgs84(x, y, projection=DEFAULT_PROJECTION):
+    # TM 좌표 배열 → (위도, 경도) 도 단위 배열, 결측(NaN)은 NaN 그대로
+    params = PROJECTIONS[projection]
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    lat, lon = tm_inverse(x, y, params["lat0"], params["lon0"], params["k0"], params["x0"], params["y0"])
+    ecef = helmert(*geodetic_to_ecef(lat, lon, BESSEL), *params["towgs84"])
+    lat, lon = ecef_to_geodetic(*ecef, WGS84)
+    return np.degrees(lat), np.degrees(lon)
+
+
+def wgs84_to_tm(lat, lon, projection=DEFAULT_PROJECTION):
+    # (위도, 경도) 도 단위 배열 → TM 좌표 (x, y) 배열 (tm_to_wgs84의 역, 왕복 오차 수 mm)
+    params = PROJECTIONS[projection]
+    lat = np.radians(np.asarray(lat, dtype=np.float64))
+    lon = np.radians(np.asarray(lon, dtype=np.float64))
+    ecef = helmert_inverse(*geodetic_to_ecef(lat, lon, WGS84), *params["towgs84"])
+    lat, lon = ecef_to_geodetic(*ecef, BESSEL)
+    return tm_forward(lat, lon, params["lat0"], params["lon0"], params["k0"], params["x0"], params["y0"])
@@ -0,0 +1,176 @@
+# 단계별 소요 시간 기록
+# 스크립트 실행 한 번(rerun)을 RunTrace 하나로 두고, 단계(데이터 로드, 필터, 지도 생성, 지도 직렬화, 검색,
+# 프롬프트 구성, LLM 호출)마다 span으로 소요 시간과 행 수 / 바이트 / 토큰 수를 기록한다.
+# 실행이 끝나면 TraceSink에 넘겨 세션 전체 누적 통계를 갱신하고, 설정된 경우 JSONL 로그와
+# Prometheus 텍스트 파일(node_exporter textfile collector 형식)로 내보낸다.
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+# Prometheus 히스토그램 구간(초)
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# 합산해서 내보내는 span 속성 (값이 숫자일 때만)
+COUNTED_ATTRS = ('rows', 'bytes', 'prompt_tokens', 'completion_tokens')
+
+
+class Span:
+    def __init__(self, name, offset, attrs):
+        self.name = name
+        self.offset = offset  # 실행 시작부터 span 시작까지(초)
+        self.duration = None
+        self.attrs = dict(attrs)
+        self._started = time.perf_counter()
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def end(self, **attrs):
+        self.attrs.update(attrs)
+        self.duration = time.perf_counter() - self._started
+
+    def to_dict(self):
+        return {"name": self.name, "offset": round(self.offset, 6),
+                "duration": round(self.duration, 6) if self.duration is not None else None, **self.attrs}
+
+
+class RunTrace:
+    # 스크립트 실행 한 번의 span 목록
+    def __init__(self, session=None, started=None):
+        # started: 실행 시작 시각(perf_counter), 모듈 임포트 전에 잰 값을 넘기면 임포트 시간도 포함
+        self.run_id = uuid.uuid4().hex[:12]
+        self.session = session
+        self._started = started if started is not None else time.perf_counter()
+        self.started_at = time.time() - (time.perf_counter() - self._started)
+        self.spans = []
+
+    def begin(self, name, **attrs):
+        # 여러 줄에 걸친 단계: span = trace.begin("filter") ... span.end(rows=...)
+        span = Span(name, time.perf_counter() - self._started, attrs)
+        self.spans.append(span)
+        return span
+
+    @contextmanager
+    def span(self, name, **attrs):
+        # with trace.span("map_build") as span: ...; span.set(bytes=...)
+        span = self.begin(name, **attrs)
+        try:
+            yield span
+        finally:
+            span.end()
+
+    def record(self, name, duration, **attrs):
+        # 다른 곳에서 이미 잰 시간을 span으로 추가 (스트리밍 답변처럼 끝난 뒤에야 시간을 아는 경우)
+        span = Span(name, time.perf_counter() - self._started - (duration or 0.0), attrs)
+        span.duration = duration
+        self.spans.append(span)
+        return span
+
+    def mark(self, name, **attrs):
+        # 실행 시작부터 지금까지를 span으로 기록 (첫 화면 표시 시점 등)
+        return self.record(name, self.elapsed(), **attrs)
+
+    def elapsed(self):
+        return time.perf_counter() - self._started
+
+    def to_dict(self):
+        return {
+            "run_id": self.run_id,
+            "session": self.session,
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started_at)),
+            "elapsed": round(self.elapsed(), 6),
+            "spans": [span.to_dict() for span in self.spans],
+        }
+
+
+# --------------------------------->
+# 누적 통계 / 내보내기
+# --------------------------------->
+class StageStats:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * len(DURATION_BUCKETS)
+        self.sums = dict.fromkeys(COUNTED_ATTRS, 0)
+
+    def add(self, span):
+        if span.duration is None:
+            return
+        self.count += 1
+        self.total += span.duration
+        self.max = max(self.max, span.duration)
+        for i, bound in enumerate(DURATION_BUCKETS):
+            if span.duration <= bound:
+                self.buckets[i] += 1
+        for attr in COUNTED_ATTRS:
+            value = span.attrs.get(attr)
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                self.sums[attr] += value
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class TraceSink:
+    # 모든 세션의 실행 기록을 받아 단계별 누적 통계를 유지하고 파일로 내보냄
+    # jsonl_path: 실행마다 한 줄씩 추가, prom_path: 누적 통계를 Prometheus 텍스트 형식으로 다시 씀
+    def __init__(self, jsonl_path=None, prom_path=None, prefix="gjg"):
+        self.jsonl_path = jsonl_path
+        self.prom_path = prom_path
+        self.prefix = prefix
+        self.runs = 0
+        self.stages = {}
+        self._lock = threading.Lock()
+
+    def export(self, trace):
+        with self._lock:
+            self.runs += 1
+            for span in trace.spans:
+                self.stages.setdefault(span.name, StageStats()).add(span)
+            if self.jsonl_path:
+                with open(self.jsonl_path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(trace.to_dict(), ensure_ascii=False, default=str) + "\n")
+            if self.prom_path:
+                tmp_path = f"{self.prom_path}.{os.getpid()}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    f.write(self._prometheus_text())
+                os.replace(tmp_path, self.prom_path)
+
+    def summary(self):
+        # {단계: {count, avg, max, rows, bytes, ...}}
+        with self._lock:
+            return {
+                name: {"count": s.count, "avg": s.total / s.count if s.count else 0.0, "max": s.max, **s.sums}
+                for name, s in self.stages.items()
+            }
+
+    def _prometheus_text(self):
+        p = self.prefix
+        lines = [
+            f"# HELP {p}_runs_total 스크립트 실행 횟수",
+            f"# TYPE {p}_runs_total counter",
+            f"{p}_runs_total {self.runs}",
+            f"# HELP {p}_stage_duration_seconds 단계별 소요 시간",
+            f"# TYPE {p}_stage_duration_seconds histogram",
+        ]
+        for name, s in sorted(self.stages.items()):
+            stage = _label(name)
+            for bound, count in zip(DURATION_BUCKETS, s.buckets):
+                lines.append(f'{p}_stage_duration_seconds_bucket{{stage="{stage}",le="{bound}"}} {count}')
+            lines.append(f'{p}_stage_duration_seconds_bucket{{stage="{stage}",le="+Inf"}} {s.count}')
+            lines.append(f'{p}_stage_duration_seconds_sum{{stage="{stage}"}} {s.total:.6f}')
+            lines.append(f'{p}_stage_duration_seconds_count{{stage="{stage}"}} {s.count}')
+        for attr, help_text in (("rows", "단계별 처리 행 수"), ("bytes", "단계별 전송 바이트"),
+                                ("prompt_tokens", "프롬프트 토큰 수"), ("completion_tokens", "답변 토큰 수")):
+            metric = f"{p}_stage_{attr}_total"
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} counter")
+            for name, s in sorted(self.stages.items()):
+                if s.sums[attr]:
+                    lines.append(f'{metric}{{stage="{_label(name)}"}} {s.sums[attr]}')
+        return "\n".join(lines) + "\n"
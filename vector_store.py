@@ -0,0 +1,341 @@
+# 행렬 벡터 저장소 (Chroma 대체 백엔드)
+# 업소 문서 수(수백 ~ 수천 개) 규모에서는 HNSW 색인 + SQLite 없이 전체 임베딩과의 거리를 한 번에 계산하는
+# 정확 검색이 더 빠르고 가볍다. 임베딩은 float16(또는 행별 배율을 둔 int8) 행렬로 .npy에 저장해 메모리 매핑으로
+# 열고(작은 행렬은 처음 검색할 때 float32로 한 번 복원), 문서 본문과 메타데이터는 parquet 테이블 하나로 둔다.
+#
+# 앱은 벡터 DB를 컬렉션 객체의 아래 메서드로만 쓰므로, 같은 메서드를 가진 객체면 어느 백엔드든 끼울 수 있다.
+#   name, metadata, count(), get(ids, where, limit, offset, include), query(query_embeddings, n_results, where, ids)
+# MatrixCollection은 이 메서드를 Chroma와 같은 입출력 형식(거리는 Chroma 기본값인 제곱 L2)으로 구현하고,
+# 질문 여러 개를 한 번의 행렬 곱으로 검색한다.
+#
+# 사용 예:
+#   python vector_store.py export --db chroma_db3 --collection gjg_report --out vector_matrix
+#   python vector_store.py export --collection gjg_report --dtype int8   # 더 작게 (재현율 약간 손해)
+#   GJG_VECTOR_BACKEND=matrix streamlit run gjg2.py
+import argparse
+import glob
+import json
+import os
+import threading
+import time
+import uuid
+
+import numpy as np  # 수치 연산 라이브러리
+import pandas as pd  # 데이터 분석 라이브러리
+
+from data_store import source_stamp
+
+DEFAULT_MATRIX_PATH = "vector_matrix"
+DTYPES = ("float16", "int8")
+
+# 복원한 float32 행렬이 이 크기 이하면 처음 검색할 때 한 번 복원해 두고 행렬 곱 한 번으로 검색
+# (float16 → float32 변환이 느려 매번 변환하면 곱셈보다 오래 걸림), 넘으면 매핑된 행렬을 블록 단위로 변환하며 곱함
+DENSE_CACHE_BYTES = 64 << 20
+# 블록 단위 검색에서 한 번에 float32로 바꿔 곱하는 행 수 (임시 메모리 = 행 수 x 차원 x 4바이트)
+BLOCK_ROWS = 8192
+# 허용 행이 전체의 이 비율보다 적으면 전체를 곱하지 않고 허용 행만 골라서 곱함
+SUBSET_RATIO = 0.25
+
+
+# --------------------------------->
+# 저장
+# --------------------------------->
+def quantize(embeddings, dtype):
+    # (저장할 행렬, 행별 배율 또는 None, 복원한 벡터의 제곱 노름)
+    vectors = np.asarray(embeddings, dtype=np.float32)
+    if dtype == "float16":
+        matrix = vectors.astype(np.float16)
+        scales = None
+        restored = matrix.astype(np.float32)
+    elif dtype == "int8":
+        scales = np.maximum(np.abs(vectors).max(axis=1), 1e-12) / 127
+        matrix = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+        scales = scales.astype(np.float32)
+        restored = matrix.astype(np.float32) * scales[:, None]
+    else:
+        raise ValueError(f"지원하지 않는 dtype: {dtype} ({', '.join(DTYPES)} 중 하나)")
+    return matrix, scales, np.einsum('ij,ij->i', restored, restored)
+
+
+def write_collection(path, name, ids, documents, metadatas, embeddings, metadata=None, dtype="float16"):
+    # 세대(generation)별 파일을 다 쓴 뒤 정보 파일(<name>.json)을 바꿔 새 세대를 가리키게 함
+    # (읽는 쪽은 정보 파일이 가리키는 세대만 열므로 쓰는 도중의 파일을 읽지 않음, 이전 세대 파일은 지움)
+    os.makedirs(path, exist_ok=True)
+    info_path = os.path.join(path, f"{name}.json")
+    old_generation = _read_info(info_path).get("generation") if os.path.exists(info_path) else None
+    generation = uuid.uuid4().hex[:8]
+    prefix = os.path.join(path, f"{name}.{generation}")
+
+    matrix, scales, norms = quantize(embeddings, dtype) if len(ids) else (
+        np.zeros((0, 0), dtype=np.float16 if dtype == "float16" else np.int8), None, np.zeros(0, np.float32))
+    np.save(f"{prefix}.vectors.npy", matrix)
+    np.save(f"{prefix}.norms.npy", norms.astype(np.float32))
+    if scales is not None:
+        np.save(f"{prefix}.scales.npy", scales)
+    table = pd.DataFrame(list(metadatas)) if len(ids) else pd.DataFrame()
+    table.insert(0, "_document", list(documents))
+    table.insert(0, "_id", list(ids))
+    table.to_parquet(f"{prefix}.table.parquet", index=False)
+
+    info = {
+        "name": name,
+        "generation": generation,
+        "dtype": dtype,
+        "count": len(ids),
+        "dim": int(matrix.shape[1]) if len(ids) else 0,
+        "metadata": metadata or {},
+        "written_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    tmp_path = f"{info_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(info, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, info_path)
+
+    # 이전 세대를 열어 둔 프로세스는 지운 뒤에도 메모리 매핑으로 계속 읽을 수 있음
+    if old_generation and old_generation != generation:
+        for old_file in glob.glob(os.path.join(path, f"{name}.{old_generation}.*")):
+            os.remove(old_file)
+    return info
+
+
+def export_collection(collection, path, dtype="float16", page_size=1000):
+    # Chroma 컬렉션 → 행렬 저장소 (임베딩을 다시 계산하지 않음, 적재 버전 등 컬렉션 메타데이터도 그대로)
+    ids, documents, metadatas, embeddings = [], [], [], []
+    offset = 0
+    while True:
+        page = collection.get(include=["documents", "metadatas", "embeddings"], limit=page_size, offset=offset)
+        ids.extend(page["ids"])
+        documents.extend(page["documents"])
+        metadatas.extend(page["metadatas"])
+        embeddings.extend(page["embeddings"])
+        if len(page["ids"]) < page_size:
+            break
+        offset += page_size
+    return write_collection(path, collection.name, ids, documents, metadatas, embeddings,
+                            dict(collection.metadata or {}), dtype)
+
+
+def _read_info(info_path):
+    with open(info_path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+# --------------------------------->
+# 조회
+# --------------------------------->
+def _condition_mask(column, condition):
+    # 메타데이터 필드 하나의 조건 (Chroma where 연산자 중 앱이 쓰는 것들)
+    if not isinstance(condition, dict):
+        condition = {"$eq": condition}
+    mask = np.ones(len(column), dtype=bool)
+    for op, value in condition.items():
+        if op == "$eq":
+            mask &= (column == value).to_numpy()
+        elif op == "$ne":
+            mask &= (column != value).to_numpy()
+        elif op == "$in":
+            mask &= column.isin(list(value)).to_numpy()
+        elif op == "$nin":
+            mask &= ~column.isin(list(value)).to_numpy()
+        elif op in ("$gt", "$gte", "$lt", "$lte"):
+            numbers = pd.to_numeric(column, errors='coerce')
+            compare = {"$gt": numbers.gt, "$gte": numbers.ge, "$lt": numbers.lt, "$lte": numbers.le}[op]
+            mask &= compare(value).to_numpy()
+        else:
+            raise ValueError(f"지원하지 않는 where 연산자: {op}")
+    return mask
+
+
+def where_mask(table, where):
+    # Chroma where 조건 → 행 마스크
+    mask = np.ones(len(table), dtype=bool)
+    for key, condition in where.items():
+        if key == "$and":
+            for clause in condition:
+                mask &= where_mask(table, clause)
+        elif key == "$or":
+            mask &= np.logical_or.reduce([where_mask(table, clause) for clause in condition])
+        elif key not in table.columns:
+            mask &= False
+        else:
+            mask &= _condition_mask(table[key], condition)
+    return mask
+
+
+class MatrixCollection:
+    def __init__(self, path, name):
+        info = _read_info(os.path.join(path, f"{name}.json"))
+        prefix = os.path.join(path, f"{name}.{info['generation']}")
+        self.name = name
+        self.metadata = info["metadata"]
+        self.dtype = info["dtype"]
+        # 임베딩은 메모리 매핑 (검색할 때 필요한 부분만 운영체제가 읽음, 여러 프로세스가 같은 페이지 공유)
+        self.vectors = np.load(f"{prefix}.vectors.npy", mmap_mode='r')
+        self.norms = np.load(f"{prefix}.norms.npy")
+        self.scales = np.load(f"{prefix}.scales.npy") if self.dtype == "int8" else None
+        table = pd.read_parquet(f"{prefix}.table.parquet")
+        self.ids = table["_id"].to_numpy(dtype=object)
+        self.documents = table["_document"].to_numpy(dtype=object)
+        self.table = table.drop(columns=["_id", "_document"])
+        self._rows = {doc_id: row for row, doc_id in enumerate(self.ids)}
+        self._records = None
+        self._restored = None  # 복원한 float32 행렬 (DENSE_CACHE_BYTES 이하일 때)
+        self._lock = threading.Lock()
+
+    def count(self):
+        return len(self.ids)
+
+    def _metadatas(self, rows):
+        # 행 → 메타데이터 dict (처음 필요할 때 전체를 한 번 만들어 둠)
+        if self._records is None:
+            columns = {col: self.table[col].tolist() for col in self.table.columns}
+            self._records = [
+                {col: values[i] for col, values in columns.items() if values[i] is not None and values[i] == values[i]}
+                for i in range(len(self.ids))
+            ]
+        return [self._records[row] for row in rows]
+
+    def _restore(self):
+        # 작은 행렬은 float32로 한 번 복원해 둠 (여러 세션이 동시에 검색해도 한 번만)
+        if self._restored is None and self.vectors.size * 4 <= DENSE_CACHE_BYTES:
+            with self._lock:
+                if self._restored is None:
+                    restored = np.asarray(self.vectors, dtype=np.float32)
+                    if self.scales is not None:
+                        restored *= self.scales[:, None]
+                    self._restored = restored
+        return self._restored
+
+    def _dense(self, rows=None, start=None, stop=None):
+        # 저장된 행렬 일부 → float32
+        restored = self._restore()
+        if restored is not None:
+            return restored[rows] if rows is not None else restored[start:stop]
+        block = self.vectors[rows] if rows is not None else self.vectors[start:stop]
+        block = np.asarray(block, dtype=np.float32)
+        if self.scales is not None:
+            scales = self.scales[rows] if rows is not None else self.scales[start:stop]
+            block *= scales[:, None]
+        return block
+
+    def _candidates(self, where=None, ids=None):
+        # 검색을 허용할 행 번호 (None이면 전체)
+        rows = None
+        if ids is not None:
+            rows = np.array(sorted({self._rows[i] for i in ids if i in self._rows}), dtype=np.int64)
+        if where:
+            mask = where_mask(self.table, where)
+            rows = np.flatnonzero(mask) if rows is None else rows[mask[rows]]
+        return rows
+
+    def get(self, ids=None, where=None, limit=None, offset=0, include=("documents", "metadatas")):
+        rows = self._candidates(where, ids)
+        rows = np.arange(len(self.ids)) if rows is None else rows
+        rows = rows[offset:offset + limit if limit is not None else None]
+        result = {"ids": self.ids[rows].tolist()}
+        if "documents" in include:
+            result["documents"] = self.documents[rows].tolist()
+        if "metadatas" in include:
+            result["metadatas"] = self._metadatas(rows)
+        if "embeddings" in include:
+            result["embeddings"] = list(self._dense(rows=rows))
+        return result
+
+    def distances(self, queries, rows=None):
+        # (허용 행 수 x 질문 수) 제곱 L2 거리 = |x|^2 + |q|^2 - 2 x·q, 내적은 블록 단위 행렬 곱 한 번씩
+        queries = np.asarray(queries, dtype=np.float32)
+        query_norms = np.einsum('ij,ij->i', queries, queries)
+        if rows is not None:
+            dots = self._dense(rows=rows) @ queries.T
+            norms = self.norms[rows]
+        elif self._restore() is not None:
+            dots = self._restored @ queries.T
+            norms = self.norms
+        else:
+            dots = np.empty((len(self.ids), len(queries)), dtype=np.float32)
+            for start in range(0, len(self.ids), BLOCK_ROWS):
+                stop = min(start + BLOCK_ROWS, len(self.ids))
+                dots[start:stop] = self._dense(start=start, stop=stop) @ queries.T
+            norms = self.norms
+        return np.maximum(norms[:, None] + query_norms[None, :] - 2 * dots, 0.0)
+
+    def query(self, query_embeddings, n_results=10, where=None, ids=None,
+              include=("documents", "metadatas", "distances")):
+        # 질문 여러 개를 한 번에 검색, 결과는 질문별 목록 (Chroma Collection.query와 같은 형식)
+        rows = self._candidates(where, ids)
+        if rows is not None and len(rows) >= SUBSET_RATIO * len(self.ids):
+            # 허용 행이 많으면 전체를 연속으로 곱한 뒤 허용 행만 고르는 쪽이 빠름
+            distances = self.distances(query_embeddings)[rows]
+        else:
+            distances = self.distances(query_embeddings, rows)
+        candidate_rows = rows if rows is not None else np.arange(len(self.ids))
+
+        result = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        k = min(n_results, len(candidate_rows))
+        for j in range(distances.shape[1]):
+            column = distances[:, j]
+            top = np.argpartition(column, k - 1)[:k] if 0 < k < len(column) else np.arange(k)
+            top = top[np.argsort(column[top], kind='stable')]
+            hit_rows = candidate_rows[top]
+            result["ids"].append(self.ids[hit_rows].tolist())
+            result["documents"].append(self.documents[hit_rows].tolist() if "documents" in include else None)
+            result["metadatas"].append(self._metadatas(hit_rows) if "metadatas" in include else None)
+            result["distances"].append(column[top].tolist() if "distances" in include else None)
+        return result
+
+
+class MatrixClient:
+    # Chroma 클라이언트 자리에 쓰는 저장소 (컬렉션은 파일이 바뀌면 다시 열고, 그 외에는 프로세스에서 공유)
+    def __init__(self, path=DEFAULT_MATRIX_PATH):
+        self.path = path
+        self._collections = {}  # 이름 → (정보 파일 stamp, 컬렉션)
+        self._lock = threading.Lock()
+
+    def get_collection(self, name):
+        info_path = os.path.join(self.path, f"{name}.json")
+        if not os.path.exists(info_path):
+            raise ValueError(f"컬렉션 {name}이(가) {self.path}에 없습니다. (python vector_store.py export로 생성)")
+        stamp = source_stamp(info_path)
+        with self._lock:
+            entry = self._collections.get(name)
+            if entry is None or entry[0] != stamp:
+                entry = (stamp, MatrixCollection(self.path, name))
+                self._collections[name] = entry
+            return entry[1]
+
+    def list_collections(self):
+        names = sorted(os.path.basename(p)[:-len(".json")] for p in glob.glob(os.path.join(self.path, "*.json")))
+        return [self.get_collection(name) for name in names]
+
+
+# --------------------------------->
+# 변환 CLI
+# --------------------------------->
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Chroma 컬렉션을 행렬 벡터 저장소로 내보내기")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export = commands.add_parser("export", help="Chroma 컬렉션 → 행렬 저장소 (ingest.py로 적재한 뒤 실행)")
+    export.add_argument("--db", default="chroma_db3", help="ChromaDB 저장 경로")
+    export.add_argument("--collection", default="gjg_report", help="컬렉션 이름")
+    export.add_argument("--out", default=DEFAULT_MATRIX_PATH, help="행렬 저장소 경로 (앱의 GJG_MATRIX_PATH)")
+    export.add_argument("--dtype", choices=DTYPES, default="float16", help="임베딩 저장 형식")
+    args = parser.parse_args(argv)
+
+    try:
+        __import__('pysqlite3')
+        import sys
+        sys.modules['sqlite3'] = sys.modules.pop('pysqlite3')
+    except ImportError:
+        pass
+    import chromadb  # 확장성 있는 벡터 데이터베이스 라이브러리
+
+    started = time.perf_counter()
+    collection = chromadb.PersistentClient(path=args.db).get_collection(args.collection)
+    info = export_collection(collection, args.out, args.dtype)
+    size = sum(os.path.getsize(p) for p in glob.glob(os.path.join(args.out, f"{info['name']}.{info['generation']}.*")))
+    print(f"{info['name']}: 문서 {info['count']}개, {info['dim']}차원 {info['dtype']} → {args.out} "
+          f"({size / 2**20:.1f}MB, {time.perf_counter() - started:.1f}초)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+# 첫 질문 전 사전 준비
+# 첫 질문에서 한꺼번에 치르던 준비 비용(Chroma/OpenAI 모듈 임포트, 컬렉션 열기, 임베딩 모델 로드,
+# 벡터 색인(HNSW) 로드, BM25 색인 생성)을 첫 화면을 그린 뒤 백그라운드 스레드에서 한 번 미리 치른다.
+# 단계는 순서대로 실행하고 단계별 소요 시간/오류를 기록한다. 준비 중에 질문이 들어오면 각 자원의
+# 캐시/잠금(st.cache_resource, 샤드의 BM25 잠금)이 같은 자원을 두 번 만들지 않게 막아준다.
+import threading
+import time
+
+
+class Warmup:
+    def __init__(self, steps):
+        # steps: [(단계 이름, 인자 없는 함수)], 앞 단계가 실패하면 그 결과가 필요한 뒤 단계도 실패로 기록됨
+        self.steps = list(steps)
+        self.results = {}  # 단계 이름 → {"seconds": 소요 시간, "error": 오류 메시지 또는 None}
+        self.started = None
+        self.finished = None
+        self._done = threading.Event()
+
+    def start(self):
+        self.started = time.perf_counter()
+        threading.Thread(target=self._run, name="gjg-warmup", daemon=True).start()
+        return self
+
+    def _run(self):
+        try:
+            for name, step in self.steps:
+                started = time.perf_counter()
+                try:
+                    step()
+                    error = None
+                except Exception as e:
+                    error = f"{type(e).__name__}: {e}"
+                self.results[name] = {"seconds": time.perf_counter() - started, "error": error}
+        finally:
+            self.finished = time.perf_counter()
+            self._done.set()
+
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.perf_counter()) - self.started
+
+    def status(self):
+        # [(단계 이름, 소요 시간 또는 None(대기/진행 중), 오류)]
+        return [(name, self.results.get(name, {}).get("seconds"), self.results.get(name, {}).get("error"))
+                for name, _ in self.steps]